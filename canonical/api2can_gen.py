@@ -1,7 +1,9 @@
+import argparse
+import os
 import re
 import traceback
-from os import walk
-import sys
+from collections import OrderedDict
+from os import environ, walk
 
 from bs4 import BeautifulSoup
 from nltk import CFG
@@ -10,13 +12,21 @@ from nltk.parse.generate import generate
 from nltk.stem import WordNetLemmatizer
 from tqdm import tqdm
 
+from canonical.checkpoint import Checkpoint, checkpoint_file_name
+from canonical.dataset_io import FORMATS, DatasetIndex, dataset_writer
+from canonical.dataset_shards import STAGES, shard_of, stage_file_name
+from canonical.manifest import Manifest, code_version, content_hash, files_version, manifest_file_name
 from canonical.post_edits import finalize_utterance, entity_phrase, to_parameters_postfix, to_entities
 from canonical.rule_based import RuleBasedCanonicalGenerator
+from canonical.spec_diff import regenerate
+from canonical.spec_workers import BudgetedPool, TaskFailure, in_worker, report_stage
 from swagger.entities import Operation, IntentCanonical
 from swagger.resource_extractor import extract_resources
-from swagger.swagger_analysis import SwaggerAnalyser
-from swagger.swagger_utils import ParamUtils
+from swagger.spec_cache import SpecCache
+from swagger.swagger_analysis import load_or_analyse
+from swagger.swagger_utils import ParamUtils, entity_file, params_file
 import corenlp as nlp
+from utils.arguments import positive_int
 from utils.text import replace_last, to_sentences
 
 common_verbs = {'get', 'create', 'delete', 'remove', 'eliminate', 'update', 'replace', 'return', 'check', 'set', 'list'}
@@ -314,53 +324,375 @@ class TrainingExprGenerator:
         return ret_path_params, intent
 
 
-if __name__ == "__main__":
-
-    expr_gen = TrainingExprGenerator()
-    rule_gen = RuleBasedCanonicalGenerator()
-    swaggers_directory = sys.argv[1]
-    out_directory = sys.argv[2]
-    for (dirpath, dirnames, filenames) in walk(swaggers_directory):
-
-        with tqdm(total=len(filenames)) as bar:
-            with open("./dataset/expert-canonicals-test-data.json", "r") as f:
-                expert_canonicals = json.load(f)
-
-            files = {
-                "train": filenames[: int(0.9 * len(filenames))],
-                "validation": filenames[int(0.9 * len(filenames)): int(0.95 * len(filenames))],
-                "test": filenames[int(0.95 * len(filenames)):]
-            }
-
-            single_file_dataset = dict()
-            for stage in ["test", "validation", "train"]:
-                single_file_dataset = []
-                for f in files[stage]:
-                    if f.endswith('.yaml'):
-                        try:
-                            param_analyser = SwaggerAnalyser(dirpath + "/" + f)
-
-                            Operations = param_analyser.analyse()
-                            Operations = expr_gen.populate_canonicals(Operations, ignore_non_path_params=True)
-                            for e in Operations:
-                                if e.verb + e.url in expert_canonicals:
-                                    e.canonical_expr = expert_canonicals[e.verb + e.url]
-                                can = rule_gen.translate(e, False, True)
-                                if can:
-                                    e.canonical_expr = can
-
-                                e.api = f
-                                single_file_dataset.append(e.to_json())
-
-                        except ValueError:
-                            print("Unable to parse: {}".format(f))
-                            # traceback.print_exc()
-                            continue
-                        except Exception as e:
-                            print("Unable to parse: {}".format(f))
-                            traceback.print_exc()
-                        finally:
+EXPERT_CANONICALS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "expert-canonicals-test-data.json")
+# Lexicons of the generation, whose version is recorded in the manifest
+LEXICONS = [EXPERT_CANONICALS, entity_file, params_file]
+
+
+def generate_record(operation, api_name, expr_gen, rule_gen, expert_canonicals):
+    """Generate the canonical utterances of an analysed operation, and get its dataset record."""
+    report_stage("intent: {} {}".format(operation.verb, operation.url))
+    operation.canonical_expr = expr_gen.to_canonical(operation, True)
+    if operation.verb + operation.url in expert_canonicals:
+        operation.canonical_expr = expert_canonicals[operation.verb + operation.url]
+    report_stage("rule-based: {} {}".format(operation.verb, operation.url))
+    can = rule_gen.translate(operation, False, True)
+    if can:
+        operation.canonical_expr = can
+    if isinstance(operation.canonical_expr, list):
+        # The generators give the IntentCanonical of the path params, the dataset holds its utterance
+        operation.canonical_expr = operation.canonical_expr[0].canonical if operation.canonical_expr else None
+
+    operation.api = api_name
+    return operation.to_json()
+
+
+def load_previous_dataset(directory, shard_index=None, shard_count=1, formats=FORMATS):
+    """Index the records of a previously generated dataset (or shard) by the file of their API.
+
+    The dataset of a stage is streamed from the first of the given formats which
+    is in the directory; the records are read again from the DatasetIndex (to be
+    closed once used) when they are needed, so they are not held in memory.
+    """
+    index = DatasetIndex()
+    for stage in STAGES:
+        for output_format in formats:
+            path = os.path.join(directory, stage_file_name(stage, shard_index, shard_count, output_format))
+            if os.path.exists(path):
+                try:
+                    index.add_dataset(path)
+                except ValueError as e:
+                    # e.g. the dataset of an interrupted run
+                    print("Unable to read {}: {}".format(path, e))
+                break
+    return index
+
+
+def split_stages(filenames):
+    """Split the files of a directory into the train (90%), validation (5%) and test (5%) stages, in order."""
+    return {
+        "train": filenames[: int(0.9 * len(filenames))],
+        "validation": filenames[int(0.9 * len(filenames)): int(0.95 * len(filenames))],
+        "test": filenames[int(0.95 * len(filenames)):]
+    }
+
+
+class DatasetGenerator:
+    """Generate the dataset records of specifications: their analysed operations with a canonical utterance."""
+
+    def __init__(self, spec_cache=None, ir_directory=None, selective=False):
+        self.expr_gen = TrainingExprGenerator()
+        self.rule_gen = RuleBasedCanonicalGenerator()
+        self.spec_cache = spec_cache
+        self.ir_directory = ir_directory
+        self.selective = selective
+        with open(EXPERT_CANONICALS, "r") as f:
+            self.expert_canonicals = json.load(f)
+
+    def generate(self, spec_path, api_name, previous_records=()):
+        """Generate the records of the operations of a specification.
+
+        Args:
+            spec_path: path of the swagger file.
+            api_name: name of the API in the records (the name of the file).
+            previous_records: records of a previous version of the specification,
+                              reused for its unchanged operations.
+
+        Returns:
+            A tuple with the records and the SpecDiff with the previous version.
+        """
+        report_stage("analysis")
+        api = load_or_analyse(spec_path, ir_directory=self.ir_directory, cache=self.spec_cache,
+                              selective=self.selective)
+        records, diff = regenerate(
+            api.operations, previous_records,
+            lambda e: generate_record(e, api_name, self.expr_gen, self.rule_gen, self.expert_canonicals))
+        for record in records:
+            record["api"] = api_name
+        return records, diff
+
+
+class SpecResult:
+    """Outcome of the generation of a specification, sent back by the workers.
+
+    Attributes:
+        api_name: name of the API (the name of its file).
+        records: the records of its operations, None if the generation failed.
+        reused: number of records reused from the previous dataset.
+        error: None on success; the traceback of an unexpected error, or an
+               empty string for a specification which cannot be parsed.
+        cache_hits, cache_misses: lookups of the spec cache made for the specification.
+    """
+
+    __slots__ = ('api_name', 'records', 'reused', 'error', 'cache_hits', 'cache_misses')
+
+    def __init__(self, api_name, records=None, reused=0, error=None, cache_hits=0, cache_misses=0):
+        self.api_name = api_name
+        self.records = records
+        self.reused = reused
+        self.error = error
+        self.cache_hits = cache_hits
+        self.cache_misses = cache_misses
+
+
+def failure_report_name(shard_index=None, shard_count=1):
+    """Get the name of the report of the specifications which exceeded their budget (of a shard)."""
+    if shard_index is None or shard_count == 1:
+        return "failures.json"
+    return "failures.shard-{}-of-{}.json".format(shard_index, shard_count)
+
+
+def failure_entry(api_name, stage, failure):
+    """Get the entry of the failure report of a specification (a TaskFailure of the workers)."""
+    return OrderedDict([("api", api_name), ("split", stage), ("reason", failure.reason), ("stage", failure.stage),
+                        ("elapsed", round(failure.elapsed or 0.0, 3)), ("detail", failure.detail)])
+
+
+_generator = None  # DatasetGenerator of the process, see init_generator
+
+
+def init_generator(ir_directory=None, selective=False):
+    """Build the DatasetGenerator of a (worker) process, once, before it gets any specification."""
+    global _generator
+    _generator = DatasetGenerator(SpecCache.from_env(), ir_directory, selective)
+
+
+def generate_spec(task):
+    """Generate the records of a (spec_path, api_name, previous_records) task with the process generator."""
+    spec_path, api_name, previous_records = task
+    cache = _generator.spec_cache
+    hits, misses = (cache.hits, cache.misses) if cache else (0, 0)
+    result = SpecResult(api_name)
+    try:
+        result.records, diff = _generator.generate(spec_path, api_name, previous_records)
+        result.reused = len(diff.unchanged)
+    except ValueError:
+        result.error = ""
+    except MemoryError:
+        if in_worker():
+            raise  # the spec exceeded its memory budget, the worker reports it
+        result.error = traceback.format_exc()
+    except Exception:
+        result.error = traceback.format_exc()
+    if cache:
+        result.cache_hits, result.cache_misses = cache.hits - hits, cache.misses - misses
+    return result
+
+
+def generate_dataset(swaggers_directory, out_directory, jobs=1, previous_dataset=None, ir_directory=None,
+                     selective=False, shard_index=None, shard_count=1, manifest=None, stored_dataset=None,
+                     output_format="json", timeout=None, memory_limit=None, max_specs_per_worker=None,
+                     checkpoint=None):
+    """Generate the train, validation and test datasets of a directory of specifications.
+
+    With jobs > 1 the specifications are spread over a pool of worker processes,
+    each with its own warmed-up generator; the results are collected in the order
+    of the files, so the datasets are the same as with a sequential run. The
+    records are streamed to the dataset files as the specifications are done.
+
+    With a timeout or a memory limit, each specification is generated in a worker
+    process under these budgets (even if jobs == 1): a specification which exceeds
+    them (or crashes its worker) is skipped, and written in the failure report
+    (failures.json) with the stage it was stuck in, and the worker is replaced.
+
+    With a checkpoint, the records of the generated specifications are journaled
+    as they are done; the specifications of the checkpoint of an interrupted run
+    (see Checkpoint) are not generated again. The checkpoint is removed once the
+    datasets are complete.
+
+    With shard_count > 1 only the specifications of the shard (see shard_of) are
+    generated, into API2Can-{stage}.shard-I-of-N.json files; the stages are split
+    on all the files, so merging the shards (see dataset_shards.merge_shards)
+    gives the datasets of a run on a single node.
+
+    With a manifest, the specifications whose content, code and lexicons did not
+    change since the previous run are not generated: their records are spliced
+    from the datasets of that run. The manifest of the run is written next to
+    the datasets.
+
+    Args:
+        swaggers_directory: directory of the YAML specifications.
+        out_directory: directory of the API2Can-{stage} files.
+        jobs: number of worker processes.
+        previous_dataset: records of a previous dataset by API, see load_previous_dataset.
+        ir_directory, selective: options of the analysis of the specifications.
+        shard_index, shard_count: shard of the specifications generated by this node.
+        manifest: Manifest of the previous run (see Manifest.load); None to generate all the specifications.
+        stored_dataset: records of the previous run by API, see load_previous_dataset.
+        output_format: format of the datasets, one of dataset_io.FORMATS.
+        timeout: wall-clock budget of a specification, in seconds.
+        memory_limit: memory budget of a specification, in bytes.
+        max_specs_per_worker: number of specifications after which a worker process is replaced.
+        checkpoint: Checkpoint of the run.
+
+    Returns:
+        A dict with the number of reused and generated records, of spliced, resumed,
+        generated and failed specifications, and of spec cache hits and misses.
+    """
+    previous_dataset = previous_dataset or {}
+    stored_dataset = stored_dataset or {}
+    totals = {"reused": 0, "generated": 0, "spliced": 0, "resumed": 0, "processed": 0, "failed": 0,
+              "cache_hits": 0, "cache_misses": 0}
+    new_manifest = Manifest(manifest.code_version, manifest.lexicon_version) if manifest is not None else None
+    spec_hashes = {}
+    failures = []
+    pool = None
+    if jobs > 1 or timeout is not None or memory_limit is not None or max_specs_per_worker is not None:
+        pool = BudgetedPool(generate_spec, jobs, init_generator, (ir_directory, selective), timeout, memory_limit,
+                            max_specs_per_worker)
+    else:
+        init_generator(ir_directory, selective)
+
+    try:
+        for (dirpath, dirnames, filenames) in walk(swaggers_directory):
+            # The order of the files (and so the split) must not depend on the file system of the node
+            filenames = sorted(filenames)
+            files = split_stages(filenames)
+            if shard_count > 1:
+                files = {stage: [f for f in files[stage] if shard_of(f, shard_count) == shard_index]
+                         for stage in STAGES}
+            with tqdm(total=sum(len(files[stage]) for stage in STAGES)) as bar:
+                for stage in STAGES:
+                    names = [f for f in files[stage] if f.endswith('.yaml')]
+                    tasks, spliced, resumed = [], {}, set()
+                    for f in names:
+                        spec_path = dirpath + "/" + f
+                        previous_records = previous_dataset.get(f, [])
+                        if manifest is not None or checkpoint is not None:
+                            spec_hashes[f] = content_hash(spec_path)
+                        if checkpoint is not None:
+                            entry = checkpoint.get(f, spec_hashes[f])
+                            if entry is not None:
+                                spliced[f] = SpecResult(f, entry["records"], entry["reused"], entry["error"])
+                                resumed.add(f)
+                                continue
+                        if manifest is not None:
+                            records = manifest.stored_records(f, spec_hashes[f], stored_dataset.get(f, []))
+                            if records is not None:
+                                spliced[f] = SpecResult(f, records, len(records)) if not manifest.failed(f) else \
+                                    SpecResult(f, error="")
+                                continue
+                            if not previous_dataset and manifest.same_versions(f):
+                                # The spec changed: the records of its unchanged operations are reused
+                                previous_records = stored_dataset.get(f, [])
+                        tasks.append((spec_path, f, previous_records))
+                    generated = pool.imap(tasks) if pool is not None else map(generate_spec, tasks)
+                    results = (spliced[f] if f in spliced else next(generated) for f in names)
+
+                    stage_path = os.path.join(out_directory,
+                                              stage_file_name(stage, shard_index, shard_count, output_format))
+                    with dataset_writer(stage_path) as writer:
+                        for name, result in zip(names, results):
+                            if isinstance(result, TaskFailure):
+                                # Not recorded in the manifest, so that the spec is tried again
+                                print("Skipped {}: {}".format(name, result))
+                                failures.append(failure_entry(name, stage, result))
+                                totals["failed"] += 1
+                                bar.update(1)
+                                continue
+                            if result.error is not None:
+                                print("Unable to parse: {}".format(result.api_name))
+                                if result.error:
+                                    print(result.error)
+                            else:
+                                writer.write_all(result.records)
+                                totals["reused"] += result.reused
+                                totals["generated"] += len(result.records) - result.reused
+                            kind = "resumed" if name in resumed else "spliced" if name in spliced else "processed"
+                            if result.error is None or result.error == "":
+                                # Unexpected errors are not recorded, so that the spec is generated again
+                                if new_manifest is not None:
+                                    new_manifest.update(name, spec_hashes[name],
+                                                        len(result.records) if result.error is None else None)
+                                if checkpoint is not None and kind == "processed":
+                                    checkpoint.add(name, spec_hashes[name], result.records, result.reused,
+                                                   result.error)
+                            totals[kind] += 1
+                            totals["cache_hits"] += result.cache_hits
+                            totals["cache_misses"] += result.cache_misses
                             bar.update(1)
+    finally:
+        if pool is not None:
+            pool.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    with open(os.path.join(out_directory, failure_report_name(shard_index, shard_count)), "wt") as f:
+        f.write(json.dumps(failures, indent=4))
+    if new_manifest is not None:
+        new_manifest.save(os.path.join(out_directory, manifest_file_name(shard_index, shard_count)))
+    if checkpoint is not None:
+        checkpoint.remove()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate the API2Can datasets of a directory of specifications")
+    parser.add_argument("swaggers_directory")
+    parser.add_argument("out_directory")
+    parser.add_argument("previous_directory", nargs="?",
+                        help="previous datasets, whose canonicals of unchanged operations are reused")
+    parser.add_argument("--jobs", type=positive_int, default=1, help="number of worker processes")
+    parser.add_argument("--shard-index", type=int, default=0, help="shard generated by this node")
+    parser.add_argument("--shard-count", type=positive_int, default=1, help="number of nodes sharing the generation")
+    parser.add_argument("--force", action="store_true",
+                        help="generate all the specifications, even those which did not change since the last run")
+    parser.add_argument("--format", choices=FORMATS, default="json",
+                        help="format of the datasets: pretty-printed JSON, or JSON Lines (gzip-compressed)")
+    parser.add_argument("--timeout", type=float, help="wall-clock budget of a specification, in seconds")
+    parser.add_argument("--memory-limit", type=positive_int, help="memory budget of a specification, in MB")
+    parser.add_argument("--max-specs-per-worker", type=positive_int,
+                        help="number of specifications after which a worker process is replaced")
+    parser.add_argument("--resume", action="store_true", help="resume the interrupted run from its checkpoint")
+    parser.add_argument("--checkpoint-every", type=positive_int, default=20,
+                        help="number of generated specifications between two syncs of the checkpoint")
+    args = parser.parse_args()
+    if not 0 <= args.shard_index < args.shard_count:
+        parser.error("--shard-index must be between 0 and --shard-count - 1")
+
+    ir_directory = environ.get('API2CAN_IR_DIR')
+    selective = environ.get('API2CAN_SELECTIVE_LOAD') == '1'
+    os.makedirs(args.out_directory, exist_ok=True)
+    # Specs which did not change since the last run in out_directory are spliced from its datasets
+    manifest_path = os.path.join(args.out_directory, manifest_file_name(args.shard_index, args.shard_count))
+    manifest = Manifest(code_version(), files_version(LEXICONS))
+    if not args.force:
+        manifest = Manifest.load(manifest_path, manifest.code_version, manifest.lexicon_version)
+    # Generated specs are journaled, to resume an interrupted run
+    try:
+        checkpoint = Checkpoint(os.path.join(args.out_directory,
+                                             checkpoint_file_name(args.shard_index, args.shard_count)),
+                                args.checkpoint_every, args.resume,
+                                "{}:{}".format(manifest.code_version, manifest.lexicon_version))
+    except FileExistsError as e:
+        parser.error("{}: use --resume to continue it, or remove the checkpoint to start over".format(e))
+    # Canonicals of unchanged operations are reused from a previous dataset
+    previous_dataset = load_previous_dataset(args.previous_directory) if args.previous_directory else {}
+    stored_dataset = load_previous_dataset(args.out_directory, args.shard_index, args.shard_count, [args.format]) \
+        if manifest.specs else {}
+    try:
+        totals = generate_dataset(args.swaggers_directory, args.out_directory, args.jobs, previous_dataset,
+                                  ir_directory, selective, args.shard_index, args.shard_count, manifest,
+                                  stored_dataset, args.format, args.timeout,
+                                  args.memory_limit * 1024 * 1024 if args.memory_limit else None,
+                                  args.max_specs_per_worker, checkpoint)
+    finally:
+        for dataset in (previous_dataset, stored_dataset):
+            if isinstance(dataset, DatasetIndex):
+                dataset.close()
+
+    if environ.get('API2CAN_SPEC_CACHE'):
+        print("Spec cache: {} hits, {} misses".format(totals["cache_hits"], totals["cache_misses"]))
+    if previous_dataset:
+        print("Operations: {} reused, {} generated".format(totals["reused"], totals["generated"]))
+    if manifest.specs:
+        print("Specifications: {} unchanged, {} generated".format(totals["spliced"], totals["processed"]))
+    if totals["resumed"]:
+        print("Specifications: {} resumed from the checkpoint".format(totals["resumed"]))
+    if totals["failed"]:
+        print("{} specifications exceeded their budget, see {}".format(
+            totals["failed"], failure_report_name(args.shard_index, args.shard_count)))
 
-                with open("{}/API2Can-{}.json".format(out_directory,stage), "wt") as f:
-                    f.write(json.dumps(single_file_dataset, indent=4))
+
+if __name__ == "__main__":
+    main()
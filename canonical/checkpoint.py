@@ -0,0 +1,86 @@
+"""
+Checkpoints of a dataset generation run: the records of the specifications generated so far,
+appended to a JSON Lines journal which is synced to the disk periodically, so that an
+interrupted run can be resumed (see the --resume option of api2can_gen.py).
+"""
+import os
+from collections import OrderedDict
+
+from canonical.dataset_io import JsonlWriter, read_jsonl
+
+
+def checkpoint_file_name(shard_index=None, shard_count=1):
+    """Get the name of the checkpoint of a run, or of a shard of it (see dataset_shards)."""
+    if shard_index is None or shard_count == 1:
+        return "checkpoint.jsonl"
+    return "checkpoint.shard-{}-of-{}.jsonl".format(shard_index, shard_count)
+
+
+class Checkpoint(object):
+    """Journal of the specifications generated by a run, and of their records.
+
+    An entry is added for each generated specification; the journal is synced
+    to the disk every interval entries, and when it is closed. The checkpoint of
+    a resumed run starts with the (complete) entries of the interrupted one,
+    which are the only ones held in memory.
+
+    Args:
+        path: path of the journal.
+        interval: number of entries between two syncs.
+        resume: whether to keep the entries of the journal of an interrupted run.
+        version: version of the code and lexicons of the run; the entries of
+                 another version are not resumed.
+
+    Raises:
+        FileExistsError: if the journal of an interrupted run has entries, and
+                         they are not resumed (it has to be removed first).
+    """
+
+    def __init__(self, path, interval=20, resume=False, version=None):
+        self.path = path
+        self.interval = interval
+        self.version = version
+        self.entries = OrderedDict()
+        if not resume and os.path.exists(path) and os.path.getsize(path) > 0:
+            raise FileExistsError("{} holds the progress of an interrupted run".format(path))
+        if resume and os.path.exists(path):
+            for entry in read_jsonl(path):
+                if entry.get("version") == version:
+                    self.entries[entry["api"]] = entry
+
+        # The journal is written again, without the incomplete entry of an interruption
+        tmp_path = path + ".tmp"
+        with JsonlWriter(tmp_path) as writer:
+            writer.write_all(self.entries.values())
+            writer.sync()
+        os.replace(tmp_path, path)
+        self._writer = JsonlWriter(path, append=True)
+        self._pending = 0
+
+    def get(self, api_name, spec_hash):
+        """Get the entry of a specification, or None if it was not generated from the same content."""
+        entry = self.entries.get(api_name)
+        return entry if entry is not None and entry["sha256"] == spec_hash else None
+
+    def add(self, api_name, spec_hash, records, reused=0, error=None):
+        """Add the records of a generated specification (error is "" for a spec which cannot be parsed)."""
+        self._writer.write(OrderedDict([("api", api_name), ("sha256", spec_hash), ("version", self.version),
+                                        ("records", records), ("reused", reused), ("error", error)]))
+        self._pending += 1
+        if self._pending >= self.interval:
+            self.sync()
+
+    def sync(self):
+        self._writer.sync()
+        self._pending = 0
+
+    def close(self):
+        """Sync and close the journal, which is kept to resume the run."""
+        if not self._writer.closed:
+            self.sync()
+            self._writer.close()
+
+    def remove(self):
+        """Close and remove the journal of a completed run."""
+        self._writer.close()
+        os.remove(self.path)
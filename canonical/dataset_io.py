@@ -0,0 +1,298 @@
+"""
+Streaming writers and readers of the datasets, in the pretty-printed JSON format
+(API2Can-{stage}.json) or in the JSON Lines format (API2Can-{stage}.jsonl, or .jsonl.gz
+when compressed) with one operation per line.
+
+Usage (convert a JSON Lines dataset to the pretty-printed format):
+    PYTHONPATH=. python3 canonical/dataset_io.py JSONL_FILE [JSON_FILE]
+"""
+import gzip
+import json
+import os
+import sys
+import tempfile
+from collections import OrderedDict
+
+FORMATS = ("json", "jsonl", "jsonl.gz")
+
+
+def dataset_format(path):
+    """Get the format of a dataset file from its name (see FORMATS)."""
+    for output_format in ("jsonl.gz", "jsonl"):
+        if path.endswith("." + output_format):
+            return output_format
+    return "json"
+
+
+def _open_text(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class JsonlWriter(object):
+    """Streaming writer of a JSON Lines dataset, gzip-compressed when the path ends with .gz.
+
+    The records are written as they come, one per line, so the memory does not
+    grow with the dataset and the records written before an interruption are kept.
+    With append, the records are added to the end of an existing file.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.count = 0
+        self._file = _open_text(path, "at" if append else "wt")
+
+    def write(self, record):
+        self._file.write(json.dumps(record))
+        self._file.write("\n")
+        self.count += 1
+
+    def write_all(self, records):
+        """Write the records (e.g. of a specification), and flush them to the file."""
+        for record in records:
+            self.write(record)
+        self._file.flush()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def sync(self):
+        """Flush the records written so far to the disk."""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if exc_type is None:
+            self.close()
+        else:
+            # The file is left unterminated, not passed off as a complete dataset
+            self._file.close()
+
+
+class JsonWriter(JsonlWriter):
+    """Streaming writer of a pretty-printed JSON dataset.
+
+    The file is the same as json.dumps(records, indent=4), without holding the records.
+    """
+
+    def write(self, record):
+        self._file.write(",\n" if self.count else "[\n")
+        self._file.write("\n".join("    " + line for line in json.dumps(record, indent=4).split("\n")))
+        self.count += 1
+
+    def close(self):
+        if not self.closed:
+            self._file.write("\n]" if self.count else "[]")
+        self._file.close()
+
+
+def dataset_writer(path):
+    """Get the streaming writer of a dataset file, in the format of its name."""
+    return JsonWriter(path) if dataset_format(path) == "json" else JsonlWriter(path)
+
+
+def read_jsonl(path):
+    """Stream the records of a JSON Lines dataset (gzip-compressed when the path ends with .gz).
+
+    The last line of a dataset whose writer was interrupted may be incomplete:
+    it is skipped, as is the unterminated end of a gzip stream.
+    """
+    with _open_text(path, "rt") as f:
+        try:
+            for line in f:
+                if not line.endswith("\n"):
+                    return
+                if line.strip():
+                    yield json.loads(line)
+        except EOFError:
+            return
+
+
+def read_json(path, chunk_size=1 << 16):
+    """Stream the records of a JSON dataset (a JSON array), one at a time.
+
+    The file is read by chunks, and each record is decoded as soon as it is
+    complete, so the memory holds one record (and a chunk) instead of the dataset.
+
+    Raises:
+        ValueError: if the file is not a JSON array, e.g. the dataset of an interrupted run.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def skip_space():
+            # Get the next non-space character (reading more of the file if needed), "" at the end
+            nonlocal buffer, pos, eof
+            while True:
+                while pos < len(buffer) and buffer[pos] in " \t\r\n":
+                    pos += 1
+                if pos < len(buffer) or eof:
+                    return buffer[pos:pos + 1]
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+
+        if skip_space() != "[":
+            raise ValueError("{} is not a JSON array".format(path))
+        pos += 1
+        if skip_space() == "]":
+            return
+        while True:
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                complete = end < len(buffer) or eof  # e.g. a number may go on in the next chunk
+            except ValueError:
+                if eof:
+                    raise ValueError("{} ends with an incomplete record".format(path))
+                complete = False
+            if not complete:
+                # The record goes on in the next chunk(s): read as much as it holds so far
+                chunk = f.read(max(chunk_size, len(buffer) - pos))
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            yield record
+            pos = end
+            separator = skip_space()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError("{} has no ',' or ']' after record".format(path))
+            pos += 1
+            skip_space()
+
+
+def read_dataset(path):
+    """Stream the records of a dataset file, in the format of its name."""
+    if dataset_format(path) == "json":
+        yield from read_json(path)
+    else:
+        yield from read_jsonl(path)
+
+
+class StoredRecords(object):
+    """Records of an API in a DatasetIndex, read from the copy of the datasets each time they are iterated.
+
+    It is small to pickle (a path and spans), so a worker process reads the records itself.
+    """
+
+    __slots__ = ('path', 'spans', 'count')
+
+    def __init__(self, path, spans):
+        self.path = path
+        self.spans = spans
+        self.count = sum(count for _, _, count in spans)
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        with open(self.path, "rb") as f:
+            for offset, size, _ in self.spans:
+                f.seek(offset)
+                for line in f.read(size).splitlines():
+                    yield json.loads(line.decode("utf-8"))
+
+
+class DatasetIndex(object):
+    """Records of datasets grouped by the file of their API, without holding the records in memory.
+
+    The records of the added datasets are copied, as they are streamed, to a
+    temporary JSON Lines file; the index only holds the spans of the records of
+    each API in that file. The copy also keeps the records of datasets which are
+    overwritten while the index is used (e.g. by a run in the same directory).
+    """
+
+    def __init__(self):
+        fd, self.path = tempfile.mkstemp(prefix="API2Can-index-", suffix=".jsonl")
+        self._file = os.fdopen(fd, "wb")
+        self._spans = OrderedDict()
+
+    def add_dataset(self, path):
+        """Add the records of a dataset file, after the records of the previous ones.
+
+        Raises:
+            ValueError: if the dataset cannot be read (e.g. the dataset of an
+                        interrupted run); none of its records are added.
+        """
+        start = self._file.tell()
+        spans = OrderedDict()
+        try:
+            for record in read_dataset(path):
+                line = (json.dumps(record) + "\n").encode("utf-8")
+                api_spans = spans.setdefault(record.get("api"), [])
+                offset = self._file.tell()
+                if api_spans and api_spans[-1][0] + api_spans[-1][1] == offset:
+                    api_spans[-1][1] += len(line)
+                    api_spans[-1][2] += 1
+                else:
+                    api_spans.append([offset, len(line), 1])
+                self._file.write(line)
+        except ValueError:
+            self._file.seek(start)
+            self._file.truncate()
+            raise
+        self._file.flush()
+        for api, api_spans in spans.items():
+            self._spans.setdefault(api, []).extend(api_spans)
+
+    def get(self, api, default=None):
+        """Get the StoredRecords of an API, or default if the datasets have none."""
+        if api not in self._spans:
+            return default
+        return StoredRecords(self.path, self._spans[api])
+
+    def __contains__(self, api):
+        return api in self._spans
+
+    def __len__(self):
+        return len(self._spans)
+
+    def close(self):
+        """Remove the copy of the records."""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def jsonl_to_json(jsonl_path, json_path=None):
+    """Convert a JSON Lines dataset to the pretty-printed format, one record at a time.
+
+    Args:
+        jsonl_path: path of the .jsonl or .jsonl.gz file.
+        json_path: path of the .json file; by default, jsonl_path with the .json extension.
+
+    Returns:
+        The path of the .json file, and its number of records.
+    """
+    if json_path is None:
+        json_path = jsonl_path[:-len(dataset_format(jsonl_path))] + "json"
+    with JsonWriter(json_path) as writer:
+        for record in read_jsonl(jsonl_path):
+            writer.write(record)
+    return json_path, writer.count
+
+
+def main():
+    if len(sys.argv) < 2 or dataset_format(sys.argv[1]) == "json":
+        print(__doc__)
+        sys.exit(1)
+    json_path, count = jsonl_to_json(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None)
+    print("{}: {} operations".format(json_path, count))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Sharding of the dataset generation over several nodes, and merge of the shards.
+
+Usage:
+    PYTHONPATH=. python3 canonical/dataset_shards.py OUT_DIRECTORY SHARD_DIRECTORY [SHARD_DIRECTORY ...]
+        [--format json|jsonl|jsonl.gz]
+
+Each node runs api2can_gen.py with --shard-index I --shard-count N, and writes the
+API2Can-{stage}.shard-I-of-N.json files of the specifications of its shard; the merge
+combines the shards into the API2Can-{stage}.json files of a run on a single node.
+"""
+import argparse
+import glob
+import hashlib
+import heapq
+import os
+import re
+
+from canonical.dataset_io import FORMATS, dataset_writer, read_dataset
+
+STAGES = ["test", "validation", "train"]
+
+_SHARD_FILE = re.compile(r"API2Can-(\w+)\.shard-(\d+)-of-(\d+)\.(json|jsonl|jsonl\.gz)$")
+
+
+def shard_of(api_name, shard_count):
+    """Get the shard of a specification, from a stable hash of its file name."""
+    digest = hashlib.sha256(api_name.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") % shard_count
+
+
+def stage_file_name(stage, shard_index=None, shard_count=1, output_format="json"):
+    """Get the name of the dataset file of a stage, or of a shard of it, in a format of dataset_io.FORMATS."""
+    if shard_index is None or shard_count == 1:
+        return "API2Can-{}.{}".format(stage, output_format)
+    return "API2Can-{}.shard-{}-of-{}.{}".format(stage, shard_index, shard_count, output_format)
+
+
+def write_stage(path, records):
+    """Write the records of a stage, and get their number."""
+    with dataset_writer(path) as writer:
+        for record in records:
+            writer.write(record)
+    return writer.count
+
+
+def find_shards(shard_directories, stage):
+    """Get the files of the shards of a stage, by shard index.
+
+    Raises:
+        ValueError: if the shards do not come from the same shard count, or
+                    some shards are missing or duplicated.
+    """
+    shards, counts = {}, set()
+    for directory in shard_directories:
+        for path in glob.glob(os.path.join(directory, "API2Can-{}.shard-*".format(stage))):
+            match = _SHARD_FILE.search(path)
+            if match is None or match.group(1) != stage:
+                continue
+            index, count = int(match.group(2)), int(match.group(3))
+            if index in shards:
+                raise ValueError("shard {} of {} is in {} and {}".format(index, stage, shards[index], path))
+            shards[index] = path
+            counts.add(count)
+
+    if len(counts) != 1:
+        raise ValueError("the shards of {} come from the shard counts {}".format(stage, sorted(counts)))
+    missing = sorted(set(range(counts.pop())) - set(shards))
+    if missing:
+        raise ValueError("missing shards of {}: {}".format(stage, missing))
+    return shards
+
+
+def merge_stage(shard_paths):
+    """Merge the records of the shards of a stage, in the order of a run on a single node.
+
+    The records of a specification are produced (in order) by a single shard,
+    and a node writes the specifications in the order of their file names, so
+    the (streamed) records of the shards are merged by API name, keeping their order.
+    """
+    return heapq.merge(*[read_dataset(path) for path in shard_paths], key=lambda record: record.get("api") or "")
+
+
+def merge_shards(out_directory, shard_directories, output_format="json"):
+    """Merge the shards of the datasets (of any format) into the API2Can-{stage} files of out_directory.
+
+    Returns:
+        The number of records of each stage.
+    """
+    sizes = {}
+    os.makedirs(out_directory, exist_ok=True)
+    for stage in STAGES:
+        shards = find_shards(shard_directories, stage)
+        records = merge_stage([shards[index] for index in sorted(shards)])
+        sizes[stage] = write_stage(os.path.join(out_directory, stage_file_name(stage, output_format=output_format)),
+                                   records)
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge the shards of the API2Can datasets")
+    parser.add_argument("out_directory")
+    parser.add_argument("shard_directories", nargs="+")
+    parser.add_argument("--format", choices=FORMATS, default="json", help="format of the merged datasets")
+    args = parser.parse_args()
+    try:
+        sizes = merge_shards(args.out_directory, args.shard_directories, args.format)
+    except ValueError as e:
+        parser.exit(1, "Unable to merge: {}\n".format(e))
+    for stage in STAGES:
+        print("{}: {} operations".format(stage, sizes[stage]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Manifest of the generated datasets: the content hash of each specification, with the
+versions of the code and of the lexicons which produced its operations, so that a run
+only regenerates the new or changed specifications.
+"""
+import hashlib
+import json
+import os
+import tempfile
+from collections import OrderedDict
+
+MANIFEST_FORMAT_VERSION = 1
+# Packages whose code produces the operations and their canonical utterances
+CODE_PACKAGES = ("canonical", "swagger", "utils")
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def manifest_file_name(shard_index=None, shard_count=1):
+    """Get the name of the manifest of a run, or of a shard of it (see dataset_shards)."""
+    if shard_index is None or shard_count == 1:
+        return "manifest.json"
+    return "manifest.shard-{}-of-{}.json".format(shard_index, shard_count)
+
+
+def content_hash(path):
+    """Get the sha256 of the content of a file, read by chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def files_version(paths):
+    """Get the version of a set of files: a hash of their names and contents (missing files included)."""
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(os.path.basename(path).encode("utf-8"))
+        h.update(content_hash(path).encode("utf-8") if os.path.exists(path) else b"-")
+    return h.hexdigest()
+
+
+def code_version(packages=CODE_PACKAGES):
+    """Get the version of the code: a hash of the python files of its packages."""
+    paths = []
+    for package in packages:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT, package)):
+            dirnames.sort()
+            paths.extend(os.path.join(dirpath, f) for f in sorted(filenames) if f.endswith(".py"))
+    return files_version(paths)
+
+
+class Manifest(object):
+    """Content hash, code and lexicon versions, and number of operations of the generated specifications.
+
+    An entry is current when the specification, the code and the lexicons did
+    not change since its records were generated: the stored records of the
+    specification can then be spliced in the datasets instead of being generated.
+
+    Attributes:
+        code_version: version of the code of the run (see code_version).
+        lexicon_version: version of the lexicons of the run (see files_version).
+        specs: entries of the specifications by API name; the operations of an
+               entry is the number of its records, None if the spec cannot be parsed.
+    """
+
+    def __init__(self, code_version, lexicon_version, specs=None):
+        self.code_version = code_version
+        self.lexicon_version = lexicon_version
+        self.specs = specs if specs is not None else OrderedDict()
+
+    @staticmethod
+    def load(path, code_version, lexicon_version):
+        """Load the manifest of a previous run, for a run of the given versions.
+
+        Returns:
+            The Manifest, without entries if there is no (readable) manifest at path.
+        """
+        manifest = Manifest(code_version, lexicon_version)
+        try:
+            with open(path, "r") as f:
+                content = json.load(f, object_pairs_hook=OrderedDict)
+        except (OSError, ValueError):
+            return manifest
+        if content.get("format") == MANIFEST_FORMAT_VERSION:
+            manifest.specs = content.get("specs", OrderedDict())
+        return manifest
+
+    def save(self, path):
+        """Write the manifest, atomically, so that an interrupted run keeps the previous one."""
+        content = OrderedDict([("format", MANIFEST_FORMAT_VERSION), ("specs", self.specs)])
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wt") as f:
+                json.dump(content, f, indent=4)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def is_current(self, api_name, spec_hash):
+        """Whether the stored records of a specification were generated from the same content, code and lexicons."""
+        entry = self.specs.get(api_name)
+        return entry is not None and entry["sha256"] == spec_hash and self.same_versions(api_name)
+
+    def same_versions(self, api_name):
+        """Whether the stored records of a specification were generated by the same code and lexicons."""
+        entry = self.specs.get(api_name)
+        return entry is not None and entry["code_version"] == self.code_version and \
+            entry["lexicon_version"] == self.lexicon_version
+
+    def stored_records(self, api_name, spec_hash, records):
+        """Get the stored records of a specification which can be spliced in the datasets.
+
+        Args:
+            api_name: name of the API.
+            spec_hash: content hash of the specification.
+            records: records of the API in the stored datasets.
+
+        Returns:
+            The records, or None if the specification must be generated again
+            (see failed for the specifications which cannot be parsed).
+        """
+        if not self.is_current(api_name, spec_hash):
+            return None
+        operations = self.specs[api_name]["operations"]
+        if operations is None:
+            return []
+        # The stored datasets may have been partially overwritten by an interrupted run
+        return records if len(records) == operations else None
+
+    def failed(self, api_name):
+        """Whether the specification of an entry cannot be parsed."""
+        return self.specs[api_name]["operations"] is None
+
+    def update(self, api_name, spec_hash, operations):
+        self.specs[api_name] = OrderedDict([("sha256", spec_hash), ("code_version", self.code_version),
+                                            ("lexicon_version", self.lexicon_version),
+                                            ("operations", operations)])
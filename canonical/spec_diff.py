@@ -0,0 +1,133 @@
+"""
+Operation-level diff of two versions of a specification, used to only regenerate
+the canonical utterances of the operations which changed.
+
+Usage:
+    PYTHONPATH=. python3 canonical/spec_diff.py OLD_SWAGGER NEW_SWAGGER
+"""
+import hashlib
+import json
+import sys
+from collections import OrderedDict
+
+from swagger.entities import Param
+
+# Fields of an analysed operation which are inputs of the canonical generation
+FINGERPRINT_FIELDS = ("verb", "url", "summary", "desc", "operation_id", "base_path", "intent")
+PARAM_FIELDS = ("name", "required", "is_auth_param", "location", "type", "pattern", "example", "desc")
+
+
+def _fingerprint(fields, params):
+    content = json.dumps([fields, params], default=str, separators=(",", ":"))
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def operation_fingerprint(operation):
+    """Fingerprint of an analysed Operation: verb, url, params, summary, description (and ids)."""
+    # Empty values are dropped by Operation.to_json and Param.to_json, so they count as None
+    fields = [getattr(operation, field, None) or None for field in FINGERPRINT_FIELDS]
+    params = [list(param.to_tuple()) for param in operation.params or []]
+    return _fingerprint(fields, params)
+
+
+def record_fingerprint(record):
+    """Fingerprint of an operation of a generated dataset (an Operation.to_json() dict)."""
+    fields = [record.get(field) or None for field in FINGERPRINT_FIELDS]
+    params = [[param.get(field) for field in PARAM_FIELDS] for param in record.get("params") or []]
+    return _fingerprint(fields, params)
+
+
+def operation_key(verb, url):
+    return "{} {}".format(verb, url)
+
+
+class SpecDiff(object):
+    """Differences between the operations of two versions of a specification.
+
+    Attributes:
+        added: keys ("verb url") of the operations which are only in the new version.
+        removed: keys of the operations which are only in the old version.
+        changed: keys of the operations whose params, summary or description changed.
+        unchanged: keys of the operations which are identical in both versions.
+    """
+
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.unchanged = []
+
+    def to_json(self):
+        return OrderedDict([("added", self.added), ("removed", self.removed), ("changed", self.changed),
+                            ("unchanged", self.unchanged)])
+
+    def summary(self):
+        return "{} unchanged (reused), {} changed, {} added, {} removed".format(
+            len(self.unchanged), len(self.changed), len(self.added), len(self.removed))
+
+
+def diff_fingerprints(old, new):
+    """Diff two lists of (key, fingerprint) pairs, in the order of the new version."""
+    old_fingerprints = OrderedDict(old)
+    new_keys = set()
+    diff = SpecDiff()
+    for key, fingerprint in new:
+        new_keys.add(key)
+        if key not in old_fingerprints:
+            diff.added.append(key)
+        elif old_fingerprints[key] == fingerprint:
+            diff.unchanged.append(key)
+        else:
+            diff.changed.append(key)
+    diff.removed = [key for key in old_fingerprints if key not in new_keys]
+    return diff
+
+
+def diff_operations(old_operations, new_operations):
+    """Diff the analysed operations of two versions of a specification."""
+    return diff_fingerprints(
+        [(operation_key(o.verb, o.url), operation_fingerprint(o)) for o in old_operations],
+        [(operation_key(o.verb, o.url), operation_fingerprint(o)) for o in new_operations])
+
+
+def regenerate(operations, previous_records, generate):
+    """Get the dataset records of the operations of a new version of a specification.
+
+    The records of the previous version are reused for the operations whose
+    fingerprint did not change; the other operations go through generate.
+
+    Args:
+        operations: analysed operations of the new version.
+        previous_records: dataset records (Operation.to_json() dicts) of the previous version.
+        generate: function generating the record of an operation.
+
+    Returns:
+        A tuple with the records, in the order of the operations, and the SpecDiff
+        of the versions (its unchanged operations are the reused ones).
+    """
+    by_fingerprint = {}
+    old = []
+    for record in previous_records:
+        fingerprint = record_fingerprint(record)
+        by_fingerprint[fingerprint] = record
+        old.append((operation_key(record.get("verb"), record.get("url")), fingerprint))
+
+    records, new = [], []
+    for operation in operations:
+        fingerprint = operation_fingerprint(operation)
+        new.append((operation_key(operation.verb, operation.url), fingerprint))
+        if fingerprint in by_fingerprint:
+            records.append(OrderedDict(by_fingerprint[fingerprint]))
+        else:
+            records.append(generate(operation))
+    return records, diff_fingerprints(old, new)
+
+
+if __name__ == "__main__":
+    from swagger.swagger_analysis import load_or_analyse
+
+    old_api = load_or_analyse(sys.argv[1])
+    new_api = load_or_analyse(sys.argv[2])
+    diff = diff_operations(old_api.operations, new_api.operations)
+    print(json.dumps(diff.to_json(), indent=4))
+    print(diff.summary())
@@ -0,0 +1,266 @@
+"""
+Pool of recyclable worker processes, which run each task (a specification) under a
+wall-clock and a memory budget.
+
+A task which runs out of time is killed with its worker, a task which runs out of
+memory gets a MemoryError and its worker is recycled; either way the task gets a
+TaskFailure with the stage it was stuck in (see report_stage), and the pool carries
+on with a new worker.
+"""
+import multiprocessing
+import time
+import traceback
+from multiprocessing.connection import wait
+
+try:
+    import resource
+except ImportError:  # not a Unix system: the memory budget is not enforced
+    resource = None
+
+STAGE_SIZE = 256
+_POLL_TIME = 0.1
+
+_stage = None  # stage buffer of a worker process, shared with the pool
+
+
+def report_stage(stage):
+    """Record the stage of the task of a worker process, reported if the task exceeds its budget.
+
+    Outside of a worker process, this does nothing.
+    """
+    if _stage is not None:
+        _stage.value = stage.encode("utf-8")[:STAGE_SIZE - 1]
+
+
+def in_worker():
+    """Whether the process is a worker of a BudgetedPool."""
+    return _stage is not None
+
+
+def _read_stage(stage):
+    return stage.value.decode("utf-8", "replace")
+
+
+class TaskFailure(object):
+    """Failure of a task which exceeded its budget, or crashed its worker.
+
+    Attributes:
+        reason: "timeout", "memory", "crash" (the worker died) or "error" (an exception).
+        stage: stage of the task when it failed (see report_stage).
+        elapsed: wall-clock time of the task, in seconds.
+        detail: details of the failure, e.g. the traceback of an error.
+    """
+
+    __slots__ = ('reason', 'stage', 'elapsed', 'detail')
+
+    def __init__(self, reason, stage="", elapsed=None, detail=None):
+        self.reason = reason
+        self.stage = stage
+        self.elapsed = elapsed
+        self.detail = detail
+
+    def __str__(self):
+        return "{} after {:.1f}s in stage '{}'".format(self.reason, self.elapsed or 0.0, self.stage)
+
+
+def _data_size():
+    """Get the size of the data segment of the process (VmData), in bytes, or None if unknown."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmData:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _limit_memory(memory_limit):
+    """Let the task of the worker allocate at most memory_limit bytes more than the worker holds."""
+    if memory_limit is None or resource is None:
+        return
+    used = _data_size()
+    if used is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    limit = used + memory_limit
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+def _work(conn, stage, started, func, initializer, initargs, memory_limit):
+    """Main loop of a worker process: run the (index, task) it receives until it gets None."""
+    global _stage
+    _stage = stage
+    if initializer is not None:
+        initializer(*initargs)
+    while True:
+        message = conn.recv()
+        if message is None:
+            return
+        index, task = message
+        stage.value = b""
+        # The budget of the task starts now, not when the worker was still initializing
+        started.value = time.time()
+        _limit_memory(memory_limit)
+        try:
+            result = func(task)
+        except MemoryError:
+            # The worker is recycled, as its memory may be fragmented
+            conn.send((index, TaskFailure("memory", _read_stage(stage))))
+            return
+        except Exception:
+            result = TaskFailure("error", _read_stage(stage), detail=traceback.format_exc())
+        conn.send((index, result))
+
+
+class _Worker(object):
+    """A worker process of a BudgetedPool, seen from the pool."""
+
+    def __init__(self, pool):
+        self.stage = multiprocessing.Array('c', STAGE_SIZE, lock=False)
+        self.started = multiprocessing.Value('d', 0.0, lock=False)  # start time of the task, 0 until it starts
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_work, args=(child_conn, self.stage, self.started, pool.func, pool.initializer, pool.initargs,
+                                pool.memory_limit),
+            daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.index = None  # index of the task of the worker, None if idle
+        self.done = 0
+
+    def run(self, index, task):
+        self.index = index
+        self.started.value = 0.0
+        try:
+            self.conn.send((index, task))
+        except OSError:
+            pass  # the worker died, which is seen from its sentinel
+
+    def elapsed(self):
+        return time.time() - self.started.value if self.started.value else 0.0
+
+    def failure(self, reason, detail=None):
+        return TaskFailure(reason, _read_stage(self.stage), self.elapsed(), detail)
+
+    def crash(self):
+        self.process.join(1)
+        return self.failure("crash", "exit code {}".format(self.process.exitcode))
+
+    def stop(self):
+        """Stop the worker once it is done with its tasks."""
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(5)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class BudgetedPool(object):
+    """Pool of worker processes running a function on tasks, each under a wall-clock and a memory budget.
+
+    Args:
+        func: function of a task (picklable), run in the workers.
+        processes: number of worker processes.
+        initializer, initargs: function run by each worker when it starts (e.g. to load models).
+        timeout: wall-clock budget of a task, in seconds; None for no limit.
+        memory_limit: memory a task can allocate in its worker, in bytes; None for no limit.
+        max_tasks: number of tasks after which a worker is replaced by a new one; None to keep it.
+
+    Raises:
+        ValueError: if processes is lower than 1.
+    """
+
+    def __init__(self, func, processes=1, initializer=None, initargs=(), timeout=None, memory_limit=None,
+                 max_tasks=None):
+        if processes < 1:
+            raise ValueError("a pool needs at least one worker process, not {}".format(processes))
+        self.func = func
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.max_tasks = max_tasks
+        self.recycled = 0
+        self._workers = []
+
+    def imap(self, tasks):
+        """Run the function on the tasks, and get the results in the order of the tasks.
+
+        Returns:
+            A generator of the results; the result of a task which exceeded its
+            budget, or whose worker died, is a TaskFailure.
+        """
+        tasks = list(tasks)
+        results = {}
+        next_task = next_result = 0
+        while next_result < len(tasks):
+            while len(self._workers) < self.processes:
+                self._workers.append(_Worker(self))
+            for worker in self._workers:
+                if worker.index is None and next_task < len(tasks):
+                    worker.run(next_task, tasks[next_task])
+                    next_task += 1
+
+            busy = [worker for worker in self._workers if worker.index is not None]
+            wait_time = None
+            if self.timeout is not None:
+                # Workers which did not start their task yet are polled
+                wait_time = max(0.0, min(self.timeout - worker.elapsed() if worker.started.value else _POLL_TIME
+                                         for worker in busy))
+            ready = set(wait([worker.conn for worker in busy] + [worker.process.sentinel for worker in busy],
+                             wait_time))
+
+            for worker in busy:
+                recycle = False
+                if worker.conn in ready:
+                    try:
+                        index, result = worker.conn.recv()
+                    except EOFError:
+                        index, result = worker.index, worker.crash()
+                    if isinstance(result, TaskFailure):
+                        result.elapsed = worker.elapsed()
+                        recycle = result.reason != "error"
+                    results[index] = result
+                    worker.done += 1
+                    recycle = recycle or (self.max_tasks is not None and worker.done >= self.max_tasks)
+                elif worker.process.sentinel in ready:
+                    results[worker.index] = worker.crash()
+                    recycle = True
+                elif self.timeout is not None and worker.started.value and worker.elapsed() >= self.timeout:
+                    results[worker.index] = worker.failure("timeout")
+                    worker.kill()
+                    recycle = True
+                else:
+                    continue
+
+                worker.index = None
+                if recycle:
+                    worker.stop()
+                    self._workers.remove(worker)
+                    self.recycled += 1
+
+            while next_result in results:
+                yield results.pop(next_result)
+                next_result += 1
+
+    def close(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,65 @@
+"""
+Mock server answering the requests of swagger specifications with their example responses.
+
+Usage:
+    PYTHONPATH=. python3 rest/mock_server.py SPEC [SPEC ...] [--port 8081]
+
+The default response of an operation is its lowest 2xx status; another status can be
+asked for with the X-Mock-Status header (or the mock_status query parameter).
+"""
+import argparse
+import logging
+import os
+import sys
+
+from flask import Flask, Response, request
+
+sys.path.append(os.getcwd())
+from swagger.mock_responder import MockResponder
+from swagger.spec_cache import SpecCache
+from swagger.swagger_parser import SwaggerParser
+
+STATUS_HEADER = "X-Mock-Status"
+METHODS = ["GET", "POST", "PUT", "DELETE", "PATCH", "HEAD", "OPTIONS"]
+NOT_FOUND = b'{"message": "no mocked operation matches the request"}'
+
+
+def mock_response(responder, path):
+    """Build the flask response of the current request."""
+    status = request.headers.get(STATUS_HEADER) or request.args.get("mock_status")
+    response = responder.respond(request.method, path, status)
+    if response is None:
+        return Response(NOT_FOUND, 404, mimetype="application/json")
+    return Response(response.body, response.status, mimetype="application/json")
+
+
+def create_app(responder):
+    app = Flask(__name__)
+
+    @app.route("/", defaults={"path": ""}, methods=METHODS)
+    @app.route("/<path:path>", methods=METHODS)
+    def mock(path):
+        return mock_response(responder, "/" + path)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API2CAN mock server")
+    parser.add_argument("specs", nargs="+", help="swagger files to mock")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--lazy", action="store_true", help="build the responses on first use")
+    args = parser.parse_args()
+
+    spec_cache = SpecCache.from_env()
+    responder = MockResponder([SwaggerParser(spec, cache=spec_cache, lazy_definitions=True) for spec in args.specs],
+                              precompute=not args.lazy)
+    print("Mocking {} operations".format(len(responder)))
+
+    logging.getLogger("werkzeug").setLevel(logging.WARN)
+    create_app(responder).run(args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+import hashlib
 import logging
 import os
 import sys
@@ -5,8 +6,8 @@ import traceback
 import warnings
 import werkzeug
 from flask_cors import CORS
-from flask import Flask, jsonify, abort, request
-from flask_restx import Api, reqparse, fields, Resource
+from flask import Flask, jsonify, request
+from flask_restx import Api, reqparse, fields, Resource, abort
 
 from swagger.resource_delexicalization import delexicalize
 from swagger.templatetization import Templatetizer
@@ -15,8 +16,12 @@ sys.path.append(os.getcwd())
 from canonical.api2can_gen import TrainingExprGenerator
 from canonical.rule_based import RuleBasedCanonicalGenerator, param_sampler
 from swagger.entities import API, Param, Operation
-from swagger.swagger_analysis import SwaggerAnalyser
+from swagger.swagger_analysis import load_or_analyse
 from swagger.resource_extractor import extract_resources
+from swagger.spec_cache import SpecCache
+from swagger.mock_responder import MockResponder
+from swagger.swagger_parser import SwaggerParser
+from rest.mock_server import mock_response
 
 app = Flask(__name__)
 CORS(app)
@@ -84,6 +89,9 @@ api_model = api.model('API', {
 
 expr_gen = TrainingExprGenerator()
 rule_gen = RuleBasedCanonicalGenerator()
+spec_cache = SpecCache.from_env()
+ir_directory = os.environ.get("API2CAN_IR_DIR")
+mock_responders = {}
 yaml_parser = reqparse.RequestParser()
 yaml_parser.add_argument('yaml', type=werkzeug.datastructures.FileStorage, location='files', required=True)
 
@@ -118,7 +126,7 @@ class Specs(Resource):
             ret = []
             for file in files:
                 yaml = file.stream.read().decode("utf-8")
-                doc = SwaggerAnalyser(swagger=yaml).analyse()
+                doc = load_or_analyse(swagger=yaml, ir_directory=ir_directory, cache=spec_cache)
                 ret.append(doc.to_json())
 
             return jsonify(ret)
@@ -127,6 +135,44 @@ class Specs(Resource):
             traceback.print_stack()
 
 
+@api.route("/mocks")
+class Mocks(Resource):
+    @api.expect(yaml_parser)
+    def post(self):
+        """
+        mocks the operations of the given swagger specs, under /mocks/<mock_id>/
+        """
+        files = list(request.files.values())
+        if not files:
+            abort(401, message="file is missing")
+        try:
+            yamls = [file.stream.read().decode("utf-8") for file in files]
+            mock_id = hashlib.sha256("\n".join(yamls).encode("utf-8")).hexdigest()[:16]
+            if mock_id not in mock_responders:
+                parsers = [SwaggerParser(swagger_yaml=yaml, cache=spec_cache, lazy_definitions=True) for yaml in yamls]
+                mock_responders[mock_id] = MockResponder(parsers)
+            return jsonify({
+                "mock_id": mock_id,
+                "url": "/mocks/{}".format(mock_id),
+                "operations": len(mock_responders[mock_id])
+            })
+        except Exception as e:
+            abort(501, message="Server is not able to process the request; {}".format(e))
+
+
+@api.route("/mocks/<string:mock_id>/<path:path>")
+class MockedOperation(Resource):
+    def get(self, mock_id, path):
+        """
+        answers a request with the example response of the matching mocked operation
+        """
+        if mock_id not in mock_responders:
+            abort(404, message="unknown mock {}".format(mock_id))
+        return mock_response(mock_responders[mock_id], "/" + path)
+
+    post = put = delete = patch = get
+
+
 @api.route("/operations/generate-canonicals")
 class Canonicals(Resource):
     @api.expect(canonical_parser, [operation_model])
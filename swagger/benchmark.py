@@ -0,0 +1,223 @@
+"""
+Micro-benchmarks of the swagger parsing pipeline.
+
+Usage:
+    PYTHONPATH=. python3 swagger/benchmark.py load [--synthetic N] [SPEC ...]
+    PYTHONPATH=. python3 swagger/benchmark.py validate [--synthetic N] [SPEC ...]
+    PYTHONPATH=. python3 swagger/benchmark.py selective [--synthetic N] [SPEC ...]
+    PYTHONPATH=. python3 swagger/benchmark.py memory [--synthetic N] [--corpus K] [SPEC ...]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import jinja2
+import yaml
+
+from swagger import spec_loader
+from swagger.swagger_parser import SwaggerParser, parse_specs
+
+
+def synthetic_spec(n_paths, prefix="collection"):
+    """Build a large swagger 2.0 document with n_paths paths and as many definitions."""
+    paths, definitions = {}, {}
+    for i in range(n_paths):
+        definitions["Item{}".format(i)] = {
+            "type": "object",
+            "required": ["id"],
+            "description": "A generated item definition " * 10,
+            "properties": {
+                "id": {"type": "integer", "format": "int64"},
+                "name": {"type": "string", "description": "name of the item"},
+                "tags": {"type": "array", "items": {"type": "string"}},
+                "parent": {"$ref": "#/definitions/Item{}".format(i - i % 10)},
+            }
+        }
+        paths["/{}{}/items/{{item_id}}".format(prefix, i)] = {
+            "parameters": [{"name": "item_id", "in": "path", "required": True, "type": "string"}],
+            "get": {
+                "summary": "get an item of {} {}".format(prefix, i),
+                "x-code-samples": [{"lang": "shell", "source": "curl https://example.com/v1/collection " * 20}],
+                "responses": {"200": {"description": "ok", "schema": {"$ref": "#/definitions/Item{}".format(i)}}}
+            },
+            "put": {
+                "summary": "update an item of {} {}".format(prefix, i),
+                "parameters": [{"name": "body", "in": "body", "required": True,
+                                "schema": {"$ref": "#/definitions/Item{}".format(i)}}],
+                "responses": {"200": {"description": "ok"}}
+            }
+        }
+    return {
+        "swagger": "2.0",
+        "info": {"title": "Synthetic", "version": "1.0"},
+        "host": "example.com",
+        "basePath": "/v1",
+        "schemes": ["https"],
+        "paths": paths,
+        "definitions": definitions,
+        "tags": [{"name": "{}{}".format(prefix, i), "description": "A generated tag " * 10} for i in range(n_paths)],
+    }
+
+
+def write_synthetic_specs(n_paths, directory):
+    """Write the synthetic spec as YAML and JSON files in the given directory."""
+    spec = synthetic_spec(n_paths)
+    yaml_path = os.path.join(directory, "synthetic.yaml")
+    json_path = os.path.join(directory, "synthetic.json")
+    with open(yaml_path, "wt") as f:
+        yaml.safe_dump(spec, f)
+    with open(json_path, "wt") as f:
+        json.dump(spec, f)
+    return [yaml_path, json_path]
+
+
+def write_synthetic_corpus(n_specs, n_paths, directory):
+    """Write n_specs synthetic specs, with their own paths, as YAML files in the given directory."""
+    paths = []
+    for i in range(n_specs):
+        path = os.path.join(directory, "corpus{}.yaml".format(i))
+        with open(path, "wt") as f:
+            yaml.safe_dump(synthetic_spec(n_paths, prefix="resource{}_".format(i)), f)
+        paths.append(path)
+    return paths
+
+
+def timeit(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def legacy_load(swagger_path):
+    with open(swagger_path, encoding="utf-8") as f:
+        text = f.read()
+    return yaml.safe_load(jinja2.Template(text).render())
+
+
+def bench_load(paths, repeat=3):
+    """Compare the legacy loading path (jinja2 + pure python YAML) to spec_loader."""
+    print("{:<40} {:>12} {:>12} {:>8}".format("spec", "legacy (s)", "loader (s)", "speedup"))
+    for path in paths:
+        legacy = timeit(lambda: legacy_load(path), repeat)
+        fast = timeit(lambda: spec_loader.load_path(path), repeat)
+        print("{:<40} {:>12.4f} {:>12.4f} {:>7.1f}x".format(os.path.basename(path)[-40:], legacy, fast,
+                                                            legacy / fast if fast else float('inf')))
+
+
+def peak_memory(func):
+    """Run func and get the peak size of the python allocations it made, in bytes."""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_selective(paths, repeat=3):
+    """Compare the time and peak memory of spec_loader.load_path and of the selective loader."""
+    print("{:<40} {:>10} {:>12} {:>10} {:>12}".format("spec", "full (s)", "full (MB)", "sel. (s)", "sel. (MB)"))
+    for path in paths:
+        results = []
+        for load in (spec_loader.load_path, spec_loader.load_path_selective):
+            results.append(timeit(lambda: load(path), repeat))
+            results.append(peak_memory(lambda: load(path)) / 1024.0 / 1024.0)
+        print("{:<40} {:>10.4f} {:>12.1f} {:>10.4f} {:>12.1f}".format(os.path.basename(path)[-40:], *results))
+
+
+def retained_memory(func):
+    """Run func and get the size of the python allocations still held by its result, in bytes."""
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def bench_memory(paths):
+    """Compare the memory held per operation by parsers of a corpus, with and without shared strings."""
+    def parse_separately():
+        return [SwaggerParser(path, lazy_definitions=True) for path in paths]
+
+    def parse_batch():
+        return [parser for _, parser in parse_specs(paths, lazy_definitions=True) if parser is not None]
+
+    print("{:<12} {:>8} {:>12} {:>12} {:>16}".format("parsing", "specs", "operations", "memory (MB)", "bytes/operation"))
+    for name, parse in (("separate", parse_separately), ("batch", parse_batch)):
+        parsers, size = retained_memory(parse)
+        operations = sum(len(actions) for parser in parsers for actions in parser.paths.values())
+        print("{:<12} {:>8} {:>12} {:>12.1f} {:>16.0f}".format(name, len(parsers), operations,
+                                                               size / 1024.0 / 1024.0, size / max(operations, 1)))
+        del parsers
+
+
+def validation_samples(parser):
+    """Get (definition name, example) pairs of the definitions of a parsed spec."""
+    samples = []
+    for def_name in parser.specification.get('definitions', {}):
+        example = parser.definitions_example.get(def_name)
+        if isinstance(example, dict):
+            samples.append((def_name, example))
+    return samples
+
+
+def bench_validate(paths, repeat=3):
+    """Compare the throughput of compiled and interpreted definition validation."""
+    print("{:<40} {:>10} {:>16} {:>16} {:>8}".format("spec", "samples", "interpreted/s", "compiled/s", "speedup"))
+    for path in paths:
+        parsers = [SwaggerParser(path, compiled_validators=compiled) for compiled in (False, True)]
+        samples = validation_samples(parsers[0])
+        if not samples:
+            continue
+
+        rates = []
+        for parser in parsers:
+            def run():
+                for def_name, example in samples:
+                    parser.validate_definition(def_name, example)
+
+            run()  # compile the validators before timing
+            rates.append(len(samples) / timeit(run, repeat))
+        print("{:<40} {:>10} {:>16.0f} {:>16.0f} {:>7.1f}x".format(os.path.basename(path)[-40:], len(samples),
+                                                                    rates[0], rates[1], rates[1] / rates[0]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API2CAN parsing benchmarks")
+    parser.add_argument("benchmark", choices=["load", "validate", "selective", "memory"])
+    parser.add_argument("specs", nargs="*", help="swagger files to benchmark")
+    parser.add_argument("--synthetic", type=int, default=0,
+                        help="also benchmark a generated spec with the given number of paths")
+    parser.add_argument("--corpus", type=int, default=20,
+                        help="number of generated specs of the memory benchmark")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_intermixed_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        specs = list(args.specs)
+        if args.benchmark == "memory":
+            if args.synthetic or not specs:
+                specs.extend(write_synthetic_corpus(args.corpus, args.synthetic or 100, tmp))
+        elif args.synthetic or not specs:
+            specs.extend(write_synthetic_specs(args.synthetic or 2000, tmp))
+
+        if args.benchmark == "load":
+            bench_load(specs, args.repeat)
+        elif args.benchmark == "validate":
+            bench_validate(specs, args.repeat)
+        elif args.benchmark == "selective":
+            bench_selective(specs, args.repeat)
+        elif args.benchmark == "memory":
+            bench_memory(specs)
+
+
+if __name__ == "__main__":
+    main()
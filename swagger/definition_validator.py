@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+import datetime
+import re
+
+import six
+
+_DEFINITION_REF = re.compile('#\/definitions\/(.*)')
+
+
+def definition_name_from_ref(ref):
+    """Get the definition name of the given $ref value (ex: "#/definitions/CustomDefinition")."""
+    return _DEFINITION_REF.sub(r'\1', ref)
+
+
+def _check_integer(value):
+    try:
+        # We accept string with integer ex: '123'
+        int(value)
+        return True
+    except ValueError:
+        return isinstance(value, six.integer_types) and not isinstance(value, bool)
+
+
+def _check_number(value):
+    return isinstance(value, (six.integer_types, float)) and not isinstance(value, bool)
+
+
+def _check_string(value):
+    return isinstance(value, (six.text_type, six.string_types, datetime.datetime))
+
+
+def _check_boolean(value):
+    return (isinstance(value, bool) or
+            (isinstance(value, (six.text_type, six.string_types,)) and
+             value.lower() in ['true', 'false'])
+            )
+
+
+def _check_nothing(value):
+    return False
+
+
+TYPE_CHECKERS = {
+    'integer': _check_integer,
+    'number': _check_number,
+    'string': _check_string,
+    'boolean': _check_boolean,
+}
+
+
+def type_checker(type_def):
+    """Get the function checking values of the given swagger type."""
+    if not isinstance(type_def, six.string_types):
+        return _check_nothing
+    return TYPE_CHECKERS.get(type_def, _check_nothing)
+
+
+class DefinitionValidator(object):
+    """Validator of a definition, compiled once from its specification.
+
+    The required keys are kept as they are in the spec and every property is
+    compiled into a checker function, so validating a dict is a single walk
+    over its items.
+    """
+
+    __slots__ = ('name', 'required', 'properties')
+
+    def __init__(self, name=None):
+        self.name = name
+        self.required = None
+        self.properties = {}
+
+    def __call__(self, dict_to_test):
+        """Check if the given dict matches the definition."""
+        if self.required is not None:
+            keys = dict_to_test.keys()
+            for req in self.required:
+                if req not in keys:
+                    return False
+
+        properties = self.properties
+        for key, value in dict_to_test.items():
+            if value is not None:
+                check = properties.get(key)
+                if check is None or not check(value):  # Extra arg or wrong type
+                    return False
+        return True
+
+
+class _RefChecker(object):
+    """Checker of a $ref property, bound to its validator on first use."""
+
+    __slots__ = ('validators', 'def_name', 'validator')
+
+    def __init__(self, validators, def_name):
+        self.validators = validators
+        self.def_name = def_name
+        self.validator = None
+
+    def __call__(self, value):
+        validator = self.validator
+        if validator is None:
+            validator = self.validator = self.validators.get(self.def_name)
+            if validator is None:  # reject unknown definition
+                return False
+        return validator(value)
+
+
+class DefinitionValidators(object):
+    """Compiled validators of the definitions of a specification.
+
+    Each definition is compiled on first use and cached; $refs are bound to the
+    validator of the referenced definition, so cycles between definitions are
+    handled without recompiling anything.
+    """
+
+    def __init__(self, definitions):
+        self.definitions = definitions
+        self._validators = {}
+
+    def get(self, def_name):
+        """Get the validator of the given definition.
+
+        Returns:
+            The DefinitionValidator, or None if the definition does not exist.
+        """
+        validator = self._validators.get(def_name)
+        if validator is None:
+            if def_name not in self.definitions:
+                return None
+            validator = self._validators[def_name] = DefinitionValidator(def_name)
+            self._compile_into(validator, self.definitions[def_name])
+        return validator
+
+    def compile(self, spec_def, def_name=None):
+        """Compile a definition which is not part of the specification (not cached)."""
+        validator = DefinitionValidator(def_name)
+        self._compile_into(validator, spec_def)
+        return validator
+
+    def _compile_into(self, validator, spec_def):
+        if 'required' in spec_def:
+            validator.required = spec_def['required']
+        validator.properties = dict((key, self._property_checker(prop_spec))
+                                    for key, prop_spec in spec_def.get('properties', {}).items())
+
+    def _property_checker(self, properties_spec):
+        if 'type' not in properties_spec.keys():
+            # Validate sub definition
+            if '$ref' not in properties_spec:
+                return _missing_key_checker('$ref')
+            return _RefChecker(self, definition_name_from_ref(properties_spec['$ref']))
+
+        elif properties_spec['type'] == 'array':
+            if 'items' not in properties_spec:
+                return _array_checker(_missing_key_checker('items'), None)
+            items = properties_spec['items']
+            item_type = type_checker(items['type']) if 'type' in items.keys() else None
+            item_ref = _RefChecker(self, definition_name_from_ref(items['$ref'])) if '$ref' in items.keys() else None
+            return _array_checker(item_type, item_ref)
+
+        else:  # Classic types
+            return type_checker(properties_spec['type'])
+
+
+def _array_checker(item_type, item_ref):
+    def check(value):
+        if not isinstance(value, list):
+            return False
+        # Check type
+        if item_type is not None and any(not item_type(item) for item in value):
+            return False
+        # Check ref
+        if item_ref is not None and any(not item_ref(item) for item in value):
+            return False
+        return True
+
+    return check
+
+
+def _missing_key_checker(key):
+    def check(value):
+        raise KeyError(key)
+
+    return check
+
+
+class DefinitionSignatureIndex(object):
+    """Index of the definitions by their key signature.
+
+    A dict can only match a definition if its keys with a value are properties
+    of the definition, and if it holds all the required keys of the definition.
+    The index maps property names and required-key sets to definitions, so only
+    the few definitions whose signature fits a dict need to be validated.
+    Definitions which do not follow the usual layout are always candidates.
+    """
+
+    def __init__(self, definitions):
+        self.names = []
+        self._by_property = {}
+        self._required = []
+        self._regular = set()
+        self._irregular = set()
+
+        for position, (def_name, spec_def) in enumerate(definitions.items()):
+            self.names.append(def_name)
+            signature = self._signature(spec_def)
+            if signature is None:
+                self._irregular.add(position)
+                self._required.append(None)
+                continue
+
+            properties, required = signature
+            self._regular.add(position)
+            self._required.append(required)
+            for prop_name in properties:
+                self._by_property.setdefault(prop_name, set()).add(position)
+
+    @staticmethod
+    def _signature(spec_def):
+        if not isinstance(spec_def, dict):
+            return None
+        properties = spec_def.get('properties', {})
+        required = spec_def.get('required') if 'required' in spec_def else ()
+        if not isinstance(properties, dict) or not isinstance(required, (list, tuple)):
+            return None
+        try:
+            return properties.keys(), frozenset(required)
+        except TypeError:  # unhashable required keys
+            return None
+
+    def candidates(self, dict_to_test):
+        """Get the names of the definitions which may match the given dict, in definition order."""
+        keys = [key for key, value in dict_to_test.items() if value is not None]
+        if keys:
+            sets = sorted((self._by_property.get(key, ()) for key in keys), key=len)
+            positions = set(sets[0])
+            for s in sets[1:]:
+                if not positions:
+                    break
+                positions.intersection_update(s)
+        else:
+            positions = set(self._regular)
+
+        all_keys = dict_to_test.keys()
+        positions = [position for position in positions if self._required[position] <= all_keys]
+        positions.extend(self._irregular)
+        return [self.names[position] for position in sorted(positions)]
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from swagger.path_router import PathRouter
+
+DEFAULT_STATUS = 200
+
+
+class MockResponse(object):
+    """Serialized example response of an operation."""
+
+    __slots__ = ('status', 'body')
+
+    def __init__(self, status, body):
+        self.status = status
+        self.body = body
+
+
+class MockOperation(object):
+    """Example responses of an operation (path template + http method), by status code.
+
+    Attributes:
+        responses: dict of MockResponse by status code (int, or str for 'default').
+        default: response sent when no status is asked for; the lowest 2xx status,
+                 else the lowest status code.
+    """
+
+    __slots__ = ('path_name', 'verb', 'responses', 'default')
+
+    def __init__(self, path_name, verb, examples):
+        self.path_name = path_name
+        self.verb = verb
+        self.responses = {}
+        for status, example in examples.items():
+            self.responses[status] = MockResponse(status if isinstance(status, int) else DEFAULT_STATUS,
+                                                  serialize(example))
+
+        statuses = [status for status in self.responses if isinstance(status, int)]
+        success = [status for status in statuses if 200 <= status < 300]
+        if success:
+            self.default = self.responses[min(success)]
+        elif statuses:
+            self.default = self.responses[min(statuses)]
+        else:
+            self.default = next(iter(self.responses.values()))
+
+    def response(self, status=None):
+        """Get the response with the given status code (the default one if None)."""
+        if status is None:
+            return self.default
+        response = self.responses.get(status)
+        if response is None and isinstance(status, str) and status.isdigit():
+            response = self.responses.get(int(status))
+        return response
+
+
+def serialize(example):
+    """Serialize an example as a JSON body (bytes)."""
+    return json.dumps(example, default=str).encode('utf-8')
+
+
+class MockResponder(object):
+    """Answer requests with the example responses of one or several specifications.
+
+    The examples of each operation are built with SwaggerParser.get_request_data
+    and serialized once, so answering a request is a path resolution (cached per
+    concrete path) and a dict lookup.
+    """
+
+    def __init__(self, parsers, precompute=True, path_cache_size=65536):
+        """
+        Args:
+            parsers: SwaggerParser (or list of SwaggerParser) of the mocked specifications;
+                     when several specs have the same path, the first one wins.
+            precompute: if True, all the responses are built now, otherwise on first use.
+            path_cache_size: maximum number of concrete paths whose template is kept.
+        """
+        self.parsers = parsers if isinstance(parsers, (list, tuple)) else [parsers]
+        self.path_cache_size = path_cache_size
+        self._operations = {}
+        self._path_cache = {}
+
+        self._owners = {}
+        for parser in self.parsers:
+            for path_name in parser.paths:
+                self._owners.setdefault(path_name, parser)
+        # The router returns the template added last: the templates of the first specs are added last
+        self.router = PathRouter()
+        for parser in reversed(self.parsers):
+            for path_name in parser.paths:
+                if self._owners[path_name] is parser:
+                    self.router.add(path_name)
+
+        if precompute:
+            for path_name, parser in self._owners.items():
+                for verb in parser.paths[path_name]:
+                    self.operation(path_name, verb)
+
+    def __len__(self):
+        return sum(len(self._owners[path_name].paths[path_name]) for path_name in self._owners)
+
+    def operation(self, path_name, verb):
+        """Get the MockOperation of a path template and http method (None if it does not exist)."""
+        key = (path_name, verb)
+        operation = self._operations.get(key)
+        if operation is None:
+            parser = self._owners.get(path_name)
+            if parser is None or verb not in parser.paths[path_name]:
+                return None
+            operation = self._operations[key] = MockOperation(path_name, verb,
+                                                              parser.get_request_data(path_name, verb))
+        return operation
+
+    def match(self, path):
+        """Get the path template of a concrete path (None if no template matches)."""
+        try:
+            return self._path_cache[path]
+        except KeyError:
+            path_name = self.router.match(path)
+            if len(self._path_cache) >= self.path_cache_size:
+                self._path_cache.clear()
+            self._path_cache[path] = path_name
+            return path_name
+
+    def respond(self, method, path, status=None):
+        """Get the mocked response of a request.
+
+        Args:
+            method: http method of the request.
+            path: concrete path of the request (e.g. "/v1/pets/12").
+            status: status code of the wanted response (the default one if None).
+
+        Returns:
+            A MockResponse, or None if no operation (or status) matches the request.
+        """
+        path_name = self.match(path)
+        if path_name is None:
+            return None
+        operation = self.operation(path_name, method.lower())
+        if operation is None:
+            return None
+        return operation.response(status)
@@ -0,0 +1,145 @@
+"""
+Corpus statistics of the parameters and operations of a directory of swagger specifications.
+
+Usage:
+    PYTHONPATH=. python3 swagger/param_corpus.py [API_DIR] [OUT_DIR] [--jobs N] [--shard-size N]
+
+Writes OUT_DIR/operations.tsv (one row per operation) and OUT_DIR/parameters.tsv (the count
+of each distinct parameter), the file read by ParamUtils and ParamValueSampler.
+"""
+import argparse
+import itertools
+import logging
+import multiprocessing
+import os
+import traceback
+from collections import Counter
+
+from swagger.swagger_analysis import SwaggerAnalyser
+from utils.arguments import positive_int
+
+OPERATIONS_HEADER = "verb\tpath\tsummary\tdesc\tresponse_desc\n"
+PARAMETERS_HEADER = "name\trequired\tis_auth_param\tlocation\ttype\tpattern\texample\tdesc\tcount\n"
+
+
+def list_specs(api_directory):
+    """Get the paths of the YAML specifications of a directory (and its sub-directories), in a stable order."""
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(api_directory):
+        dirnames.sort()
+        paths.extend(dirpath + "/" + f for f in sorted(filenames) if f.endswith('.yaml'))
+    return paths
+
+
+def operation_row(operation):
+    """Format an analysed operation as a row of operations.tsv."""
+    # The analyser does not keep the description of the responses
+    response_desc = getattr(operation, "response_desc", "")
+    return ("{}\t{}\t{}\t{}\t{}"
+            .format(str(operation.verb).replace("\t", " "), str(operation.url).replace("\t", " "),
+                    str(operation.summary).replace("\t", " "),
+                    str(operation.desc).replace("\t", " "), str(response_desc).replace("\t", " "))
+            .replace('"', "''").replace("\n", "---").replace("\r", "---") + "\n")
+
+
+def parameter_row(param, count):
+    """Format a parameter (a Param.to_tuple()) and its count as a row of parameters.tsv."""
+    return "{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n".format(*(tuple(param) + (count,))).replace('"', "''")
+
+
+def count_shard(spec_paths):
+    """Analyse a shard of specifications.
+
+    Returns:
+        A tuple with the Counter of the params (by Param.to_tuple()), the rows of
+        operations.tsv of the shard, in order, and the number of analysed specs.
+    """
+    params = Counter()
+    rows = []
+    analysed = 0
+    for spec_path in spec_paths:
+        try:
+            analyser = SwaggerAnalyser(spec_path)
+            for operation in analyser.iter_operations(release_paths=True):
+                rows.append(operation_row(operation))
+                params.update(param.to_tuple() for param in operation.params)
+            analysed += 1
+        except ValueError:
+            continue
+        except Exception:
+            traceback.print_exc()
+    return params, rows, analysed
+
+
+def shards(spec_paths, shard_size):
+    iterator = iter(spec_paths)
+    while True:
+        shard = list(itertools.islice(iterator, shard_size))
+        if not shard:
+            return
+        yield shard
+
+
+def _init_worker():
+    logging.disable(logging.WARNING)
+
+
+def build_corpus(api_directory, out_directory, jobs=1, shard_size=50):
+    """Count the parameters and list the operations of a directory of specifications.
+
+    The specifications are analysed by shards, in worker processes when jobs > 1.
+    The counters of the shards are merged, and the operations written, in the
+    order of the shards, so the files do not depend on the number of jobs.
+
+    Args:
+        api_directory: directory of the YAML specifications.
+        out_directory: directory of operations.tsv and parameters.tsv.
+        jobs: number of worker processes.
+        shard_size: number of specifications analysed by a worker at a time.
+
+    Returns:
+        The merged Counter of the params.
+    """
+    spec_paths = list_specs(api_directory)
+    os.makedirs(out_directory, exist_ok=True)
+    params = Counter()
+    done = 0
+
+    pool = multiprocessing.Pool(jobs, initializer=_init_worker) if jobs > 1 else None
+    try:
+        results = pool.imap(count_shard, shards(spec_paths, shard_size)) if pool is not None else \
+            map(count_shard, shards(spec_paths, shard_size))
+        with open(os.path.join(out_directory, "operations.tsv"), "wt") as f:
+            f.write(OPERATIONS_HEADER)
+            for shard_params, rows, analysed in results:
+                params.update(shard_params)
+                f.writelines(rows)
+                done += min(shard_size, len(spec_paths) - done)
+                print(done, done * 100 / len(spec_paths))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    with open(os.path.join(out_directory, "parameters.tsv"), "wt") as f:
+        f.write(PARAMETERS_HEADER)
+        for param, count in params.most_common(len(params)):
+            f.write(parameter_row(param, count))
+    return params
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parameters and operations statistics of a corpus of specifications")
+    parser.add_argument("api_directory", nargs="?", default="./_APIs")
+    parser.add_argument("out_directory", nargs="?", default="./out")
+    parser.add_argument("--jobs", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--shard-size", type=positive_int, default=50,
+                        help="number of specifications analysed by a worker at a time")
+    args = parser.parse_args()
+
+    params = build_corpus(args.api_directory, args.out_directory, args.jobs, args.shard_size)
+    print("{} distinct parameters".format(len(params)))
+
+
+if __name__ == "__main__":
+    main()
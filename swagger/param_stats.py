@@ -0,0 +1,128 @@
+"""
+Statistics of the parameters of a corpus (parameters.tsv, see param_corpus), computed in one pass.
+
+Usage:
+    PYTHONPATH=. python3 swagger/param_stats.py [PARAMETERS_TSV] [--entities ENTITY_FILE] [--json]
+"""
+import argparse
+import json
+from collections import Counter, OrderedDict
+
+from tabulate import tabulate
+
+from swagger.swagger_utils import ParamUtils, entity_file, params_file
+
+# Breakdowns of the parameters, with the title of their table
+DIMENSIONS = OrderedDict([
+    ("type", "Parameters({total}) by Types:"),
+    ("required", "Parameters by Required:"),
+    ("location", "Parameters Request Location:"),
+    ("desc", "Parameters by Desc:"),
+    ("pattern", "Parameters by Patterns:"),
+    ("example", "Parameters by Example:"),
+    ("identifier", "Identifier Parameters:"),
+    ("entity", "Entity Parameters:"),
+])
+# Default na_values of pandas.read_csv (pandas~=1.0.3), with which ParamUtils.stats read parameters.tsv:
+# the types, locations and requirements read as missing are not counted
+NA_VALUES = {"", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A",
+             "NA", "NULL", "NaN", "n/a", "nan", "null"}
+# Descriptions, patterns and examples are also missing when "None" (a None written by param_corpus)
+MISSING = NA_VALUES | {"None"}
+BOOLEANS = {"True": True, "False": False}
+
+
+def load_entities(entity_path=entity_file):
+    """Load the (normalized) named entities of an entity list, as ParamUtils does."""
+    with open(entity_path) as f:
+        return set(ParamUtils.normalize(entity, lemmatize=True) for entity in set(f.readlines()))
+
+
+class ParamStats(object):
+    """Breakdowns of the parameters of a corpus by type, requirement, location, description,
+    pattern, example, identifier and named entity, weighted by their count.
+
+    Rows are added one at a time, so a parameters.tsv of any size is read in one
+    pass; the names are classified once per distinct name.
+    """
+
+    def __init__(self, entities=()):
+        self.entities = entities
+        self.unique = 0
+        self.counts = OrderedDict((dimension, Counter()) for dimension in DIMENSIONS)
+        self._names = {}
+
+    def classify_name(self, name):
+        """Get the (identifier, entity) flags of a parameter name (as in parameters.tsv)."""
+        flags = self._names.get(name)
+        if flags is None:
+            normalized = ParamUtils.normalize(name)
+            terms = set(ParamUtils.normalize(normalized, lemmatize=True).split()) if normalized else set()
+            flags = self._names[name] = (ParamUtils.is_identifier(normalized),
+                                         any(term in self.entities for term in terms))
+        return flags
+
+    def add(self, row):
+        """Count a row of parameters.tsv (a dict of its columns); authentication parameters are skipped."""
+        if row["is_auth_param"] != "False":
+            return
+        count = int(row["count"])
+        self.unique += 1
+        counts = self.counts
+        for dimension in ("type", "required", "location"):
+            value = row[dimension]
+            if value not in NA_VALUES:
+                counts[dimension][BOOLEANS.get(value, value)] += count
+        for dimension in ("desc", "pattern", "example"):
+            counts[dimension][row[dimension] not in MISSING] += count
+        identifier, entity = self.classify_name(row["name"])
+        counts["identifier"][identifier] += count
+        counts["entity"][entity] += count
+
+    def read(self, params_tsv):
+        """Count the rows of a parameters.tsv file, one line at a time."""
+        with open(params_tsv) as f:
+            columns = f.readline().rstrip("\n").split("\t")
+            for line in f:
+                values = line.rstrip("\n").split("\t")
+                if len(values) == len(columns):
+                    self.add(dict(zip(columns, values)))
+        return self
+
+    def breakdown(self, dimension):
+        """Get the (value, count, percent) rows of a dimension, sorted by value."""
+        counter = self.counts[dimension]
+        total = sum(counter.values())
+        return [(value, count, count * 100.0 / total) for value, count in
+                sorted(counter.items(), key=lambda item: str(item[0]))]
+
+    def to_json(self):
+        ret = OrderedDict([("unique_parameters", self.unique)])
+        for dimension in DIMENSIONS:
+            ret[dimension] = OrderedDict(
+                (str(value), {"count": count, "percent": percent}) for value, count, percent in self.breakdown(dimension))
+        return ret
+
+    def format(self):
+        """Format the breakdowns as tables, as ParamUtils.stats printed them."""
+        lines = ["—————————————————— params.tsv ———————————————————————",
+                 "#Unique Parameters : {}".format(self.unique)]
+        for dimension, title in DIMENSIONS.items():
+            lines.append(title.format(total=sum(self.counts[dimension].values())))
+            lines.append(tabulate(self.breakdown(dimension), headers=[dimension, "count", "percent"], tablefmt='psql'))
+        return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistics of the parameters of a corpus")
+    parser.add_argument("params_tsv", nargs="?", default=params_file)
+    parser.add_argument("--entities", default=entity_file, help="list of named entities")
+    parser.add_argument("--json", action="store_true", help="print the statistics as JSON")
+    args = parser.parse_args()
+
+    stats = ParamStats(load_entities(args.entities)).read(args.params_tsv)
+    print(json.dumps(stats.to_json(), indent=4) if args.json else stats.format())
+
+
+if __name__ == "__main__":
+    main()
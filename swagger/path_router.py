@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+_PARAM_REGEX = re.compile('{[^/]*}')
+
+
+class _Node(object):
+    __slots__ = ('literals', 'patterns', 'template', 'order')
+
+    def __init__(self):
+        self.literals = {}
+        self.patterns = []
+        self.template = None
+        self.order = -1
+
+
+class PathRouter(object):
+    """Resolve concrete request paths to the path templates of a specification.
+
+    The templates are stored in a trie of path segments. Literal segments are
+    dict lookups and templated segments (e.g. "{id}" or "{id}.json") are matched
+    with a regex compiled once, so resolving a path costs O(path depth) instead of
+    one regex compilation per template.
+
+    As SwaggerParser.get_path_spec always did, an exact match wins, and when
+    several templates match a path the one added last is returned.
+    """
+
+    def __init__(self, templates=()):
+        self._root = _Node()
+        self._templates = {}
+        for template in templates:
+            self.add(template)
+
+    def add(self, template):
+        """Add a path template (e.g. "/v1/pets/{petId}") to the router."""
+        order = len(self._templates)
+        self._templates[template] = order
+
+        node = self._root
+        for segment in template.split('/'):
+            if '{' in segment:
+                node = self._pattern_child(node, segment)
+            else:
+                node = node.literals.setdefault(segment, _Node())
+        node.template = template
+        node.order = order
+
+    @staticmethod
+    def _pattern_child(node, segment):
+        regex = _segment_regex(segment)
+        for pattern, child in node.patterns:
+            if pattern.pattern == regex:
+                return child
+        child = _Node()
+        node.patterns.append((re.compile(regex), child))
+        return child
+
+    def match(self, path):
+        """Get the template matching the given path.
+
+        Args:
+            path: concrete path of a request (e.g. "/v1/pets/12").
+
+        Returns:
+            The matching template, or None if no template matches.
+        """
+        if path in self._templates:
+            return path
+
+        segments = path.split('/')
+        depth = len(segments)
+        best = None
+        stack = [(self._root, 0)]
+        while stack:
+            node, i = stack.pop()
+            if i == depth:
+                if node.template is not None and (best is None or node.order > best.order):
+                    best = node
+                continue
+            segment = segments[i]
+            child = node.literals.get(segment)
+            if child is not None:
+                stack.append((child, i + 1))
+            for pattern, child in node.patterns:
+                if pattern.match(segment):
+                    stack.append((child, i + 1))
+
+        return best.template if best is not None else None
+
+    def __contains__(self, template):
+        return template in self._templates
+
+    def __len__(self):
+        return len(self._templates)
+
+
+def _segment_regex(segment):
+    """Build the regex of a templated path segment, literal parts being escaped."""
+    parts = []
+    last = 0
+    for param in _PARAM_REGEX.finditer(segment):
+        parts.append(re.escape(segment[last:param.start()]))
+        parts.append('([^/]*)')
+        last = param.end()
+    parts.append(re.escape(segment[last:]))
+    return ''.join(parts) + '$'
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+from swagger.definition_validator import definition_name_from_ref
+
+
+class RefGraph(object):
+    """Graph of the $refs of a specification.
+
+    It resolves local $refs (definitions, parameters, responses, ...) with a
+    cache, and groups the definitions into strongly connected components of
+    their reference graph. Components are discovered on demand, from the
+    definitions which are actually used, and are returned dependency-first, so
+    the examples of a component can be built once all the definitions it refers
+    to are complete. Components with more than one definition, or with a
+    definition referring to itself, are cycles.
+    """
+
+    def __init__(self, specification):
+        self.specification = specification
+        self.definitions = specification.get('definitions') or {}
+        self._resolved = {}
+        self._refs = {}
+        self._positions = None
+        self._component = {}
+
+    def resolve(self, ref):
+        """Resolve a local $ref (ex: "#/parameters/limitParam").
+
+        Returns:
+            The referenced object, or None if the $ref cannot be resolved.
+        """
+        if ref in self._resolved:
+            return self._resolved[ref]
+
+        target = None
+        if isinstance(ref, str) and ref.startswith('#/'):
+            target = self.specification
+            for token in ref[2:].split('/'):
+                token = token.replace('~1', '/').replace('~0', '~')
+                if isinstance(target, dict) and token in target:
+                    target = target[token]
+                elif isinstance(target, list) and token.isdigit() and int(token) < len(target):
+                    target = target[int(token)]
+                else:
+                    target = None
+                    break
+        self._resolved[ref] = target
+        return target
+
+    def refs(self, def_name):
+        """Get the names of the definitions referred to by the given definition, in order."""
+        refs = self._refs.get(def_name)
+        if refs is None:
+            refs = self._refs[def_name] = self._collect_refs(self.definitions.get(def_name))
+        return refs
+
+    def _collect_refs(self, spec):
+        refs = []
+        seen = set()
+        stack = [spec]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                ref = node.get('$ref')
+                if isinstance(ref, str):
+                    name = definition_name_from_ref(ref)
+                    if name in self.definitions and name not in seen:
+                        seen.add(name)
+                        refs.append(name)
+                stack.extend(reversed([value for value in node.values() if isinstance(value, (dict, list))]))
+            elif isinstance(node, list):
+                stack.extend(reversed([value for value in node if isinstance(value, (dict, list))]))
+        return refs
+
+    def position(self, def_name):
+        """Position of the definition in the specification."""
+        if self._positions is None:
+            self._positions = dict((name, i) for i, name in enumerate(self.definitions))
+        return self._positions[def_name]
+
+    def new_components(self, def_name):
+        """Discover the components reachable from the given definition.
+
+        Components which were returned by a previous call are skipped.
+
+        Returns:
+            The new components, dependency-first; the definitions of a component
+            are sorted by their position in the specification.
+        """
+        if def_name not in self.definitions or def_name in self._component:
+            return []
+
+        # Iterative Tarjan's algorithm
+        components = []
+        index, low = {}, {}
+        stack, on_stack = [], set()
+
+        def visit(node):
+            index[node] = low[node] = len(index)
+            stack.append(node)
+            on_stack.add(node)
+            work.append((node, iter(self.refs(node))))
+
+        work = []
+        visit(def_name)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child in self._component:  # part of a component returned earlier
+                    continue
+                if child not in index:
+                    visit(child)
+                    break
+                elif child in on_stack:
+                    low[node] = min(low[node], index[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    component.sort(key=self.position)
+                    for member in component:
+                        self._component[member] = component
+                    components.append(component)
+        return components
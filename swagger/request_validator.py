@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from swagger.definition_validator import definition_name_from_ref, type_checker
+
+# Kinds of violations reported by the request validators
+UNKNOWN_PATH = 'unknown path'
+UNKNOWN_METHOD = 'unknown method'
+INVALID_POST_BODY = 'invalid post body'
+INVALID_BODY = 'invalid body parameters'
+INVALID_QUERY = 'invalid query parameters'
+VALIDATION_ERROR = 'validation error'
+
+
+class PostBodyRule(object):
+    """General guidelines of the body of a POST request (body + mime type).
+
+    Let's limit this to mime types that either contain 'text' or 'json'
+    1. if body is None, there must not be any required parameters in the given schema
+    2. if the mime type contains 'json', body must not be '', but can be {}
+    3. if the mime type contains 'text', body can be any string
+    4. if no mime type ('consumes') is given.. DISALLOW
+    5. if the body is empty ('' or {}), there must not be any required parameters
+    """
+
+    __slots__ = ('has_body', 'parameters_required', 'schema_present', 'text_is_accepted', 'json_is_accepted')
+
+    def __init__(self, body_specification):
+        # If no body specified, POST with empty body is allowed
+        self.has_body = "body" in body_specification["parameters"]
+        if not self.has_body:
+            return
+
+        # Are there required parameters? - there is only ONE body, so we check that one
+        self.parameters_required = body_specification['parameters']['body']['required']
+        self.schema_present = body_specification['parameters']['body'].get('schema')
+
+        # What is the mime type ?
+        self.text_is_accepted = any('text' in item for item in body_specification.get('consumes', []))
+        self.json_is_accepted = any('json' in item for item in body_specification.get('consumes', []))
+
+    def __call__(self, actual_request_body):
+        """ returns a tuple (boolean, msg)
+            to indicate whether the validation passed
+            if False then msg contains the reason
+            if True then msg is empty
+        """
+        if not self.has_body:
+            return True, ""
+
+        # What if it says 'required' but there is no schema ? - we reject it
+        if self.parameters_required and not self.schema_present:
+            msg = "there is no schema given, but it says there are required parameters"
+            return False, msg
+
+        if actual_request_body == '' and not self.text_is_accepted:
+            msg = "post body is an empty string, but text is not an accepted mime type"
+            return False, msg
+
+        if actual_request_body == {} and not self.json_is_accepted:
+            msg = "post body is an empty dict, but json is not an accepted mime type"
+            return False, msg
+
+        # If only json is accepted, but the body is a string, we transform the
+        # string to json and check it then (not sure if the server would accept
+        # that string, though)
+        if self.json_is_accepted and not self.text_is_accepted and type(actual_request_body).__name__ == 'str':
+            actual_request_body = json.loads(actual_request_body)
+
+        # Handle empty body
+        body_is_empty = actual_request_body in [None, '', {}]
+        if body_is_empty and self.parameters_required:
+            msg = "there is no body, but it says there are required parameters"
+            return False, msg
+
+        return True, ""
+
+
+class OperationValidator(object):
+    """Validator of the requests of an operation, compiled once from its specification.
+
+    The parameters of the operation are turned into checker functions, so
+    validating a request does not walk the specification again. Irregular
+    parameter specifications, which cannot be compiled, are interpreted by the
+    parser on each call as before.
+    """
+
+    def __init__(self, parser, path_name, action, action_spec):
+        self.parser = parser
+        self.path_name = path_name
+        self.action = action
+        self.action_spec = action_spec
+        self.post_body = PostBodyRule(action_spec) if action == 'post' else None
+
+        parameters = action_spec['parameters']
+        try:
+            self.query_checkers = dict((name, self._query_checker(spec)) for name, spec in parameters.items())
+            self.required_query = [name for name, spec in parameters.items()
+                                   if spec['in'] == 'query' and 'required' in spec and spec['required']]
+        except (KeyError, TypeError, AttributeError):
+            self.query_checkers = None
+        try:
+            self.body_checkers = [self._body_checker(spec) for spec in parameters.values() if spec['in'] == 'body']
+        except (KeyError, TypeError, AttributeError):
+            self.body_checkers = None
+
+    def __call__(self, body=None, query=None):
+        """Validate a request of the operation.
+
+        Returns:
+            A (kind, msg) tuple describing the violation, or None if the request is valid.
+        """
+        # check general post body guidelines (body + mime type)
+        if self.post_body is not None:
+            is_ok, msg = self.post_body(body)
+            if not is_ok:
+                return INVALID_POST_BODY, msg
+
+        # If the body is empty and it validated so far, we can return here
+        # unless there is something in the query parameters we need to check
+        body_is_empty = body in [None, {}, '']
+        if body_is_empty and query is None:
+            return None
+
+        # Check body parameters
+        is_ok, msg = self._validate_body(body)
+        if not is_ok:
+            return INVALID_BODY, msg
+
+        # Check query parameters
+        if query is not None and not self._validate_query(query):
+            return INVALID_QUERY, "the query parameters did not validate"
+
+        return None
+
+    def _validate_body(self, body):
+        if self.body_checkers is None:
+            return self.parser._validate_body_parameters(body, self.action_spec)
+        for check in self.body_checkers:
+            msg = check(body)
+            if msg is not None:
+                return False, msg
+        return True, ""
+
+    def _validate_query(self, query):
+        if self.query_checkers is None:
+            return self.parser._validate_query_parameters(query, self.action_spec)
+        checkers = self.query_checkers
+        for param_name, param_value in query.items():
+            check = checkers.get(param_name)
+            if check is not None and not check(param_value):
+                return False
+        return all(param in query for param in self.required_query)
+
+    @staticmethod
+    def _query_checker(param_spec):
+        if 'type' not in param_spec.keys():
+            return _missing_key_checker('type')
+        if param_spec['type'] != 'array':
+            return type_checker(param_spec['type'])
+
+        items = param_spec.get('items')
+        check_item = type_checker(items['type']) if items is not None and 'type' in items.keys() else None
+
+        def check(value):
+            if not isinstance(value, list):  # Not an array
+                return False
+            if check_item is None and value:
+                raise KeyError('items' if items is None else 'type')
+            # Check type of all elements in array
+            return all(check_item(i) for i in value)
+
+        return check
+
+    def _body_checker(self, param_spec):
+        # A body which has the type of the parameter is also checked against its schema (if any)
+        check_type = self._body_type_checker(param_spec['type']) if 'type' in param_spec.keys() else None
+        check_schema = self._body_schema_checker(param_spec['schema']) if 'schema' in param_spec.keys() else None
+        if check_type is None or check_schema is None:
+            return check_type or check_schema or (lambda body: None)
+
+        def check(body):
+            return check_type(body) or check_schema(body)
+
+        return check
+
+    @staticmethod
+    def _body_type_checker(type_def):
+        check_type = type_checker(type_def)
+
+        def check(body):
+            if not check_type(body):
+                return "Check type did not validate for {0} and {1}".format(type_def, body)
+
+        return check
+
+    def _body_schema_checker(self, schema):
+        validate_definition = self.parser.validate_definition
+
+        def check_definition(ref):
+            definition_name = definition_name_from_ref(ref)
+            return lambda body: validate_definition(definition_name, body)
+
+        if 'type' in schema.keys() and schema['type'] == 'array':
+            # It is an array get value from definition
+            check_item = check_definition(schema['items']['$ref'])
+
+            def check(body):
+                if len(body) > 0 and not check_item(body[0]):
+                    return "The body did not validate against its definition"
+
+        else:
+            # Type but not array, then the $ref of the schema
+            check_type = self._body_type_checker(schema['type']) if 'type' in schema.keys() else None
+            check_ref = check_definition(schema['$ref']) if '$ref' in schema.keys() else _missing_key_checker('$ref')
+
+            def check(body):
+                msg = check_type(body) if check_type is not None else None
+                if msg is not None:
+                    return msg
+                if not check_ref(body):
+                    return "The body did not validate against its definition"
+
+        return check
+
+
+def _missing_key_checker(key):
+    def check(value):
+        raise KeyError(key)
+
+    return check
+
+
+class RequestValidators(object):
+    """Request validators of the operations of a parsed specification.
+
+    Each operation (path template, http method) is compiled on first use and
+    cached, so a batch of requests only pays for the path resolution and the
+    checks of the values.
+    """
+
+    def __init__(self, parser):
+        self.parser = parser
+        self._validators = {}
+
+    def get(self, path_name, action):
+        """Get the validator of the given operation (None if the operation does not exist)."""
+        key = (path_name, action)
+        validator = self._validators.get(key)
+        if validator is None:
+            path_spec = self.parser.paths.get(path_name)
+            if path_spec is None or action not in path_spec.keys():
+                return None
+            validator = self._validators[key] = OperationValidator(self.parser, path_name, action,
+                                                                   path_spec[action])
+        return validator
+
+    def check(self, path, action, body=None, query=None):
+        """Validate a request.
+
+        Args:
+            path: path of the request.
+            action: action of the request(get, post, delete...).
+            body: body of the request.
+            query: dict with the query parameters.
+
+        Returns:
+            A tuple (path_name, violation), where path_name is the template
+            matching the path (None for an unknown path), and violation is a
+            (kind, msg) tuple, or None if the request is valid.
+        """
+        path_name = self.parser.router.match(path)
+        if path_name is None or path_name not in self.parser.paths:  # reject unknown path
+            return None, (UNKNOWN_PATH, "there is no path")
+
+        validator = self.get(path_name, action)
+        if validator is None:  # reject unknown http method
+            return path_name, (UNKNOWN_METHOD, "this http method is unknown '{0}'".format(action))
+
+        return path_name, validator(body, query)
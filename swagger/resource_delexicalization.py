@@ -20,7 +20,7 @@ def delexicalize(e: Operation):
             else:
                 break
         for r in to_remove:
-            resources.pop(r)
+            resources.remove(r)
 
     ret = [e.verb]
     ret_res = []
@@ -52,7 +52,9 @@ def lexicalize(delexicalize_text, e: Operation):
 
     return ret
 
-print(delexicalize(Operation.from_json(json.loads('{"base_path": "/forex-quotes",\
+
+if __name__ == "__main__":
+    print(delexicalize(Operation.from_json(json.loads('{"base_path": "/forex-quotes",\
         "desc": "Get quotes",\
         "intent": "get__forex-quotes_quotes",\
         "summary": "Get quotes for all symbols",\
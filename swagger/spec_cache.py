@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+CACHE_FORMAT_VERSION = 1
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+# Modules whose code builds the parsed state: the parser with its examples, the loader, and the validators
+PARSER_MODULES = ('swagger_parser', 'spec_loader', 'definition_validator', 'request_validator', 'path_router',
+                  'ref_graph')
+
+_source_versions = {}
+
+
+def source_version(modules=None):
+    """Get a hash of the sources of swagger modules, so stored parses and analyses
+    of older code are not served after the code changes.
+
+    Args:
+        modules: names of the modules of the swagger package (e.g. 'swagger_parser'),
+                 or None for every module of the package.
+
+    Returns:
+        The hex digest of the names and contents of the module sources.
+    """
+    modules = tuple(modules) if modules is not None else None
+    if modules not in _source_versions:
+        directory = os.path.dirname(os.path.abspath(__file__))
+        names = modules if modules is not None else sorted(
+            name[:-3] for name in os.listdir(directory) if name.endswith('.py'))
+        h = hashlib.sha256()
+        for name in names:
+            h.update(name.encode('utf-8') + b'\0')
+            with open(os.path.join(directory, name + '.py'), 'rb') as f:
+                h.update(hashlib.sha256(f.read()).digest())
+        _source_versions[modules] = h.hexdigest()
+    return _source_versions[modules]
+
+
+class SpecCache(object):
+    """On-disk, content-addressed cache of parsed swagger specifications.
+
+    Entries are keyed by the raw bytes of the specification, the options of
+    the parser and the version of the parser code (see PARSER_MODULES), so a
+    repeated parse of the same document is a single pickle load instead of a
+    YAML parse and example build, and an entry of older parser code is a miss.
+    The least recently used entries are evicted once the total size of the
+    cache exceeds max_size.
+
+    Attributes:
+        directory: directory holding the cache entries.
+        max_size: maximum total size of the entries, in bytes.
+        hits: number of lookups answered from the cache.
+        misses: number of lookups which were not in the cache.
+    """
+
+    _SUFFIX = '.pickle'
+
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+        self._size = sum(size for _, size, _ in self._entries())
+
+    @staticmethod
+    def from_env(variable='API2CAN_SPEC_CACHE'):
+        """Build a cache in the directory named by the given environment variable.
+
+        Returns:
+            A SpecCache, or None if the variable is not set.
+        """
+        directory = os.environ.get(variable)
+        if not directory:
+            return None
+        max_size = os.environ.get(variable + '_MAX_SIZE')
+        return SpecCache(directory, int(max_size) if max_size else DEFAULT_MAX_SIZE)
+
+    @staticmethod
+    def key(content, options=()):
+        """Get the cache key of a specification.
+
+        Args:
+            content: raw content of the specification (bytes or str), or a
+                     binary file object, which is read by chunks.
+            options: hashable parser options which change the parsed state.
+
+        Returns:
+            The hex digest identifying the entry.
+        """
+        if isinstance(content, str):
+            content = content.encode('utf-8')
+        h = hashlib.sha256()
+        if isinstance(content, bytes):
+            h.update(content)
+        else:
+            for chunk in iter(lambda: content.read(1024 * 1024), b''):
+                h.update(chunk)
+        h.update(repr((CACHE_FORMAT_VERSION, source_version(PARSER_MODULES), tuple(options))).encode('utf-8'))
+        return h.hexdigest()
+
+    def get(self, key):
+        """Load the state stored under the given key.
+
+        Returns:
+            The stored state, or None on a miss.
+        """
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning("dropping unreadable cache entry {0}: {1}".format(path, e))
+            self._remove(path)
+            self.misses += 1
+            return None
+
+        os.utime(path)  # mark as recently used
+        self.hits += 1
+        return state
+
+    def put(self, key, state):
+        """Store the state under the given key and evict old entries if needed."""
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            if os.path.exists(path):
+                self._size -= os.path.getsize(path)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._size += os.path.getsize(path)
+        self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries until the cache fits in max_size."""
+        if self._size <= self.max_size:
+            return
+        for path, size, _ in sorted(self._entries(), key=lambda entry: entry[2]):
+            if self._size <= self.max_size:
+                break
+            self._remove(path, size)
+
+    def clear(self):
+        """Remove every entry of the cache."""
+        for path, size, _ in self._entries():
+            self._remove(path, size)
+
+    def size(self):
+        """Total size of the stored entries, in bytes."""
+        return self._size
+
+    def stats(self):
+        """Get the hit/miss counters and the size of the cache."""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': self._size,
+            'max_size': self.max_size,
+        }
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + self._SUFFIX)
+
+    def _entries(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(self._SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield path, st.st_size, st.st_mtime
+
+    def _remove(self, path, size=None):
+        try:
+            if size is None:
+                size = os.path.getsize(path)
+            os.remove(path)
+            self._size -= size
+        except FileNotFoundError:
+            pass
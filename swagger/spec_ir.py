@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+from swagger.entities import API, Operation, Param
+
+IR_MAGIC = b'A2C-IR\r\n'
+IR_FORMAT_VERSION = 2
+IR_SUFFIX = '.ir'
+
+# magic, format version, length of the index
+_HEADER = struct.Struct('<8sIQ')
+
+
+def operation_record(operation):
+    """Get the IR record of an analysed Operation (the operation is not modified)."""
+    return {
+        'verb': operation.verb,
+        'url': operation.url,
+        'summary': operation.summary,
+        'desc': operation.desc,
+        'operation_id': operation.operation_id,
+        'base_path': operation.base_path,
+        'intent': operation.intent,
+        'params': [list(param.to_tuple()) for param in operation.params or []],
+    }
+
+
+def operation_from_record(record):
+    """Build an Operation from its IR record, as SwaggerAnalyser.analyse builds it."""
+    params = [Param.from_tuple(tuple(param)) for param in record['params']]
+    operation = Operation(record['verb'], record['url'], record['summary'], record['desc'], None, params,
+                          operation_id=record['operation_id'], base_path=record['base_path'])
+    operation.intent = record['intent']
+    return operation
+
+
+def write_ir(ir_path, api, auth_keys=(), source_hash=None, code_version=None):
+    """Write the IR of an analysed specification.
+
+    The file starts with a header and a JSON index (API fields, auth keys, and
+    the offset of each operation), followed by one JSON record per operation,
+    so a reader only decodes the operations it uses. The file is replaced
+    atomically.
+
+    Args:
+        ir_path: path of the IR file.
+        api: the API returned by SwaggerAnalyser.analyse.
+        auth_keys: names of the auth parameters of the specification.
+        source_hash: hash of the specification the IR was built from.
+        code_version: version of the analyser code which built the IR.
+    """
+    records, offsets, position = [], [], 0
+    for operation in api.operations:
+        record = json.dumps(operation_record(operation), default=str).encode('utf-8')
+        records.append(record)
+        offsets.append([position, len(record)])
+        position += len(record)
+
+    index = json.dumps({
+        'source_hash': source_hash,
+        'code_version': code_version,
+        'title': api.title,
+        'url': api.url,
+        'protocols': api.protocols,
+        'auth_keys': list(auth_keys),
+        'operations': offsets,
+    }, default=str).encode('utf-8')
+
+    directory = os.path.dirname(os.path.abspath(ir_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_HEADER.pack(IR_MAGIC, IR_FORMAT_VERSION, len(index)))
+            f.write(index)
+            for record in records:
+                f.write(record)
+        os.replace(tmp_path, ir_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SpecIR(object):
+    """Memory-mapped IR of an analysed specification, see write_ir.
+
+    Attributes:
+        title, url, protocols: fields of the API.
+        auth_keys: names of the auth parameters of the specification.
+        source_hash: hash of the specification the IR was built from.
+        code_version: version of the analyser code which built the IR.
+    """
+
+    def __init__(self, ir_path, code_version=None):
+        """Open an IR file.
+
+        Args:
+            ir_path: path of the IR file.
+            code_version: version of the analyser code the IR must have been built
+                          by, or None to accept any version.
+
+        Raises:
+            ValueError: if the file is not an IR, or was written by another format
+                        or code version.
+        """
+        self.ir_path = ir_path
+        with open(ir_path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(self._map) < _HEADER.size:
+                raise ValueError("{0} is not an IR file".format(ir_path))
+            magic, version, index_length = _HEADER.unpack_from(self._map, 0)
+            if magic != IR_MAGIC:
+                raise ValueError("{0} is not an IR file".format(ir_path))
+            if version != IR_FORMAT_VERSION:
+                raise ValueError("{0} has the IR format version {1}, expected {2}".format(
+                    ir_path, version, IR_FORMAT_VERSION))
+            index = json.loads(self._map[_HEADER.size:_HEADER.size + index_length].decode('utf-8'))
+            if code_version is not None and index.get('code_version') != code_version:
+                raise ValueError("{0} was built by another version of the analyser".format(ir_path))
+        except Exception:
+            self._map.close()
+            raise
+
+        self._data_offset = _HEADER.size + index_length
+        self._offsets = index['operations']
+        self.source_hash = index['source_hash']
+        self.code_version = index.get('code_version')
+        self.title = index['title']
+        self.url = index['url']
+        self.protocols = index['protocols']
+        self.auth_keys = index['auth_keys']
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __iter__(self):
+        for i in range(len(self._offsets)):
+            yield self.operation(i)
+
+    def record(self, i):
+        """Get the IR record (dict) of the i-th operation."""
+        offset, length = self._offsets[i]
+        start = self._data_offset + offset
+        return json.loads(self._map[start:start + length].decode('utf-8'))
+
+    def operation(self, i):
+        """Get the i-th Operation."""
+        return operation_from_record(self.record(i))
+
+    def api(self):
+        """Get the API with all its operations, as returned by SwaggerAnalyser.analyse."""
+        return API(self.title, self.url, self.protocols, list(self))
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+
+import codecs
+import json
+
+import jinja2
+import six
+import yaml
+from yaml.composer import Composer, ComposerError
+from yaml.constructor import SafeConstructor
+from yaml.events import AliasEvent, CollectionEndEvent, CollectionStartEvent, MappingEndEvent, MappingStartEvent, \
+    StreamEndEvent
+from yaml.nodes import MappingNode, ScalarNode
+from yaml.resolver import Resolver
+
+try:
+    from yaml import CSafeLoader as FastSafeLoader
+    from yaml._yaml import CParser as _EventParser
+except ImportError:  # libyaml is not available
+    from yaml import SafeLoader as FastSafeLoader
+    from yaml.reader import Reader
+    from yaml.scanner import Scanner
+    from yaml.parser import Parser
+
+
+    class _EventParser(Reader, Scanner, Parser):
+        def __init__(self, stream):
+            Reader.__init__(self, stream)
+            Scanner.__init__(self)
+            Parser.__init__(self)
+
+TEMPLATE_MARKERS = ('{{', '{%', '{#')
+
+# Top-level sections of a specification used by API2CAN (and by the parsing of its operations: their
+# default media types and security, and the shared responses they refer to); the others ('tags',
+# 'externalDocs' and vendor extensions) are skipped
+SELECTED_SECTIONS = ('swagger', 'info', 'host', 'basePath', 'schemes', 'consumes', 'produces', 'paths',
+                     'definitions', 'parameters', 'responses', 'securityDefinitions', 'security')
+# Vendor extensions read by the parser, the other 'x-' keys are skipped
+KEPT_EXTENSIONS = ('x-example', 'x-pattern')
+# Keys whose mapping is keyed by user-defined names, which may start with 'x-'
+NAMED_MAPPINGS = ('paths', 'definitions', 'parameters', 'securityDefinitions', 'properties', 'headers',
+                  'responses', 'scopes')
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def has_template_markers(text):
+    """Check if the given text contains jinja2 markers which need rendering."""
+    return any(marker in text for marker in TEMPLATE_MARKERS)
+
+
+def render_template(text, arguments=None):
+    """Render the given specification text as a jinja2 template.
+
+    The (costly) template compilation is skipped when the text has no template markers.
+    """
+    if not has_template_markers(text):
+        return text
+    return jinja2.Template(text).render(**(arguments or {}))
+
+
+class StringTable(dict):
+    """Table of strings shared by the documents of a batch.
+
+    Equal strings of different documents (keys such as 'type' or 'description',
+    values such as 'string', 'query' or 'id', common descriptions...) are
+    replaced by a single instance, so a corpus of specifications loaded in one
+    process holds each distinct string once.
+    """
+
+    def intern(self, value):
+        """Get the shared instance of a string (other values are returned as they are)."""
+        if type(value) is not str:
+            return value
+        return self.setdefault(value, value)
+
+    def intern_strings(self, obj):
+        """Intern in place the keys and string values of a loaded document.
+
+        Dicts and lists are modified in place, so objects referring to them keep
+        seeing the same containers.
+
+        Returns:
+            obj, or its interned instance if obj is a string.
+        """
+        intern = self.intern
+        stack, seen = [obj], set()
+        while stack:
+            node = stack.pop()
+            if id(node) in seen:
+                continue
+            seen.add(id(node))
+            if isinstance(node, dict):
+                items = list(node.items())
+                node.clear()
+                for key, value in items:
+                    node[intern(key)] = intern(value)
+                    if isinstance(value, (dict, list)):
+                        stack.append(value)
+            elif isinstance(node, list):
+                for i, value in enumerate(node):
+                    node[i] = intern(value)
+                    if isinstance(value, (dict, list)):
+                        stack.append(value)
+        return intern(obj)
+
+
+class InterningLoader(FastSafeLoader):
+    """Fast YAML loader interning the strings it builds in a StringTable, see interning_loader."""
+
+    strings = None
+
+    def construct_yaml_str(self, node):
+        value = self.construct_scalar(node)
+        return self.strings.setdefault(value, value)
+
+
+InterningLoader.add_constructor('tag:yaml.org,2002:str', InterningLoader.construct_yaml_str)
+
+
+def interning_loader(strings):
+    """Get a YAML loader class interning the strings of the documents in the given StringTable."""
+    return type('InterningLoader', (InterningLoader,), {'strings': strings})
+
+
+def load_text(text, is_json=False, loader=FastSafeLoader, strings=None):
+    """Load a specification from its text.
+
+    Args:
+        text: content of the specification.
+        is_json: if True, the text is first parsed with the json module, which is
+                 much faster than any YAML loader; YAML is used as a fallback.
+        loader: YAML loader class used for YAML content.
+        strings: optional StringTable in which the strings of the document are
+                 interned (YAML content is then read with an InterningLoader).
+
+    Returns:
+        The specification as a dict.
+    """
+    if is_json:
+        try:
+            specification = json.loads(text)
+        except ValueError:
+            pass  # JSON-like YAML, let the YAML loader handle it
+        else:
+            return strings.intern_strings(specification) if strings is not None else specification
+    if strings is not None:
+        loader = interning_loader(strings)
+    return yaml.load(text, Loader=loader)
+
+
+def read_path(swagger_path):
+    """Read the raw text of a specification file."""
+    with codecs.open(swagger_path, 'r', 'utf-8') as swagger_file:
+        return swagger_file.read()
+
+
+def load_path(swagger_path, arguments=None, loader=FastSafeLoader):
+    """Load a specification from a YAML or JSON file.
+
+    Args:
+        swagger_path: path of the specification.
+        arguments: arguments for the jinja2 rendering of the specification.
+        loader: YAML loader class used for YAML content.
+
+    Returns:
+        The specification as a dict.
+    """
+    text = read_path(swagger_path)
+    return load_text(render_template(text, arguments), is_json=is_json_path(swagger_path), loader=loader)
+
+
+def file_has_template_markers(swagger_path):
+    """Check if the given file contains jinja2 markers, reading it by chunks."""
+    tail = u''
+    with codecs.open(swagger_path, 'r', 'utf-8') as swagger_file:
+        while True:
+            chunk = swagger_file.read(_CHUNK_SIZE)
+            if not chunk:
+                return False
+            if has_template_markers(tail + chunk):
+                return True
+            tail = chunk[-1:]
+
+
+class SelectiveLoader(Composer, _EventParser, SafeConstructor, Resolver):
+    """YAML loader building only the selected sections of a specification.
+
+    The document is read as a stream of parser events, and the events of the
+    skipped parts (other top-level sections, and vendor extensions) are
+    consumed without building any node. The selected sections are built entry
+    by entry (one path, one definition, ...), each entry being converted to
+    python objects before the next one is read, so besides the loaded data the
+    memory used by the loader only depends on the size of the largest entry.
+    Anchored nodes of the skipped parts are still built, as they may be
+    referred to by the selected ones.
+    """
+
+    # Mappings of the first levels (the document and its sections) are loaded entry by entry
+    _STREAMED_LEVELS = 2
+    _MAP_TAGS = (None, Resolver.DEFAULT_MAPPING_TAG)
+    _MERGE_TAG = 'tag:yaml.org,2002:merge'
+
+    def __init__(self, stream, sections=SELECTED_SECTIONS, description_limit=None):
+        """
+        Args:
+            stream: text, bytes or file object of the specification.
+            sections: top-level sections to build.
+            description_limit: if not None, descriptions are truncated to this number of characters.
+        """
+        _EventParser.__init__(self, stream)
+        Composer.__init__(self)
+        SafeConstructor.__init__(self)
+        Resolver.__init__(self)
+        self.sections = frozenset(sections)
+        self.description_limit = description_limit
+        self._parent_key = None
+
+    def get_single_data(self):
+        self.get_event()  # Stream start
+        data = None
+        if not self.check_event(StreamEndEvent):
+            self.get_event()  # Document start
+            data = self._load_node(None, 0)
+            self.get_event()  # Document end
+            self.anchors = {}
+        if not self.check_event(StreamEndEvent):
+            event = self.get_event()
+            raise ComposerError("expected a single document in the stream", None,
+                                "but found another document", event.start_mark)
+        self.get_event()
+        return data
+
+    def _load_node(self, key, level):
+        event = self.peek_event()
+        if (level < self._STREAMED_LEVELS and isinstance(event, MappingStartEvent) and event.anchor is None and
+                event.tag in self._MAP_TAGS):
+            return self._load_mapping(key, level)
+        self._parent_key = key
+        return self.construct_document(self.compose_node(None, None))
+
+    def _load_mapping(self, key, level):
+        named = key in NAMED_MAPPINGS
+        self.get_event()
+        data, merged = {}, []
+        while not self.check_event(MappingEndEvent):
+            self._parent_key = None
+            key_node = self.compose_node(None, None)
+            if key_node.tag == self._MERGE_TAG:
+                value = self._load_node(None, level + 1)
+                merged.extend(value if isinstance(value, list) else [value])
+                continue
+
+            item_key = self.construct_document(key_node)
+            if (level == 0 and item_key not in self.sections) or (not named and self._is_skipped_extension(item_key)):
+                self.skip_node()
+                continue
+            value = self._load_node(item_key, level + 1)
+            if item_key == 'description' and not named and self.description_limit is not None and \
+                    isinstance(value, six.string_types):
+                value = value[:self.description_limit]
+            data[item_key] = value
+        self.get_event()
+
+        if merged:  # explicit keys override merged ones, and the first merged mapping wins
+            result = {}
+            for mapping in reversed(merged):
+                result.update(mapping)
+            result.update(data)
+            data = result
+        return data
+
+    def compose_sequence_node(self, anchor):
+        self._parent_key = None
+        return Composer.compose_sequence_node(self, anchor)
+
+    def compose_mapping_node(self, anchor):
+        named, self._parent_key = self._parent_key in NAMED_MAPPINGS, None
+        start_event = self.get_event()
+        tag = start_event.tag
+        if tag is None or tag == '!':
+            tag = self.resolve(MappingNode, None, start_event.implicit)
+        node = MappingNode(tag, [], start_event.start_mark, None, flow_style=start_event.flow_style)
+        if anchor is not None:
+            self.anchors[anchor] = node
+
+        while not self.check_event(MappingEndEvent):
+            item_key = self.compose_node(node, None)
+            key = item_key.value if isinstance(item_key, ScalarNode) else None
+            if not named and self._is_skipped_extension(key):
+                self.skip_node()
+                continue
+
+            self._parent_key = key
+            item_value = self.compose_node(node, item_key)
+            self._parent_key = None
+            if (key == 'description' and not named and self.description_limit is not None and
+                    isinstance(item_value, ScalarNode)):
+                item_value.value = item_value.value[:self.description_limit]
+            node.value.append((item_key, item_value))
+
+        end_event = self.get_event()
+        node.end_mark = end_event.end_mark
+        return node
+
+    @staticmethod
+    def _is_skipped_extension(key):
+        return isinstance(key, str) and key.startswith('x-') and key not in KEPT_EXTENSIONS
+
+    def skip_node(self):
+        """Consume the events of the next node without building it (except its anchored nodes)."""
+        depth = 0
+        while True:
+            event = self.peek_event()
+            if not isinstance(event, AliasEvent) and getattr(event, 'anchor', None) is not None:
+                self.compose_node(None, None)
+            else:
+                self.get_event()
+                if isinstance(event, CollectionStartEvent):
+                    depth += 1
+                elif isinstance(event, CollectionEndEvent):
+                    depth -= 1
+            if depth == 0:
+                return
+
+
+def load_selective(stream, sections=SELECTED_SECTIONS, description_limit=None):
+    """Load the selected sections of a specification, see SelectiveLoader.
+
+    Args:
+        stream: text, bytes or file object of the specification.
+        sections: top-level sections to build.
+        description_limit: if not None, descriptions are truncated to this number of characters.
+
+    Returns:
+        The specification as a dict.
+    """
+    loader = SelectiveLoader(stream, sections, description_limit)
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def load_path_selective(swagger_path, arguments=None, sections=SELECTED_SECTIONS, description_limit=None):
+    """Load the selected sections of a specification file, see SelectiveLoader.
+
+    The file is streamed to the loader, unless it needs a jinja2 rendering. JSON
+    files which are not valid YAML (ex: tabs) are fully loaded with the json module.
+    """
+    if file_has_template_markers(swagger_path):
+        return load_selective(render_template(read_path(swagger_path), arguments), sections, description_limit)
+    try:
+        with open(swagger_path, 'rb') as swagger_file:
+            return load_selective(swagger_file, sections, description_limit)
+    except yaml.YAMLError:
+        if not is_json_path(swagger_path):
+            raise
+        specification = load_text(read_path(swagger_path), is_json=True)
+        return dict((key, value) for key, value in specification.items() if key in sections)
+
+
+def is_json_path(swagger_path):
+    """Check if the given path names a JSON specification."""
+    return swagger_path.lower().endswith('.json')
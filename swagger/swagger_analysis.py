@@ -1,27 +1,40 @@
+import logging
+import os
 import re
-import traceback
-from collections import Counter
-from os import walk
 
 from swagger.entities import Param, Operation, API
+from swagger.spec_cache import SpecCache, source_version
+from swagger.spec_ir import IR_FORMAT_VERSION, IR_SUFFIX, SpecIR, write_ir
+from swagger.spec_loader import StringTable
 from swagger.swagger_parser import SwaggerParser
 from swagger.swagger_utils import ParamUtils
 
+# String fields of the analysed operations and params interned in the StringTable of a batch
+INTERNED_OPERATION_FIELDS = ("verb", "url", "summary", "desc", "operation_id", "base_path", "intent")
+INTERNED_PARAM_FIELDS = ("name", "location", "type", "pattern", "example", "desc")
+
 
 class SwaggerAnalyser:
-    def __init__(self, swagger_path=None, swagger=None, debug=False):
+    def __init__(self, swagger_path=None, swagger=None, debug=False, cache=None, selective=False, strings=None):
 
         if debug:
             print("Parsing {}".format(swagger_path))
 
         self.debug = debug
+        self.strings = strings
         if swagger:
-            self.doc = SwaggerParser(swagger_yaml=swagger)
+            self.doc = SwaggerParser(swagger_yaml=swagger, cache=cache, lazy_definitions=True, selective=selective,
+                                     strings=strings)
         else:
-            self.doc = SwaggerParser(swagger_path)
+            self.doc = SwaggerParser(swagger_path, cache=cache, lazy_definitions=True, selective=selective,
+                                     strings=strings)
 
         self.auth_tokens = self.auth_keys()
         self.operations = []
+        # Flattened body params per (schema, name, auth tokens), see body_parameters
+        self._body_params = {}
+        # Inline body schemas without type, read as objects, see body_schema
+        self._typed_schemas = {}
 
     def process_parameters(self, params, auth_tokens):
         ret = []
@@ -32,136 +45,187 @@ class SwaggerAnalyser:
         return ret
 
     def process_body_parameters(self, url, method, auth_tokens):
+        """Flatten the schema of the body parameter of an operation into params.
+
+        The schema is read straight from the specification, without building an
+        example body, and the specification is not modified.
+
+        Returns:
+            The list of Param of the body; empty without a body parameter, or when
+            its schema is missing or malformed.
+        """
+        parameters = self.doc.paths[url][method]['parameters']
+        for p in parameters:
+            param = parameters[p]
+            if param.get("in") == 'body':
+                schema = self.body_schema(param)
+                if schema is None:
+                    return []
+                if '$ref' in param['schema']:
+                    param = {**schema, **param}
+                return self.body_parameters(schema, param, auth_tokens)
+        return []
 
-        def get_def(name, sdoc):
-            name = name.replace("#/definitions/", "")
-            defs = sdoc.specification['definitions']
-            return defs.get(name)
+    def body_parameters(self, schema, param, auth_tokens):
+        """Get clones of the flattened params of a body schema, flattened once per schema and name."""
+        key = (id(schema), param.get('name'), tuple(auth_tokens))
+        memo = self._body_params.get(key)
+        if memo is None or memo[0] is not schema:
+            memo = self._body_params[key] = (schema, self.extract_body_parameters(schema, param, auth_tokens))
+        return [p.clone() for p in memo[1]]
+
+    def body_schema(self, param):
+        """Resolve the schema of a body parameter.
+
+        A $ref is resolved to its definition; an inline schema without type is an
+        object (as when the parser builds its example).
+
+        Returns:
+            The schema (a dict), or None if it is missing or does not resolve.
+        """
+        schema = param.get('schema')
+        if not isinstance(schema, dict):
+            return None
+        if '$ref' in schema:
+            ref = schema['$ref']
+            if not isinstance(ref, str):
+                return None
+            definition = self.doc.specification.get('definitions', {}).get(ref.replace("#/definitions/", ""))
+            return definition if isinstance(definition, dict) else None
+        if 'type' not in schema:
+            typed = self._typed_schemas.get(id(schema))
+            if typed is None or typed[0] is not schema:
+                typed = self._typed_schemas[id(schema)] = (schema, dict(schema, type='object'))
+            return typed[1]
+        return schema
 
-        try:
-            data = self.doc.get_send_request_correct_body(url, method)
-            if data:
-                ps = self.doc.paths[url][method]['parameters']
-                for p in ps:
-                    if ps[p].get("in") == 'body':
-                        schema = ps[p].get('schema')
-                        param = ps[p]
-                        if '$ref' in schema:
-                            schema = get_def(schema.get('$ref'), self.doc)
-                            param = {**schema, **param}
-                        return self.extract_body_parameters(schema, param, auth_tokens)
-
-        except KeyError as ke:
-            # error in swagger definition (cannot be parsed for)
-            m = self.doc.paths[url][method]
-            for p in m.get('parameters'):
-                param = m.get('parameters')[p]
-                if param['in'] == 'body':
-                    if not param['schema'].get('type'):
-                        # if not tried fixing the doc, change the schema and try again
-                        param['schema']['type'] = 'object'
-                        return self.process_body_parameters(url, method, auth_tokens)
-                    else:
-                        print(ke)
+    def extract_body_parameters(self, schema, param, auth_tokens):
+        """Flatten a body schema into params.
 
-        except Exception as e:
-            # print("Error file={}, method={} {}".format(f, method, url))
-            raise e
-        return []
+        The schema is walked with an explicit stack instead of recursive calls, so
+        deep schemas do not hit the recursion limit; a sub-schema containing
+        itself (YAML aliases) is not walked again.
 
-    def extract_body_parameters(self, schema, param, auth_tokens):
+        Args:
+            schema: the resolved schema of the body parameter.
+            param: the body parameter; its name prefixes the names of the params.
+            auth_tokens: names of the auth parameters of the specification.
 
-        def traverse(obj, parent_keys=list(), required=set(), auth_tokens=set(), params=list()):
+        Returns:
+            The list of Param of the body, in the order of a depth-first walk.
+        """
+        # print(schema)
+        required = schema.get("required", [])
+        params = []
+        stack = [self.traverse_body_schema(schema, [param.get('name')], required, auth_tokens, params)]
+        path = [id(schema)]
+        walking = {id(schema)}
+        while stack:
+            child = next(stack[-1], None)
+            if child is None:
+                stack.pop()
+                walking.discard(path.pop())
+                continue
+            obj, parent_keys = child
+            if id(obj) in walking:
+                continue
+            stack.append(self.traverse_body_schema(obj, parent_keys, required, auth_tokens, params))
+            path.append(id(obj))
+            walking.add(id(obj))
+        return params
 
-            if obj.get('readOnly', False):
-                # get rid of readonly parameters
+    @staticmethod
+    def traverse_body_schema(obj, parent_keys, required, auth_tokens, params):
+        """Flatten one node of a body schema into params.
+
+        Returns:
+            A generator of the (sub-schema, parent keys) to walk next, in order;
+            each one must be walked before the generator is resumed.
+        """
+        if obj.get('readOnly', False):
+            # get rid of readonly parameters
+            return
+
+        is_enum = False
+        if 'pattern' in obj:
+            if '|' in obj['pattern'] and len(obj['pattern']) > 2 and re.match("\([A-Za-z0-9\s\-_|]*\)",
+                                                                              obj['pattern']):
+                is_enum = True
+
+        if is_enum:
+            # for the time that pattern shows a fix number of options like (yes|no)
+            param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
+                                       auth_tokens=auth_tokens)
+            param.type = "enum_pattern"
+            vals = obj.get('pattern')
+            param.example = vals[1:"".rindex('|')]
+            params.append(param)
+        elif "enum" in obj:
+            param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
+                                       auth_tokens=auth_tokens)
+            param.type = "enum " + param.type
+            params.append(param)
+        elif SwaggerAnalyser.is_object(obj):
+            ps = obj.get("properties")
+            name = obj.get('name')
+            pkeys = list(parent_keys)
+            if name:
+                pkeys.append(name)
+
+            if ps is not None:
+                yield ps, pkeys
                 return
 
-            is_enum = False
-            if 'pattern' in obj:
-                if '|' in obj['pattern'] and len(obj['pattern']) > 2 and re.match("\([A-Za-z0-9\s\-_|]*\)",
-                                                                                  obj['pattern']):
-                    is_enum = True
+            for key in obj.keys():
 
-            if is_enum:
-                # for the time that pattern shows a fix number of options like (yes|no)
-                param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
-                                           auth_tokens=auth_tokens)
-                param.type = "enum_pattern"
-                vals = obj.get('pattern')
-                param.example = vals[1:"".rindex('|')]
-                params.append(param)
-            elif "enum" in obj:
-                param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
+                if isinstance(obj[key], dict):
+                    pkeys = list(parent_keys)
+                    pkeys.append(key)
+                    yield obj[key], pkeys
+                else:
+                    param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
+                                               auth_tokens=auth_tokens)
+                    # (parent_key, get_type(obj), 'body', parent_key in required or key in required, None)
+                    params.append(param)
+                    return
+        elif obj.get("type") == "array" and "items" in obj:
+            ps = obj.get("items")
+            name = obj.get('name')
+            pkeys = list(parent_keys)
+            if name:
+                pkeys.append(name)
+            if ps.get('type') != 'object' and ps.get('type') != 'array':
+                param = Param.from_swagger(obj, parents=pkeys, parent_in='body', required=required,
                                            auth_tokens=auth_tokens)
-                param.type = "enum " + param.type
+                # param.type = ps.get('type', 'array')
+                # key = obj.get('name', parent_key)
+                # (key, ps.get('type', 'array'), 'body', key in required, None)
                 params.append(param)
-            elif SwaggerAnalyser.is_object(obj):
-                ps = obj.get("properties")
-                name = obj.get('name')
-                pkeys = list(parent_keys)
-                if name:
-                    pkeys.append(name)
 
-                if ps is not None:
-                    return traverse(ps, pkeys, required, auth_tokens, params)
-
-                for key in obj.keys():
-
-                    if isinstance(obj[key], dict):
-                        pkeys = list(parent_keys)
-                        pkeys.append(key)
-                        traverse(obj[key], pkeys, required, auth_tokens, params)
-                    else:
-                        param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
-                                                   auth_tokens=auth_tokens)
-                        # (parent_key, get_type(obj), 'body', parent_key in required or key in required, None)
-                        params.append(param)
-                        return
-            elif obj.get("type") == "array" and "items" in obj:
-                ps = obj.get("items")
-                name = obj.get('name')
-                pkeys = list(parent_keys)
-                if name:
-                    pkeys.append(name)
-                if ps.get('type') != 'object' and ps.get('type') != 'array':
-                    param = Param.from_swagger(obj, parents=pkeys, parent_in='body', required=required,
+            yield ps, pkeys
+        else:
+            for key in obj:
+                if not isinstance(obj.get(key), dict):
+                    param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
                                                auth_tokens=auth_tokens)
-                    # param.type = ps.get('type', 'array')
-                    # key = obj.get('name', parent_key)
-                    # (key, ps.get('type', 'array'), 'body', key in required, None)
                     params.append(param)
+                    # paramCounter.update(
+                    #     [(parent_key, get_type(obj), 'body', parent_key in required, obj.get('pattern'))])
+                    return
+                pkeys = list(parent_keys)
+                pkeys.append(key)
+                if SwaggerAnalyser.is_leaf(obj.get(key)):
+                    # obj['name'] = key
 
-                traverse(ps, pkeys, required, auth_tokens, params)
-            else:
-                for key in obj:
-                    if not isinstance(obj.get(key), dict):
-                        param = Param.from_swagger(obj, parents=parent_keys, parent_in='body', required=required,
-                                                   auth_tokens=auth_tokens)
-                        params.append(param)
-                        # paramCounter.update(
-                        #     [(parent_key, get_type(obj), 'body', parent_key in required, obj.get('pattern'))])
-                        return
-                    pkeys = list(parent_keys)
-                    pkeys.append(key)
-                    if SwaggerAnalyser.is_leaf(obj.get(key)):
-                        # obj['name'] = key
-
-                        param = Param.from_swagger(obj.get(key), parents=pkeys, parent_in='body', required=required,
-                                                   auth_tokens=auth_tokens)
-                        params.append(param)
-
-                        # type = get_type(obj.get(key))
-                        # paramCounter.update(
-                        #     [(key, type, 'body', key in required or parent_key in required, obj.get(key).get('pattern'))])
-                    else:
-                        traverse(obj.get(key), pkeys, required, auth_tokens, params)
+                    param = Param.from_swagger(obj.get(key), parents=pkeys, parent_in='body', required=required,
+                                               auth_tokens=auth_tokens)
+                    params.append(param)
 
-        # print(schema)
-        required = schema.get("required", [])
-        params = []
-        traverse(schema, [param.get('name')], required, auth_tokens, params)
-        return params
+                    # type = get_type(obj.get(key))
+                    # paramCounter.update(
+                    #     [(key, type, 'body', key in required or parent_key in required, obj.get(key).get('pattern'))])
+                else:
+                    yield obj.get(key), pkeys
 
     @staticmethod
     def is_object(obj):
@@ -201,12 +265,39 @@ class SwaggerAnalyser:
             auth_tokens[name] = (ptype, in_)
         return auth_tokens.keys()
 
+    def api_header(self):
+        """Get the API of the specification, without its operations."""
+        title = self.doc.specification['info']['title']
+        api_url = self.doc.specification['host'] + self.doc.specification['basePath']
+        protocols = self.doc.specification['schemes']
+        return API(title, api_url, protocols, [])
+
     def analyse(self):
+        api = self.api_header()
+        self.operations.extend(self.iter_operations())
+        api.operations = self.operations
+        return api
+
+    def iter_operations(self, release_paths=False):
+        """Analyse the operations one at a time, in the order of analyse.
+
+        Unlike analyse, the operations are not kept by the analyser, so a caller
+        which writes them out as they come only holds one path at a time.
+
+        Args:
+            release_paths: if True, the parser state of a path (its parsed and raw
+                           specification) is dropped once its operations have been
+                           yielded; the parser does not know the path anymore.
+
+        Returns:
+            A generator of Operation.
+        """
+        raw_paths = {}
+        if release_paths:
+            for raw_path in self.doc.specification.get('paths', {}):
+                raw_paths[u'{0}{1}'.format(self.doc.base_path, raw_path)] = raw_path
+
         for url in sorted(self.doc.paths):
-            title = self.doc.specification['info']['title']
-            api_url = self.doc.specification['host'] + self.doc.specification['basePath']
-            protocols = self.doc.specification['schemes']
-            api = API(title, api_url, protocols, self.operations)
             path = self.doc.paths[url]
             for m in sorted(path.keys()):
                 if m in ['get', 'post', 'put', 'delete', 'patch']:
@@ -233,49 +324,99 @@ class SwaggerAnalyser:
                         op.intent = operation_id.replace(" ", "_")
                     else:
                         op.intent = m + "_" + url.replace("/", " ").replace(" ", "_").replace("{", "").replace("}", "")
-                    self.operations.append(op)
+                    if self.strings is not None:
+                        intern_operation(op, self.strings)
+                    yield op
 
-        return api
+            if release_paths:
+                del self.doc.paths[url]
+                self.doc.specification['paths'].pop(raw_paths.get(url), None)
 
     def base_path(self):
         return self.doc.base_path
 
 
+def intern_operation(operation, strings):
+    """Intern the string fields of an analysed operation, and of its params, in a StringTable."""
+    intern = strings.intern
+    for field in INTERNED_OPERATION_FIELDS:
+        setattr(operation, field, intern(getattr(operation, field)))
+    for param in operation.params or []:
+        for field in INTERNED_PARAM_FIELDS:
+            setattr(param, field, intern(getattr(param, field)))
+    return operation
+
+
+def load_or_analyse(swagger_path=None, swagger=None, ir_directory=None, cache=None, selective=False, strings=None):
+    """Get the analysed API of a specification, from its IR when it was already analysed.
+
+    The IR (see spec_ir) is stored in ir_directory under the hash of the raw
+    specification and of the sources of the swagger package, so the IR of an
+    older analyser is a miss; on a miss the specification is analysed and its
+    IR written.
+
+    Args:
+        swagger_path: path of the swagger file.
+        swagger: content of the swagger file (instead of swagger_path).
+        ir_directory: directory of the IR files; None to always analyse the spec.
+        cache, selective, strings: options of the SwaggerAnalyser.
+
+    Returns:
+        The API returned by SwaggerAnalyser.analyse.
+    """
+    if ir_directory is None:
+        return SwaggerAnalyser(swagger_path, swagger, cache=cache, selective=selective, strings=strings).analyse()
+
+    code_version = source_version()
+    options = (('ir', IR_FORMAT_VERSION), ('code', code_version))
+    if swagger:
+        source_hash = SpecCache.key(swagger, options)
+    else:
+        with open(swagger_path, 'rb') as swagger_file:
+            source_hash = SpecCache.key(swagger_file, options)
+
+    ir_path = os.path.join(ir_directory, source_hash + IR_SUFFIX)
+    try:
+        with SpecIR(ir_path, code_version) as ir:
+            api = ir.api()
+        if strings is not None:
+            for operation in api.operations:
+                intern_operation(operation, strings)
+        return api
+    except FileNotFoundError:
+        pass
+    except ValueError as e:
+        logging.warning("analysing the spec again: {0}".format(e))
+
+    analyser = SwaggerAnalyser(swagger_path, swagger, cache=cache, selective=selective, strings=strings)
+    api = analyser.analyse()
+    os.makedirs(ir_directory, exist_ok=True)
+    write_ir(ir_path, api, analyser.auth_tokens, source_hash, code_version)
+    return api
+
+
+def analyse_specs(swagger_paths, strings=None, **options):
+    """Analyse a batch of specifications, sharing the strings of their documents and operations.
+
+    Args:
+        swagger_paths: paths of the swagger files.
+        strings: StringTable to intern the strings in (a new one if None).
+        options: other arguments of load_or_analyse (ir_directory, cache, selective).
+
+    Returns:
+        A generator of (swagger_path, api) tuples, where api is None when the
+        specification is not valid (the error is logged).
+    """
+    strings = strings if strings is not None else StringTable()
+    for swagger_path in swagger_paths:
+        try:
+            yield swagger_path, load_or_analyse(swagger_path, strings=strings, **options)
+        except ValueError as e:
+            logging.warning(str(e))
+            yield swagger_path, None
+
+
 if __name__ == "__main__":
-    count = 0
-    operations = []
-    paramCounter = Counter()
-    for (dirpath, dirnames, filenames) in walk("./_APIs"):
-        total = len(filenames)
-        count = 0
-        for f in filenames:
-            if f.endswith('.yaml'):
-                try:
-                    param_analyser = SwaggerAnalyser(dirpath + "/" + f)
-                    results = param_analyser.analyse()
-                    operations.extend(results)
-                    for e in results:
-                        for p in e.params:
-                            paramCounter.update([p.to_tuple()])
-                except ValueError:
-                    continue
-                except Exception as e:
-                    traceback.print_exc()
-
-            count += 1
-            print(count, count * 100 / total)
-
-    with open("out/operations.tsv", "wt") as f:
-        f.write("verb\tpath\tsummary\tdesc\tresponse_desc\n")
-        for p in operations:
-            f.write("{}\t{}\t{}\t{}\t{}"
-                    .format(str(p.verb).replace("\t", " "), str(p.url).replace("\t", " "),
-                            str(p.summary).replace("\t", " "),
-                            str(p.desc).replace("\t", " "), str(p.response_desc).replace("\t", " "))
-                    .replace('"', "''").replace("\n", "---").replace("\r", "---") + "\n")
-
-    with open("./out/parameters.tsv", "wt") as f:
-        f.write("name\trequired\tis_auth_param\tlocation\ttype\tpattern\texample\tdesc\tcount\n")
-        for p, c in paramCounter.most_common(len(paramCounter)):
-            f.write("{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}\n"
-                    .format(p[0], p[1], p[2], p[3], p[4], p[5], p[6], p[7], c).replace('"', "''"))
+    from swagger.param_corpus import build_corpus
+
+    build_corpus("./_APIs", "./out")
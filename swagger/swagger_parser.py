@@ -1,18 +1,21 @@
 # -*- coding: utf-8 -*-
 
-import codecs
-import datetime
 import hashlib
-import jinja2
 import json
 import logging
-import re
 import six
 import sys
-import yaml
 
 from copy import deepcopy
 
+from swagger import spec_loader
+from swagger.definition_validator import DefinitionValidators, DefinitionSignatureIndex, \
+    definition_name_from_ref, type_checker
+from swagger.path_router import PathRouter
+from swagger.ref_graph import RefGraph
+from swagger.request_validator import RequestValidators, UNKNOWN_PATH, UNKNOWN_METHOD, \
+    INVALID_POST_BODY, INVALID_BODY, VALIDATION_ERROR
+
 try:
     from StringIO import StringIO
 except ImportError:  # Python 3
@@ -27,13 +30,16 @@ class SwaggerParser(object):
 
     Attributes:
         specification: dict of the yaml file.
-        definitions_example: dict of definition with an example.
+        definitions_example: dict of definition with an example (shared with the examples
+                             built by the parser, read-only).
         paths: dict of path with their actions, parameters, and responses.
     """
 
     _HTTP_VERBS = set(['get', 'put', 'post', 'delete', 'options', 'head', 'patch'])
 
-    def __init__(self, swagger_path=None, swagger_dict=None, swagger_yaml=None, use_example=True, validate=False):
+    def __init__(self, swagger_path=None, swagger_dict=None, swagger_yaml=None, use_example=True, validate=False,
+                 cache=None, lazy_definitions=False, compiled_validators=True, selective=False,
+                 description_limit=None, strings=None):
         """Run parsing from either a file or a dict.
 
         Args:
@@ -43,30 +49,71 @@ class SwaggerParser(object):
                          build definitions example (False value can be useful
                          when making test. Problem can happen if set to True, eg
                          POST {'id': 'example'}, GET /string => 404).
+            cache: optional SpecCache; the parsed state of swagger_path or
+                   swagger_yaml is loaded from (and stored in) it.
+            lazy_definitions: if True, the example of a definition is only
+                              built the first time it is needed, instead of
+                              building all of them during the parsing.
+            compiled_validators: if True, definitions are validated with
+                                 validators compiled once per definition,
+                                 otherwise the spec is walked on each call.
+            selective: if True, swagger_path or swagger_yaml is streamed to a
+                       loader which only builds the sections used by API2CAN
+                       (see spec_loader.SelectiveLoader).
+            description_limit: with selective, maximum length of the
+                               descriptions (None to keep them whole).
+            strings: optional spec_loader.StringTable shared by the parsers of a
+                     batch of specifications (see parse_specs); the keys and
+                     values of swagger_path or swagger_yaml are interned in it.
 
         Raises:
             - ValueError: if no swagger_path or swagger_dict is specified.
                           Or if the given swagger is not valid.
         """
+        self.use_example = use_example
+        self.lazy_definitions = lazy_definitions
+        self.compiled_validators = compiled_validators
+        self.selective = selective
+        self.description_limit = description_limit
+        self.strings = strings
+        self.cache = cache
+        self._cache_key = None
+        # Examples memoized per schema node, see _shared_example
+        self._example_memo = {}
+        self._definitions_in_progress = set()
+        self._partial_reads = 0
         try:
-            if swagger_path is not None:
+            if swagger_path is not None and self.selective:
+                with open(swagger_path, 'rb') as swagger_file:
+                    if self._load_from_cache(swagger_file, 'path'):
+                        return
+                self.specification = self._intern(spec_loader.load_path_selective(
+                    swagger_path, description_limit=self.description_limit))
+            elif swagger_path is not None:
                 # Open yaml file
                 arguments = {}
-                with codecs.open(swagger_path, 'r', 'utf-8') as swagger_yaml:
-                    swagger_template = swagger_yaml.read()
-                    swagger_string = jinja2.Template(swagger_template).render(**arguments)
-                    self.specification = yaml.safe_load(swagger_string)
+                swagger_template = spec_loader.read_path(swagger_path)
+                if self._load_from_cache(swagger_template, 'path'):
+                    return
+                swagger_string = spec_loader.render_template(swagger_template, arguments)
+                self.specification = spec_loader.load_text(swagger_string,
+                                                           is_json=spec_loader.is_json_path(swagger_path),
+                                                           strings=self.strings)
             elif swagger_yaml is not None:
-                json_ = yaml.safe_load(swagger_yaml)
-                json_string = json.dumps(json_)
-                # the json must contain all strings in the form of u'some_string'.
-                # replaced_json_string = re.sub("'(.*)'", "u'\1'", json_string)
-                self.specification = json.loads(json_string)
+                if self._load_from_cache(swagger_yaml, 'yaml'):
+                    return
+                if self.selective:
+                    self.specification = self._intern(spec_loader.load_selective(
+                        swagger_yaml, description_limit=self.description_limit))
+                else:
+                    self.specification = spec_loader.load_text(swagger_yaml, strings=self.strings)
             elif swagger_dict is not None:
                 self.specification = swagger_dict
             else:
                 raise ValueError('You must specify a swagger_path or dict')
 
+        except MemoryError:
+            raise  # not an invalid file
         except Exception as e:
             six.reraise(
                 ValueError,
@@ -74,14 +121,84 @@ class SwaggerParser(object):
                 sys.exc_info()[2])
 
         # Run parsing
-        self.use_example = use_example
+        self.ref_graph = RefGraph(self.specification)
         self.base_path = self.specification.get('basePath', '')
-        self.definitions_example = {}
-        self.build_definitions_example()
+        if self.lazy_definitions:
+            self.definitions_example = LazyDefinitionsExample(self)
+        else:
+            self.definitions_example = {}
+            self.build_definitions_example()
         self.paths = {}
         self.operation = {}
         self.generated_operation = {}
         self.get_paths_data()
+        self._build_indexes()
+        self._store_in_cache()
+
+    _CACHED_ATTRIBUTES = ('specification', 'base_path', 'definitions_example', 'paths', 'operation',
+                          'generated_operation')
+
+    def _cache_options(self, source):
+        """Parser options which change the parsed state, part of the cache key."""
+        return (('source', source), ('use_example', self.use_example), ('lazy_definitions', self.lazy_definitions),
+                ('selective', self.selective and spec_loader.SELECTED_SECTIONS),
+                ('description_limit', self.description_limit))
+
+    def _load_from_cache(self, content, source):
+        """Restore the parsed state of the given content from the cache.
+
+        Args:
+            content: raw content of the specification, or its binary file.
+            source: how the content is loaded ('path' or 'yaml').
+
+        Returns:
+            True if the state has been restored, False on a miss or without a cache.
+        """
+        if self.cache is None:
+            return False
+        self._cache_key = self.cache.key(content, self._cache_options(source))
+        state = self.cache.get(self._cache_key)
+        if state is None:
+            return False
+        for name in self._CACHED_ATTRIBUTES:
+            setattr(self, name, state[name])
+        # The paths share the dicts of the specification, which are interned in place
+        self._intern(self.specification)
+        self.ref_graph = RefGraph(self.specification)
+        if self.lazy_definitions:
+            self.definitions_example = LazyDefinitionsExample(self, self.definitions_example)
+        self._build_indexes()
+        return True
+
+    def _intern(self, specification):
+        """Intern the strings of a loaded specification in the shared StringTable, if any."""
+        if self.strings is not None:
+            self.strings.intern_strings(specification)
+        return specification
+
+    def _store_in_cache(self):
+        """Store the parsed state in the cache, if the spec was read from a cacheable source."""
+        if self.cache is None or self._cache_key is None:
+            return
+        state = dict((name, getattr(self, name)) for name in self._CACHED_ATTRIBUTES)
+        state['definitions_example'] = dict(self.definitions_example)
+        try:
+            self.cache.put(self._cache_key, state)
+        except Exception as e:
+            logging.warning("unable to cache the parsed specification: {0}".format(e))
+
+    def _build_indexes(self):
+        """Build the lookup structures derived from the parsed state (not cached)."""
+        self.router = PathRouter(self.paths)
+        self.validators = DefinitionValidators(self.specification.get('definitions', {}))
+        self._signature_index = None  # built on first use, see definition_signature_index
+        self.request_validators = RequestValidators(self)
+
+    def definition_signature_index(self):
+        """Get the index of the definitions by key signature, used by get_dict_definition."""
+        if self._signature_index is None:
+            self._signature_index = DefinitionSignatureIndex(self.specification.get('definitions', {}))
+        return self._signature_index
 
     def build_definitions_example(self):
         """Parse all definitions in the swagger specification."""
@@ -91,6 +208,12 @@ class SwaggerParser(object):
     def build_one_definition_example(self, def_name):
         """Build the example for the given definition.
 
+        The definitions it refers to are built first, in the topological order
+        of the $ref graph, so building a definition only recurses within its own
+        cycle of definitions (if any). The definitions of a cycle are built
+        starting from the first declared one, and a reference closing the cycle
+        gets a snapshot of the partial example as stub.
+
         Args:
             def_name: Name of the definition.
 
@@ -98,31 +221,61 @@ class SwaggerParser(object):
             True if the example has been created, False if an error occured.
         """
         if def_name in self.definitions_example.keys():  # Already processed
+            if def_name in self._definitions_in_progress:
+                self._partial_reads += 1  # recursive definition, its example is not complete yet
             return True
         elif def_name not in self.specification['definitions'].keys():  # Def does not exist
             return False
 
+        if not self._definitions_in_progress:
+            # Build the dependencies, then the cycle of the definition from its first definition
+            built = True
+            for component in self.ref_graph.new_components(def_name):
+                for name in component:
+                    result = self._build_one_definition_example(name)
+                    if name == def_name:
+                        built = result
+            if def_name in self.definitions_example.keys():
+                return built
+
+        return self._build_one_definition_example(def_name)
+
+    def _build_one_definition_example(self, def_name):
+        if def_name in self.definitions_example.keys():  # Already processed (within its cycle)
+            return True
+
         self.definitions_example[def_name] = {}
-        def_spec = self.specification['definitions'][def_name]
+        self._definitions_in_progress.add(def_name)
+        try:
+            return self._build_definition_example(def_name, self.specification['definitions'][def_name])
+        finally:
+            self._definitions_in_progress.discard(def_name)
 
+    def _build_definition_example(self, def_name, def_spec):
         if def_spec.get('type') == 'array' and 'items' in def_spec:
-            item = self.get_example_from_prop_spec(def_spec['items'])
+            item = self._shared_example(def_spec['items'])
             self.definitions_example[def_name] = [item]
             return True
 
         if 'properties' not in def_spec:
-            self.definitions_example[def_name] = self.get_example_from_prop_spec(def_spec)
+            self.definitions_example[def_name] = self._shared_example(def_spec)
             return True
 
         # Get properties example value
         for prop_name, prop_spec in def_spec['properties'].items():
-            example = self.get_example_from_prop_spec(prop_spec)
+            example = self._shared_example(prop_spec)
             if example is None:
                 return False
             self.definitions_example[def_name][prop_name] = example
 
         return True
 
+    def _definition_example(self, def_name):
+        """Read the example of a definition, noting reads of examples which are still being built."""
+        if def_name in self._definitions_in_progress:
+            self._partial_reads += 1
+        return self.definitions_example[def_name]
+
     @staticmethod
     def check_type(value, type_def):
         """Check if the value is in the type given in type_def.
@@ -134,24 +287,7 @@ class SwaggerParser(object):
         Returns:
             True if the type is correct, False otherwise.
         """
-        if type_def == 'integer':
-            try:
-                # We accept string with integer ex: '123'
-                int(value)
-                return True
-            except ValueError:
-                return isinstance(value, six.integer_types) and not isinstance(value, bool)
-        elif type_def == 'number':
-            return isinstance(value, (six.integer_types, float)) and not isinstance(value, bool)
-        elif type_def == 'string':
-            return isinstance(value, (six.text_type, six.string_types, datetime.datetime))
-        elif type_def == 'boolean':
-            return (isinstance(value, bool) or
-                    (isinstance(value, (six.text_type, six.string_types,)) and
-                     value.lower() in ['true', 'false'])
-                    )
-        else:
-            return False
+        return type_checker(type_def)(value)
 
     def get_example_from_prop_spec(self, prop_spec):
         """Return an example value from a property specification.
@@ -160,9 +296,28 @@ class SwaggerParser(object):
             prop_spec: the specification of the property.
 
         Returns:
-            An example value
+            An example value, which the caller can modify.
+        """
+        return deepcopy(self._shared_example(prop_spec))
+
+    def _shared_example(self, prop_spec):
+        """Get the example of a property specification, memoized per specification.
+
+        The example is shared with the memo and with the examples it is nested
+        into, so it must not be modified. The examples built from a definition
+        whose example is not complete yet (recursive definitions) are not memoized.
         """
+        memo = self._example_memo.get(id(prop_spec))
+        if memo is not None and memo[0] is prop_spec:
+            return memo[1]
 
+        partial_reads = self._partial_reads
+        example = self._example_from_prop_spec(prop_spec)
+        if partial_reads == self._partial_reads:
+            self._example_memo[id(prop_spec)] = (prop_spec, example)
+        return example
+
+    def _example_from_prop_spec(self, prop_spec):
         # Read example directly from (X-)Example or Default value
         easy_keys = ['example', 'x-example', 'default']
         for key in easy_keys:
@@ -210,39 +365,25 @@ class SwaggerParser(object):
             An example for the given spec
             A boolean, whether we had additionalProperties in the spec, or not
         """
-        local_spec = deepcopy(spec)
+        properties = spec.get('properties')
 
         # Handle additionalProperties if they exist
-        # we replace additionalProperties with two concrete
-        # properties so that examples can be generated
-        additional_property = False
-        if 'additionalProperties' in local_spec:
-            additional_property = True
-            if 'properties' not in local_spec:
-                local_spec['properties'] = {}
-            local_spec['properties'].update({
-                'any_prop1': local_spec['additionalProperties'],
-                'any_prop2': local_spec['additionalProperties'],
-            })
-            del (local_spec['additionalProperties'])
-            required = local_spec.get('required', [])
-            required += ['any_prop1', 'any_prop2']
-            local_spec['required'] = required
+        # we add two concrete properties with the spec of additionalProperties
+        # so that examples can be generated (the spec itself is left untouched)
+        additional_property = 'additionalProperties' in spec
+        if additional_property:
+            properties = dict(properties or {})
+            properties['any_prop1'] = spec['additionalProperties']
+            properties['any_prop2'] = spec['additionalProperties']
 
         example = {}
-        properties = local_spec.get('properties')
         if properties is not None:
-            # required = local_spec.get('required', properties.keys())
-
             for inner_name, inner_spec in properties.items():
-                # if inner_name not in required:
-                #     continue
-
                 if not isinstance(inner_spec, dict):
                     partial = [inner_spec]
                 else:
-                    partial = self.get_example_from_prop_spec(inner_spec)
-                # While get_example_from_prop_spec is supposed to return a list,
+                    partial = self._shared_example(inner_spec)
+                # While _shared_example is supposed to return a list,
                 # we don't actually want that when recursing to build from
                 # properties
                 if isinstance(partial, list):
@@ -330,11 +471,11 @@ class SwaggerParser(object):
         definition_name = self.get_definition_name_from_ref(prop_spec['$ref'])
 
         if self.build_one_definition_example(definition_name):
-            example_dict = self.definitions_example[definition_name]
-            if not isinstance(example_dict, dict):
+            example_dict = self._definition_example(definition_name)
+            if not isinstance(example_dict, dict) or definition_name not in self._definitions_in_progress:
                 return example_dict
-            example = dict((example_name, example_value) for example_name, example_value in example_dict.items())
-            return example
+            # Snapshot of a recursive definition whose example is still being built
+            return dict(example_dict)
 
     def _example_from_complex_def(self, prop_spec):
         """Get an example from a property specification.
@@ -352,7 +493,7 @@ class SwaggerParser(object):
         elif 'type' not in prop_spec['schema']:
             definition_name = self.get_definition_name_from_ref(prop_spec['schema']['$ref'])
             if self.build_one_definition_example(definition_name):
-                return self.definitions_example[definition_name]
+                return self._definition_example(definition_name)
         elif prop_spec['schema']['type'] == 'array':  # Array with definition
             # Get value from definition
             if 'items' in prop_spec.keys():
@@ -363,9 +504,9 @@ class SwaggerParser(object):
                 else:
                     definition_name = self.get_definition_name_from_ref(prop_spec['schema']['items']['type'])
                     return [definition_name]
-            return [self.definitions_example[definition_name]]
+            return [self._definition_example(definition_name)]
         else:
-            return self.get_example_from_prop_spec(prop_spec['schema'])
+            return self._shared_example(prop_spec['schema'])
 
     def _example_from_array_spec(self, prop_spec):
         """Get an example from a property specification of an array.
@@ -378,7 +519,7 @@ class SwaggerParser(object):
         """
         # if items is a list, then each item has its own spec
         if isinstance(prop_spec['items'], list):
-            return [self.get_example_from_prop_spec(item_prop_spec) for item_prop_spec in prop_spec['items']]
+            return [self._shared_example(item_prop_spec) for item_prop_spec in prop_spec['items']]
         # Standard types in array
         elif 'type' in prop_spec['items'].keys():
             if 'format' in prop_spec['items'].keys() and prop_spec['items']['format'] == 'date-time':
@@ -393,7 +534,7 @@ class SwaggerParser(object):
             definition_name = self.get_definition_name_from_ref(prop_spec['items']['$ref']) or \
                               self.get_definition_name_from_ref(prop_spec['schema']['items']['$ref'])
             if self.build_one_definition_example(definition_name):
-                example_dict = self.definitions_example[definition_name]
+                example_dict = self._definition_example(definition_name)
                 if not isinstance(example_dict, dict):
                     return [example_dict]
                 if len(example_dict) == 1:
@@ -411,7 +552,7 @@ class SwaggerParser(object):
         elif 'properties' in prop_spec['items']:
             prop_example = {}
             for prop_name, prop_spec in prop_spec['items']['properties'].items():
-                example = self.get_example_from_prop_spec(prop_spec)
+                example = self._shared_example(prop_spec)
                 if example is not None:
                     prop_example[prop_name] = example
             return [prop_example]
@@ -429,7 +570,8 @@ class SwaggerParser(object):
             If get_list is True, return a list of definition_name.
         """
         list_def_candidate = []
-        for definition_name in self.specification['definitions'].keys():
+        # Only the definitions whose key signature fits the dict can match it
+        for definition_name in self.definition_signature_index().candidates(dict):
             if self.validate_definition(definition_name, dict):
                 if not get_list:
                     return definition_name
@@ -497,6 +639,19 @@ class SwaggerParser(object):
         Returns:
             True if the given dict match the definition, False otherwise.
         """
+        if not self.compiled_validators:
+            return self._interpret_definition(definition_name, dict_to_test, definition)
+
+        if definition:
+            validator = self.validators.compile(definition, definition_name)
+        else:
+            validator = self.validators.get(definition_name)
+        if validator is None:  # reject unknown definition
+            return False
+        return validator(dict_to_test)
+
+    def _interpret_definition(self, definition_name, dict_to_test, definition=None):
+        """Validate the given dict by walking the definition spec (uncompiled path)."""
         if (definition_name not in self.specification['definitions'].keys() and
                     definition is None):
             # reject unknown definition
@@ -615,7 +770,9 @@ class SwaggerParser(object):
         for parameter in parameter_list:
             if parameter.get('$ref'):
                 # expand parameter from $ref if not specified inline
-                parameter = self.specification['parameters'].get(parameter.get('$ref').split('/')[-1])
+                ref = parameter.get('$ref')
+                parameter = self.ref_graph.resolve(ref) or \
+                    self.specification['parameters'].get(ref.split('/')[-1])
             parameter_map[parameter['name']] = parameter
 
     @staticmethod
@@ -628,9 +785,7 @@ class SwaggerParser(object):
         Returns:
             The definition name corresponding to the ref.
         """
-        p = re.compile('#\/definitions\/(.*)')
-        definition_name = re.sub(p, r'\1', ref)
-        return definition_name
+        return definition_name_from_ref(ref)
 
     def get_path_spec(self, path, action=None):
         """Get the specification matching with the given path.
@@ -643,21 +798,11 @@ class SwaggerParser(object):
             A tuple with the base name of the path and the specification.
             Or (None, None) if no specification is found.
         """
-        # Get the specification of the given path
-        path_spec = None
-        path_name = None
-        for base_path in self.paths.keys():
-            if path == base_path:
-                path_spec = self.paths[base_path]
-                path_name = base_path
-
-        # Path parameter
+        # Get the specification of the given path, or of the template matching it
+        path_name = self.router.match(path)
+        path_spec = self.paths.get(path_name) if path_name is not None else None
         if path_spec is None:
-            for base_path in self.paths.keys():
-                regex_from_path = re.compile(re.sub('{[^/]*}', '([^/]*)', base_path) + r'$')
-                if re.match(regex_from_path, path):
-                    path_spec = self.paths[base_path]
-                    path_name = base_path
+            path_name = None
 
         # Test action if given
         if path_spec is not None and action is not None:
@@ -698,42 +843,42 @@ class SwaggerParser(object):
                before we go deeper into the parameters
             - Check form data parameters
         """
-        path_name, path_spec = self.get_path_spec(path)
+        path_name, violation = self.request_validators.check(path, action, body, query)
+        if violation is None:
+            return True
 
-        if path_spec is None:  # reject unknown path
+        kind, msg = violation
+        if kind == UNKNOWN_PATH:
             logging.warn("there is no path")
-            return False
-
-        if action not in path_spec.keys():  # reject unknown http method
-            logging.warn("this http method is unknown '{0}'".format(action))
-            return False
+        elif kind == UNKNOWN_METHOD:
+            logging.warn(msg)
+        elif kind == INVALID_POST_BODY:
+            logging.warn("the general post body did not validate due to '{0}'".format(msg))
+        elif kind == INVALID_BODY:
+            logging.warn("the parameters in the body did not validate due to '{0}'".format(msg))
+        return False
 
-        action_spec = path_spec[action]
+    def validate_requests(self, requests):
+        """Validate a batch of requests, without logging.
 
-        # check general post body guidelines (body + mime type)
-        if action == 'post':
-            is_ok, msg = _validate_post_body(body, action_spec)
-            if not is_ok:
-                logging.warn("the general post body did not validate due to '{0}'".format(msg))
-                return False
+        The requests go through validators compiled once per operation (see
+        request_validator.RequestValidators). An exception raised while
+        validating a request is reported as a VALIDATION_ERROR violation.
 
-        # If the body is empty and it validated so far, we can return here
-        # unless there is something in the query parameters we need to check
-        body_is_empty = body in [None, {}, '']
-        if body_is_empty and query is None:
-            return True
-
-        # Check body parameters
-        is_ok, msg = self._validate_body_parameters(body, action_spec)
-        if not is_ok:
-            logging.warn("the parameters in the body did not validate due to '{0}'".format(msg))
-            return False
-
-        # Check query parameters
-        if query is not None and not self._validate_query_parameters(query, action_spec):
-            return False
+        Args:
+            requests: iterable of (path, action, body, query) tuples.
 
-        return True
+        Returns:
+            A generator of (path_name, violation) tuples, one per request, where
+            path_name is the path template of the request (None if unknown) and
+            violation is a (kind, msg) tuple, or None if the request is valid.
+        """
+        check = self.request_validators.check
+        for path, action, body, query in requests:
+            try:
+                yield check(path, action, body, query)
+            except Exception as e:
+                yield self.router.match(path), (VALIDATION_ERROR, "{0}: {1}".format(type(e).__name__, e))
 
     def _validate_query_parameters(self, query, action_spec):
         """Check the query parameter for the action specification.
@@ -819,6 +964,9 @@ class SwaggerParser(object):
         """Get a response example from a response spec.
 
         """
+        return deepcopy(self._response_example(resp_spec))
+
+    def _response_example(self, resp_spec):
         if 'schema' in resp_spec.keys():
             if '$ref' in resp_spec['schema']:  # Standard definition
                 definition_name = self.get_definition_name_from_ref(resp_spec['schema']['$ref'])
@@ -835,7 +983,7 @@ class SwaggerParser(object):
                         return ''
                 return [self.definitions_example[definition_name]]
             elif 'type' in resp_spec['schema']:
-                return self.get_example_from_prop_spec(resp_spec['schema'])
+                return self._shared_example(resp_spec['schema'])
         else:
             return ''
 
@@ -870,10 +1018,14 @@ class SwaggerParser(object):
         return response
 
     def build_example(self, spec):
+        """Get an example of a body parameter, which the caller can modify."""
+        return deepcopy(self._build_example(spec))
+
+    def _build_example(self, spec):
         # Get body parameter
         if 'type' in spec.keys():
             # Get value from type
-            return self.get_example_from_prop_spec(spec)
+            return self._shared_example(spec)
         elif 'schema' in spec.keys():
             if 'type' in spec['schema'].keys() and spec['schema']['type'] == 'array':
                 # It is an array
@@ -881,22 +1033,23 @@ class SwaggerParser(object):
                 if '$ref' in spec['schema']['items']:
                     definition_name = self.get_definition_name_from_ref(spec['schema']
                                                                         ['items']['$ref'])
-                    return [self.definitions_example[definition_name]]
+                    return [self._definition_example(definition_name)]
                 else:
                     # definition_name = self.get_definition_name_from_ref(spec['schema']['items']['type'])
-                    return [self.build_example(spec['schema']['items'])]
+                    return [self._build_example(spec['schema']['items'])]
 
             elif 'type' in spec['schema'].keys():
                 # Type but not array
-                return self.get_example_from_prop_spec(spec['schema'])
+                return self._shared_example(spec['schema'])
             elif 'properties' in spec['schema'].keys():
                 # Probably 'object' but not written
                 spec['schema']['type'] = 'object'
-                return self.get_example_from_prop_spec(spec['schema'])
+                self._example_memo.pop(id(spec['schema']), None)
+                return self._shared_example(spec['schema'])
             else:
                 # Get value from definition
                 definition_name = self.get_definition_name_from_ref(spec['schema']['$ref'])
-                return self.definitions_example[definition_name]
+                return self._definition_example(definition_name)
 
     def get_send_request_correct_body(self, path, action):
         """Get an example body which is correct to send to the given path with the given action.
@@ -918,53 +1071,47 @@ class SwaggerParser(object):
                     return self.build_example(spec)
 
 
-def _validate_post_body(actual_request_body, body_specification):
-    """ returns a tuple (boolean, msg)
-        to indicate whether the validation passed
-        if False then msg contains the reason
-        if True then msg is empty
+class LazyDefinitionsExample(dict):
+    """Definitions examples which are built on first access.
+
+    Reading a missing definition builds its example with the parser, so the
+    cost of the examples grows with the definitions actually used instead of
+    with the size of the definitions section. Note that for self-referencing
+    definitions, where the recursion is cut depends on which definition of the
+    cycle is built first.
     """
 
-    # If no body specified, return True (POST with empty body is allowed):
-    if "body" not in body_specification["parameters"]:
-        return True, ""
+    def __init__(self, parser, examples=()):
+        super(LazyDefinitionsExample, self).__init__(examples)
+        self.parser = parser
 
-    # Are there required parameters? - there is only ONE body, so we check that one
-    parameters_required = body_specification['parameters']['body']['required']
-
-    # What if it says 'required' but there is no schema ? - we reject it
-    schema_present = body_specification['parameters']['body'].get('schema')
-    if parameters_required and not schema_present:
-        msg = "there is no schema given, but it says there are required parameters"
-        return False, msg
-
-    # What is the mime type ?
-    text_is_accepted = any('text' in item for item in body_specification.get('consumes', []))
-    json_is_accepted = any('json' in item for item in body_specification.get('consumes', []))
-
-    if actual_request_body is '' and not text_is_accepted:
-        msg = "post body is an empty string, but text is not an accepted mime type"
-        return False, msg
-
-    if actual_request_body == {} and not json_is_accepted:
-        msg = "post body is an empty dict, but json is not an accepted mime type"
-        return False, msg
-
-    # If only json is accepted, but the body is a string, we transform the
-    # string to json and check it then (not sure if the server would accept
-    # that string, though)
-    if (json_is_accepted and not
-    text_is_accepted and
-                type(actual_request_body).__name__ == 'str'):
-        actual_request_body = json.loads(actual_request_body)
-
-    # Handle empty body
-    body_is_empty = actual_request_body in [None, '', {}]
-    if body_is_empty:
-        if parameters_required:
-            msg = "there is no body, but it says there are required parameters"
-            return False, msg
-        else:
-            return True, ""
+    def __missing__(self, def_name):
+        self.parser.build_one_definition_example(def_name)
+        if not dict.__contains__(self, def_name):
+            raise KeyError(def_name)
+        return dict.__getitem__(self, def_name)
+
+
+def parse_specs(swagger_paths, strings=None, **options):
+    """Parse a batch of specifications, sharing the strings of their documents.
 
-    return True, ""
+    All the specifications are loaded with the same StringTable, so the keys and
+    values repeated across the documents ('type', 'string', 'query', common
+    descriptions...) are only held once by the parsers of the batch.
+
+    Args:
+        swagger_paths: paths of the swagger files.
+        strings: StringTable to intern the strings in (a new one if None).
+        options: other arguments of SwaggerParser (cache, lazy_definitions...).
+
+    Returns:
+        A generator of (swagger_path, parser) tuples, where parser is None when
+        the specification is not valid (the error is logged).
+    """
+    strings = strings if strings is not None else spec_loader.StringTable()
+    for swagger_path in swagger_paths:
+        try:
+            yield swagger_path, SwaggerParser(swagger_path, strings=strings, **options)
+        except ValueError as e:
+            logging.warning(str(e))
+            yield swagger_path, None
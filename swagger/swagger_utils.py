@@ -4,7 +4,6 @@ import re
 import wordninja
 from nltk.stem import WordNetLemmatizer
 from pandas import read_csv
-from tabulate import tabulate
 
 from swagger.entities import Param
 from utils.preprocess import remove_stopword
@@ -21,6 +20,7 @@ entity_file = os.path.join(__location__, "files/entity-list.txt")
 class ParamUtils:
     def __init__(self, params_tsv=params_file, entity_file=entity_file) -> None:
 
+        self.params_tsv = params_tsv
         self.df_params = read_csv(params_tsv, sep='\t')
         self.df_params = self.df_params[self.df_params.is_auth_param == False]  # Remove authentication parameters
         self.df_params['name'] = self.df_params['name'].apply(ParamUtils.normalize)
@@ -225,81 +225,10 @@ class ParamUtils:
         return False
 
     def stats(self):
-        print("—————————————————— params.tsv ———————————————————————")
-        print("#Unique Parameters : ", self.df_params.shape[0])
-        # print("—————————————————————————————————————————————————————")
-        # name	type	required	pattern 	count
-        g = self.df_params.groupby(['type']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters({}) by Types:".format(total))
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        g = self.df_params.groupby(['required']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters by Required:".format(total))
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        g = self.df_params.groupby(['location']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters Request Location:".format(total))
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        g = self.df_params['desc'].apply(lambda a: a != 'None')
-        self.df_params['desc'] = g
-        g = self.df_params.groupby(['desc']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters by Desc:")
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        g = self.df_params['pattern'].apply(lambda a: a != 'None')
-        self.df_params['pattern'] = g
-        g = self.df_params.groupby(['pattern']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters by Patterns:")
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        g = self.df_params['example'].apply(lambda a: a != 'None')
-        self.df_params['example'] = g
-        g = self.df_params.groupby(['example']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Parameters by Example:")
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")
-        # g = df_params.groupby(['is_auth_param']).sum()
-        # total = g['count'].sum()
-        # g['percent'] = g['count'] / total * 100
-        # print("Authentication Parameters:")
-        # print(tabulate(g, headers='keys', tablefmt='psql'))
-
-        # print("—————————————————————————————————————————————————————")[, 'key', 'identifier', 'ids']
-        self.df_params['identifier'] = self.df_params['name'].apply(ParamUtils.is_identifier)
-        g = self.df_params.groupby(['identifier']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Identifier Parameters:")
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-        self.df_params.drop(columns=['identifier'], inplace=True)
-
-        # print("—————————————————————————————————————————————————————")[, 'key', 'identifier', 'ids']
-        self.df_params['entity'] = self.df_params['name'].apply(self.is_named_entity)
-        g = self.df_params.groupby(['entity']).sum()
-        total = g['count'].sum()
-        g['percent'] = g['count'] / total * 100
-        print("Entity Parameters:")
-        print(tabulate(g, headers='keys', tablefmt='psql'))
-        self.df_params.drop(columns=['entity'], inplace=True)
+        """Print the statistics of the parameters file, see param_stats.ParamStats."""
+        from swagger.param_stats import ParamStats
+
+        print(ParamStats(self.entities).read(self.params_tsv).format())
 
 
 class PathUtils:
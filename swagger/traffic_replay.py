@@ -0,0 +1,199 @@
+"""
+Replay captured requests against a swagger specification and count the
+contract violations of each operation.
+
+Usage:
+    PYTHONPATH=. python3 swagger/traffic_replay.py SPEC TRAFFIC [TRAFFIC ...] [--jobs N] [--json]
+
+TRAFFIC files are HAR files (.har) or JSON lines files, with one request per line:
+    {"method": "GET", "url": "https://example.com/v1/pets?limit=10", "body": null}
+"path" can be given instead of "url", and "query" (a dict) overrides the query string of the url.
+"""
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+from collections import Counter
+from urllib.parse import parse_qsl, urlsplit
+
+from swagger.spec_cache import SpecCache
+from swagger.swagger_parser import SwaggerParser
+from utils.arguments import positive_int
+
+UNKNOWN_OPERATION = "<unknown path>"
+VALID = "valid"
+
+_parser = None  # parser of the specification, one per worker process
+
+
+def parse_url(url):
+    """Split an url (or a path) into its path and its query parameters.
+
+    Returns:
+        A (path, query) tuple, where query maps the parameter names to their
+        value (a list for repeated parameters), or is None without query string.
+    """
+    parts = urlsplit(url)
+    if not parts.query:
+        return parts.path, None
+    query = {}
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        if name in query:
+            if not isinstance(query[name], list):
+                query[name] = [query[name]]
+            query[name].append(value)
+        else:
+            query[name] = value
+    return parts.path, query
+
+
+def parse_body(text, mime_type=None):
+    """Decode a captured body; JSON bodies (or bodies without mime type) are loaded."""
+    if text is None or text == '':
+        return None
+    if mime_type is None or 'json' in mime_type:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    return text
+
+
+def read_har(har_path):
+    """Read the requests of a HAR file.
+
+    Returns:
+        A generator of (path, action, body, query) tuples.
+    """
+    with open(har_path, encoding="utf-8") as f:
+        har = json.load(f)
+    for entry in har.get("log", {}).get("entries", []):
+        request = entry["request"]
+        path, query = parse_url(request["url"])
+        post_data = request.get("postData") or {}
+        yield path, request["method"].lower(), parse_body(post_data.get("text"), post_data.get("mimeType")), query
+
+
+def read_jsonl(jsonl_path):
+    """Read the requests of a JSON lines file, one request is read at a time.
+
+    Returns:
+        A generator of (path, action, body, query) tuples.
+    """
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            request = json.loads(line)
+            path, query = parse_url(request.get("url") or request["path"])
+            if "query" in request:
+                query = request["query"]
+            body = request.get("body")
+            if isinstance(body, str):
+                body = parse_body(body)
+            yield path, request["method"].lower(), body, query
+
+
+def read_requests(traffic_paths):
+    """Read the requests of the given HAR and JSON lines files, in order."""
+    for traffic_path in traffic_paths:
+        if traffic_path.lower().endswith(".har"):
+            yield from read_har(traffic_path)
+        else:
+            yield from read_jsonl(traffic_path)
+
+
+def chunks(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _init_worker(spec_path, selective):
+    global _parser
+    logging.disable(logging.WARNING)
+    _parser = SwaggerParser(spec_path, cache=SpecCache.from_env(), lazy_definitions=True, selective=selective)
+
+
+def _validate_chunk(requests):
+    """Count the outcomes of a chunk of requests, by (operation, kind of violation)."""
+    counts = Counter()
+    for (_, action, _, _), (path_name, violation) in zip(requests, _parser.validate_requests(requests)):
+        operation = "{} {}".format(action.upper(), path_name or UNKNOWN_OPERATION)
+        counts[(operation, violation[0] if violation is not None else VALID)] += 1
+    return counts
+
+
+def replay(spec_path, requests, jobs=1, chunk_size=1000, selective=False):
+    """Validate captured requests against a specification.
+
+    Args:
+        spec_path: path of the swagger file.
+        requests: iterable of (path, action, body, query) tuples.
+        jobs: number of worker processes.
+        chunk_size: number of requests sent to a worker at a time.
+        selective: load the specification with the selective loader.
+
+    Returns:
+        A Counter of the requests by (operation, kind of violation), where the
+        kind of the valid requests is VALID.
+    """
+    counts = Counter()
+    if jobs <= 1:
+        _init_worker(spec_path, selective)
+        for chunk in chunks(requests, chunk_size):
+            counts.update(_validate_chunk(chunk))
+        return counts
+
+    with multiprocessing.Pool(jobs, initializer=_init_worker, initargs=(spec_path, selective)) as pool:
+        for chunk_counts in pool.imap_unordered(_validate_chunk, chunks(requests, chunk_size)):
+            counts.update(chunk_counts)
+    return counts
+
+
+def report(counts):
+    """Summarize the counts of replay, per operation.
+
+    Returns:
+        A list of dicts (operation, requests, violations, and the count of each
+        kind of violation), sorted by decreasing number of violations.
+    """
+    operations = {}
+    for (operation, kind), count in counts.items():
+        row = operations.setdefault(operation, {"operation": operation, "requests": 0, "violations": 0, "kinds": {}})
+        row["requests"] += count
+        if kind != VALID:
+            row["violations"] += count
+            row["kinds"][kind] = count
+    return sorted(operations.values(), key=lambda row: (-row["violations"], row["operation"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay captured requests against a swagger specification")
+    parser.add_argument("spec", help="swagger file")
+    parser.add_argument("traffic", nargs="+", help="HAR or JSON lines files of requests")
+    parser.add_argument("--jobs", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=positive_int, default=1000,
+                        help="number of requests sent to a worker at a time")
+    parser.add_argument("--selective", action="store_true", help="load the spec with the selective loader")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args()
+
+    rows = report(replay(args.spec, read_requests(args.traffic), args.jobs, args.chunk_size, args.selective))
+    if args.json:
+        print(json.dumps(rows, indent=4))
+        return
+
+    print("{:<60} {:>10} {:>10}  {}".format("operation", "requests", "violations", "kinds"))
+    for row in rows:
+        kinds = ", ".join("{}: {}".format(kind, count) for kind, count in sorted(row["kinds"].items()))
+        print("{:<60} {:>10} {:>10}  {}".format(row["operation"][:60], row["requests"], row["violations"], kinds))
+
+
+if __name__ == "__main__":
+    main()
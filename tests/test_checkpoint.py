@@ -0,0 +1,53 @@
+import pytest
+
+from canonical.checkpoint import Checkpoint, checkpoint_file_name
+
+RECORDS = [{"api": "pets.yaml", "verb": "get"}]
+
+
+def test_checkpoint_file_name():
+    assert checkpoint_file_name() == "checkpoint.jsonl"
+    assert checkpoint_file_name(0, 2) == "checkpoint.shard-0-of-2.jsonl"
+
+
+def test_resume_an_interrupted_run(tmp_path):
+    path = str(tmp_path / checkpoint_file_name())
+    checkpoint = Checkpoint(path, interval=1, version="v1")
+    checkpoint.add("pets.yaml", "hash-1", RECORDS, reused=1)
+    checkpoint.add("broken.yaml", "hash-2", [], error="")
+    checkpoint.close()
+    with open(path, "a") as f:
+        f.write('{"api": "shop.yaml", "sha2')  # entry cut by the interruption
+
+    resumed = Checkpoint(path, resume=True, version="v1")
+    assert list(resumed.entries) == ["pets.yaml", "broken.yaml"]
+    assert resumed.get("pets.yaml", "hash-1")["records"] == RECORDS
+    assert resumed.get("pets.yaml", "hash-0") is None
+    assert resumed.get("broken.yaml", "hash-2")["error"] == ""
+    resumed.add("shop.yaml", "hash-3", RECORDS)
+    resumed.close()
+    assert list(Checkpoint(path, resume=True, version="v1").entries) == ["pets.yaml", "broken.yaml", "shop.yaml"]
+
+    assert not Checkpoint(path, resume=True, version="v2").entries
+
+
+def test_a_run_does_not_overwrite_an_interrupted_one(tmp_path):
+    path = str(tmp_path / checkpoint_file_name())
+    checkpoint = Checkpoint(path)
+    checkpoint.close()
+    checkpoint = Checkpoint(path)  # an empty journal holds no progress
+    checkpoint.add("pets.yaml", "hash-1", RECORDS)
+    checkpoint.close()
+
+    with pytest.raises(FileExistsError):
+        Checkpoint(path)
+    assert list(Checkpoint(path, resume=True).entries) == ["pets.yaml"]
+
+
+def test_remove_a_completed_run(tmp_path):
+    path = tmp_path / checkpoint_file_name()
+    checkpoint = Checkpoint(str(path))
+    checkpoint.add("pets.yaml", "hash-1", RECORDS)
+    checkpoint.remove()
+    assert not path.exists()
+    Checkpoint(str(path)).close()
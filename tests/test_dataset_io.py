@@ -0,0 +1,112 @@
+import gzip
+import json
+import os
+import pickle
+
+import pytest
+
+from canonical.dataset_io import DatasetIndex, JsonlWriter, JsonWriter, dataset_format, dataset_writer, \
+    jsonl_to_json, read_dataset, read_json, read_jsonl
+
+RECORDS = [{"api": "pets.yaml", "verb": "get", "url": "/pets/{id}", "desc": "a \"pet\", [or] {two}\né",
+            "params": [{"name": "id", "example": None, "required": True}]},
+           {"api": "pets.yaml", "verb": "post", "url": "/pets", "desc": None, "params": []},
+           {"api": "shop.yaml", "verb": "get", "url": "/", "score": 12.5, "params": [1, [2, {"3": [4]}]]}]
+
+
+def test_dataset_format():
+    assert [dataset_format(path) for path in ["a.json", "a.jsonl", "a.jsonl.gz"]] == ["json", "jsonl", "jsonl.gz"]
+
+
+@pytest.mark.parametrize("records", [[], RECORDS[:1], RECORDS])
+def test_json_writer_is_json_dumps(tmp_path, records):
+    path = str(tmp_path / "API2Can-train.json")
+    with dataset_writer(path) as writer:
+        for record in records:
+            writer.write(record)
+    with open(path) as f:
+        assert f.read() == json.dumps(records, indent=4)
+    assert list(read_dataset(path)) == records
+
+
+@pytest.mark.parametrize("text", [json.dumps(RECORDS, indent=4), json.dumps(RECORDS), "\n [ 1 , \"]\" ,{}, [] ]\n",
+                                  "[]", "[123456789, 2.5e10, true, null]"])
+def test_read_json_by_chunks(tmp_path, text):
+    path = tmp_path / "API2Can-test.json"
+    path.write_text(text, encoding="utf-8")
+    for chunk_size in (1, 2, 5, 64, 1 << 16):
+        assert list(read_json(str(path), chunk_size)) == json.loads(text)
+
+
+@pytest.mark.parametrize("text", ["", "{}", "[1, 2", "[1 2]", "[{\"a\": 1}", "[1,]"])
+def test_read_json_rejects_incomplete_datasets(tmp_path, text):
+    path = tmp_path / "API2Can-test.json"
+    path.write_text(text)
+    for chunk_size in (1, 4, 1 << 16):
+        with pytest.raises(ValueError):
+            list(read_json(str(path), chunk_size))
+
+
+@pytest.mark.parametrize("name", ["API2Can-train.jsonl", "API2Can-train.jsonl.gz"])
+def test_jsonl_round_trip(tmp_path, name):
+    path = str(tmp_path / name)
+    with dataset_writer(path) as writer:
+        writer.write_all(RECORDS)
+    assert list(read_dataset(path)) == RECORDS
+
+    json_path, count = jsonl_to_json(path)
+    assert json_path == str(tmp_path / "API2Can-train.json") and count == len(RECORDS)
+    assert list(read_dataset(json_path)) == RECORDS
+
+
+def test_read_jsonl_skips_the_end_of_an_interrupted_run(tmp_path):
+    path = str(tmp_path / "checkpoint.jsonl")
+    with JsonlWriter(path) as writer:
+        writer.write_all(RECORDS[:2])
+    with open(path, "a") as f:
+        f.write(json.dumps(RECORDS[2])[:20])
+    assert list(read_jsonl(path)) == RECORDS[:2]
+
+    gz_path = str(tmp_path / "API2Can-train.jsonl.gz")
+    with gzip.open(gz_path, "wt") as f:
+        f.write("".join(json.dumps(record) + "\n" for record in RECORDS))
+    with open(gz_path, "rb") as f:
+        content = f.read()
+    with open(gz_path, "wb") as f:
+        f.write(content[:-10])
+    assert list(read_jsonl(gz_path)) == RECORDS
+
+
+def test_interrupted_json_writer_leaves_an_unterminated_dataset(tmp_path):
+    path = str(tmp_path / "API2Can-train.json")
+    with pytest.raises(RuntimeError):
+        with JsonWriter(path) as writer:
+            writer.write(RECORDS[0])
+            raise RuntimeError("interrupted")
+    with pytest.raises(ValueError):
+        list(read_dataset(path))
+
+
+def test_dataset_index_groups_the_records_by_api(tmp_path):
+    paths = [str(tmp_path / name) for name in ["API2Can-train.json", "API2Can-test.jsonl.gz", "API2Can-bad.json"]]
+    for path, records in zip(paths, [RECORDS, RECORDS[:2], RECORDS]):
+        with dataset_writer(path) as writer:
+            writer.write_all(records)
+    with open(paths[2], "r+") as f:
+        f.truncate(os.path.getsize(paths[2]) - 5)  # the dataset of an interrupted run, in its last record
+
+    with DatasetIndex() as index:
+        index.add_dataset(paths[0])
+        index.add_dataset(paths[1])
+        with pytest.raises(ValueError):
+            index.add_dataset(paths[2])
+        for path in paths:
+            os.remove(path)  # e.g. overwritten by the run
+
+        assert len(index) == 2 and "pets.yaml" in index and "dogs.yaml" not in index
+        assert index.get("dogs.yaml", []) == []
+        pets = index.get("pets.yaml")
+        assert len(pets) == 4 and list(pets) == RECORDS[:2] * 2
+        assert list(pickle.loads(pickle.dumps(pets))) == list(pets)
+        assert list(index.get("shop.yaml")) == RECORDS[2:]
+    assert not os.path.exists(index.path)
@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from canonical.dataset_io import read_dataset
+from canonical.dataset_shards import STAGES, find_shards, merge_shards, shard_of, stage_file_name, write_stage
+
+APIS = ["api-{:02d}.yaml".format(index) for index in range(30)]
+STAGE_OF = dict((api, STAGES[index % len(STAGES)]) for index, api in enumerate(APIS))
+
+
+def records_of(api):
+    return [{"api": api, "verb": verb, "url": "/{}".format(api)} for verb in ("get", "post")[:APIS.index(api) % 2 + 1]]
+
+
+def write_shards(directory, shard_count, output_format="json"):
+    """Write the shards of each stage as the nodes of a sharded run would (specs in the order of their names)."""
+    for index in range(shard_count):
+        os.makedirs(os.path.join(directory, str(index)), exist_ok=True)
+        for stage in STAGES:
+            records = [record for api in sorted(APIS) if shard_of(api, shard_count) == index and
+                       STAGE_OF[api] == stage for record in records_of(api)]
+            write_stage(os.path.join(directory, str(index), stage_file_name(stage, index, shard_count,
+                                                                            output_format)), records)
+    return [os.path.join(directory, str(index)) for index in range(shard_count)]
+
+
+def test_shard_of_is_stable_and_spreads_the_specs():
+    assert [shard_of(api, 4) for api in APIS] == [shard_of(api, 4) for api in APIS]
+    assert set(shard_of(api, 4) for api in APIS) == {0, 1, 2, 3}
+    assert all(shard_of(api, 1) == 0 for api in APIS)
+
+
+def test_stage_file_name():
+    assert stage_file_name("train") == "API2Can-train.json"
+    assert stage_file_name("train", 0, 1) == "API2Can-train.json"
+    assert stage_file_name("test", 2, 3, "jsonl.gz") == "API2Can-test.shard-2-of-3.jsonl.gz"
+
+
+@pytest.mark.parametrize("shard_format, output_format", [("json", "json"), ("jsonl", "json"),
+                                                         ("jsonl.gz", "jsonl")])
+def test_merge_is_the_single_node_dataset(tmp_path, shard_format, output_format):
+    shard_directories = write_shards(str(tmp_path / "shards"), 3, shard_format)
+    sizes = merge_shards(str(tmp_path / "out"), shard_directories, output_format)
+
+    for stage in STAGES:
+        expected = [record for api in sorted(APIS) if STAGE_OF[api] == stage for record in records_of(api)]
+        path = str(tmp_path / "out" / stage_file_name(stage, output_format=output_format))
+        assert list(read_dataset(path)) == expected
+        assert sizes[stage] == len(expected)
+    if output_format == "json":
+        with open(str(tmp_path / "out" / "API2Can-train.json")) as f:
+            assert f.read() == json.dumps(list(read_dataset(f.name)), indent=4)
+
+
+def test_find_shards_rejects_incomplete_shards(tmp_path):
+    shard_directories = write_shards(str(tmp_path), 3)
+    assert sorted(find_shards(shard_directories, "train")) == [0, 1, 2]
+
+    with pytest.raises(ValueError, match="missing shards of train: \\[1\\]"):
+        find_shards(shard_directories[:1] + shard_directories[2:], "train")
+    with pytest.raises(ValueError, match="shard 0 of train"):
+        find_shards(shard_directories + shard_directories[:1], "train")
+
+    write_stage(os.path.join(shard_directories[0], stage_file_name("train", 3, 4)), [])
+    with pytest.raises(ValueError, match="shard counts \\[3, 4\\]"):
+        find_shards(shard_directories, "train")
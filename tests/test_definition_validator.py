@@ -0,0 +1,103 @@
+import itertools
+import random
+
+from swagger.swagger_parser import SwaggerParser
+
+SPEC = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+paths: {}
+definitions:
+  Pet:
+    type: object
+    required: [name]
+    properties:
+      id: {type: integer}
+      name: {type: string}
+      weight: {type: number}
+      vaccinated: {type: boolean}
+      tags: {type: array, items: {type: string}}
+      toys: {type: array, items: {$ref: "#/definitions/Toy"}}
+      owner: {$ref: "#/definitions/Owner"}
+  Toy:
+    type: object
+    required: [name]
+    properties:
+      name: {type: string}
+      price: {type: number}
+  Owner:
+    type: object
+    properties:
+      id: {type: integer}
+      pets: {type: array, items: {$ref: "#/definitions/Pet"}}
+      friend: {$ref: "#/definitions/Owner"}
+  Error:
+    type: object
+    required: [code, message]
+    properties:
+      code: {type: integer}
+      message: {type: string}
+  Empty:
+    type: object
+  Loose:
+    type: object
+    properties:
+      id: {}
+      kind: {type: string}
+      missing: {$ref: "#/definitions/Unknown"}
+"""
+
+VALUES = [None, 1, -2, 2.5, "x", "12", True, [], ["a"], [1], {}, {"name": "ball"}, [{"name": "ball"}],
+          [{"price": 1.5}], {"id": 1}, {"id": "1"}, {"friend": {"id": 2}}, {"pets": [{"name": "Rex"}]}]
+KEYS = ["id", "name", "weight", "vaccinated", "tags", "toys", "owner", "price", "pets", "friend", "code", "message",
+        "kind", "missing", "other"]
+
+
+def random_dicts(count, seed=5):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield dict((key, rng.choice(VALUES)) for key in rng.sample(KEYS, rng.randint(0, 4)))
+
+
+def outcome(validate, *args):
+    try:
+        return validate(*args)
+    except Exception as e:
+        return type(e)
+
+
+def test_compiled_definitions_match_the_interpretation():
+    compiled = SwaggerParser(swagger_yaml=SPEC)
+    interpreted = SwaggerParser(swagger_yaml=SPEC, compiled_validators=False)
+    names = list(compiled.specification["definitions"]) + ["Unknown"]
+    for name, value in itertools.product(names, list(random_dicts(400))):
+        assert outcome(compiled.validate_definition, name, value) == \
+            outcome(interpreted.validate_definition, name, value), (name, value)
+
+
+def test_validate_definition():
+    parser = SwaggerParser(swagger_yaml=SPEC)
+    assert parser.validate_definition("Pet", {"name": "Rex", "toys": [{"name": "ball"}], "owner": {"id": 1}})
+    assert parser.validate_definition("Pet", {"name": "Rex", "id": None})
+    assert not parser.validate_definition("Pet", {"id": 1})
+    assert not parser.validate_definition("Pet", {"name": "Rex", "toys": [{"price": 1.5}]})
+    assert not parser.validate_definition("Pet", {"name": "Rex", "color": "red"})
+    assert parser.validate_definition("Owner", {"friend": {"friend": {"pets": [{"name": "Rex"}]}}})
+    assert not parser.validate_definition("Owner", {"friend": {"friend": {"id": "x"}}})
+    assert parser.validate_definition("Empty", {})
+    assert not parser.validate_definition("Unknown", {})
+    assert parser.validate_definition(None, {"a": 1}, {"properties": {"a": {"type": "integer"}}})
+
+
+def test_signature_index_keeps_the_matching_definitions():
+    parser = SwaggerParser(swagger_yaml=SPEC.split("  Loose:")[0])
+    names = list(parser.specification["definitions"])
+    for value in random_dicts(1000, seed=6):
+        outcomes = [outcome(parser.validate_definition, name, value) for name in names]
+        found = outcome(parser.get_dict_definition, value, True)
+        if isinstance(found, type):  # a candidate cannot be validated (e.g. an int for a $ref)
+            assert found in outcomes, value
+        else:
+            assert found == [name for name, valid in zip(names, outcomes) if valid is True], value
+    assert parser.get_dict_definition({"code": 1, "message": "x"}) == "Error"
+    assert parser.get_dict_definition({"code": "x", "message": "x"}) is None
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+
+from canonical.manifest import Manifest, code_version, content_hash, files_version, manifest_file_name
+
+RECORDS = [{"api": "pets.yaml", "verb": "get"}, {"api": "pets.yaml", "verb": "post"}]
+
+
+def test_manifest_file_name():
+    assert manifest_file_name() == "manifest.json"
+    assert manifest_file_name(1, 3) == "manifest.shard-1-of-3.json"
+
+
+def test_versions(tmp_path):
+    lexicon = tmp_path / "lexicon.txt"
+    lexicon.write_text("pet\n")
+    version = files_version([str(lexicon), str(tmp_path / "missing.txt")])
+    assert content_hash(str(lexicon)) == content_hash(str(lexicon))
+    assert files_version([str(lexicon), str(tmp_path / "missing.txt")]) == version
+
+    lexicon.write_text("pets\n")
+    assert files_version([str(lexicon), str(tmp_path / "missing.txt")]) != version
+    assert files_version([str(lexicon)]) != files_version([str(lexicon), str(tmp_path / "missing.txt")])
+    assert code_version() == code_version() != code_version(("canonical",))
+
+
+def test_stored_records_of_current_entries():
+    manifest = Manifest("code-1", "lexicon-1")
+    manifest.update("pets.yaml", "hash-1", len(RECORDS))
+    manifest.update("broken.yaml", "hash-2", None)
+
+    assert manifest.is_current("pets.yaml", "hash-1")
+    assert not manifest.is_current("pets.yaml", "hash-0")
+    assert not manifest.is_current("new.yaml", "hash-1")
+    assert manifest.stored_records("pets.yaml", "hash-1", RECORDS) == RECORDS
+    assert manifest.stored_records("pets.yaml", "hash-1", RECORDS[:1]) is None  # partially overwritten
+    assert manifest.stored_records("pets.yaml", "hash-0", RECORDS) is None
+    assert manifest.failed("broken.yaml") and not manifest.failed("pets.yaml")
+    assert manifest.stored_records("broken.yaml", "hash-2", []) == []
+
+    for other in (Manifest("code-2", "lexicon-1", manifest.specs), Manifest("code-1", "lexicon-2", manifest.specs)):
+        assert not other.same_versions("pets.yaml")
+        assert other.stored_records("pets.yaml", "hash-1", RECORDS) is None
+
+
+def test_save_and_load(tmp_path):
+    path = str(tmp_path / manifest_file_name())
+    manifest = Manifest("code-1", "lexicon-1")
+    manifest.update("pets.yaml", "hash-1", 2)
+    manifest.update("a.yaml", "hash-2", None)
+    manifest.save(path)
+
+    loaded = Manifest.load(path, "code-1", "lexicon-1")
+    assert loaded.specs == manifest.specs and list(loaded.specs) == ["pets.yaml", "a.yaml"]
+    assert loaded.stored_records("pets.yaml", "hash-1", RECORDS) == RECORDS
+    assert Manifest.load(path, "code-2", "lexicon-1").stored_records("pets.yaml", "hash-1", RECORDS) is None
+
+    # A manifest which cannot be written leaves the previous one
+    manifest.update("bad.yaml", "hash-3", object())
+    with pytest.raises(TypeError):
+        manifest.save(path)
+    assert Manifest.load(path, "code-1", "lexicon-1").specs == loaded.specs
+    assert os.listdir(str(tmp_path)) == [manifest_file_name()]
+
+
+@pytest.mark.parametrize("content", [None, "", "{not json", '{"format": 0, "specs": {"a.yaml": {}}}'])
+def test_unreadable_manifests_have_no_entries(tmp_path, content):
+    path = tmp_path / manifest_file_name()
+    if content is not None:
+        path.write_text(content)
+    manifest = Manifest.load(str(path), "code-1", "lexicon-1")
+    assert manifest.specs == {} and manifest.code_version == "code-1" and manifest.lexicon_version == "lexicon-1"
@@ -0,0 +1,80 @@
+import io
+import json
+
+import pytest
+
+pytest.importorskip("flask")
+
+from rest.mock_server import create_app, STATUS_HEADER
+from swagger.mock_responder import MockResponder
+from swagger.swagger_parser import SwaggerParser
+
+SPEC = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+host: pets.example.com
+basePath: /v1
+schemes: [https]
+paths:
+  /pets/{petId}:
+    get:
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses:
+        "200": {description: a pet, schema: {$ref: "#/definitions/Pet"}}
+        "404": {description: no such pet, schema: {$ref: "#/definitions/Error"}}
+definitions:
+  Pet:
+    type: object
+    properties:
+      id: {type: integer}
+      name: {type: string, example: Rex}
+  Error:
+    type: object
+    properties:
+      message: {type: string, example: not found}
+"""
+
+
+def test_mock_server_answers_with_the_examples():
+    client = create_app(MockResponder(SwaggerParser(swagger_yaml=SPEC))).test_client()
+
+    response = client.get("/v1/pets/12")
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"id": 42, "name": "Rex"}
+
+    response = client.get("/v1/pets/12", headers={STATUS_HEADER: "404"})
+    assert response.status_code == 404
+    assert json.loads(response.data) == {"message": "not found"}
+
+    assert client.get("/v1/owners/12").status_code == 404
+    assert client.delete("/v1/pets/12").status_code == 404
+
+
+def test_rest_service_mocks_uploaded_specs():
+    pytest.importorskip("flask_restx")
+    from rest.restapi import app
+
+    client = app.test_client()
+    response = client.post("/mocks", data={"yaml": (io.BytesIO(SPEC.encode("utf-8")), "pets.yaml")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 200
+    mock = json.loads(response.data)
+    assert mock["operations"] == 1
+
+    response = client.get("{}/v1/pets/12".format(mock["url"]))
+    assert response.status_code == 200
+    assert json.loads(response.data) == {"id": 42, "name": "Rex"}
+
+    response = client.get("{}/v1/pets/12?mock_status=404".format(mock["url"]))
+    assert response.status_code == 404
+    assert json.loads(response.data) == {"message": "not found"}
+
+    response = client.get("/mocks/unknown/v1/pets/12")
+    assert response.status_code == 404
+    assert json.loads(response.data)["message"] == "unknown mock unknown"
+
+    assert client.post("/mocks", data={}, content_type="multipart/form-data").status_code == 401
+    response = client.post("/mocks", data={"yaml": (io.BytesIO(b"paths: [1"), "broken.yaml")},
+                           content_type="multipart/form-data")
+    assert response.status_code == 501
@@ -0,0 +1,51 @@
+import random
+import re
+
+from swagger.path_router import PathRouter
+
+TEMPLATES = ["/v1/pets", "/v1/pets/{id}", "/v1/pets/mine", "/v1/{x}/mine", "/v1/pets/{id}/toys/{t}.json",
+             "/v1/pets/{a}{b}", "/v1/{c}/{d}", "/v1/files/{name}.{ext}", "/v1/files/{name}", "/"]
+
+
+def scan(templates, path):
+    """Resolve a path as SwaggerParser.get_path_spec did: an exact match, else the last matching template."""
+    if path in templates:
+        return path
+    found = None
+    for template in templates:
+        parts = re.split('({[^/]*})', template)
+        regex = ''.join('([^/]*)' if part.startswith('{') else re.escape(part) for part in parts)
+        if re.match(regex + '$', path):
+            found = template
+    return found
+
+
+def test_match():
+    router = PathRouter(TEMPLATES)
+    assert router.match("/v1/pets") == "/v1/pets"
+    assert router.match("/v1/pets/mine") == "/v1/pets/mine"
+    assert router.match("/v1/pets/{id}") == "/v1/pets/{id}"
+    assert router.match("/v1/pets/3") == "/v1/{c}/{d}"
+    assert router.match("/v1/dogs/mine") == "/v1/{c}/{d}"
+    assert router.match("/v1/pets/1/toys/2.json") == "/v1/pets/{id}/toys/{t}.json"
+    assert router.match("/v1/pets/1/toys/2xjson") is None
+    assert router.match("/v1/files/a.b") == "/v1/files/{name}"
+    assert router.match("/") == "/"
+    assert router.match("/nope") is None
+    assert router.match("") is None
+    assert "/v1/pets/{id}" in router and "/v1/pets/3" not in router
+    assert len(router) == len(TEMPLATES)
+
+
+def test_match_is_the_scan_of_the_templates():
+    rng = random.Random(4)
+    segments = ["v1", "pets", "mine", "{id}", "{id}.json", "a{x}b", "{a}{b}", "."]
+    concrete = ["v1", "pets", "mine", "12", "12.json", "a1b", "ab", "x", ".", "", "12xjson"]
+    for _ in range(50):
+        templates = ["/" + "/".join(rng.choice(segments) for _ in range(rng.randint(0, 3)))
+                     for _ in range(rng.randint(1, 8))]
+        router = PathRouter(templates)
+        paths = templates + ["/" + "/".join(rng.choice(concrete) for _ in range(rng.randint(0, 3)))
+                             for _ in range(30)]
+        for path in paths:
+            assert router.match(path) == scan(templates, path), (templates, path)
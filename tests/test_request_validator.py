@@ -0,0 +1,182 @@
+import itertools
+
+import pytest
+
+from swagger.request_validator import RequestValidators, INVALID_POST_BODY, INVALID_BODY, INVALID_QUERY, \
+    VALIDATION_ERROR, UNKNOWN_PATH, UNKNOWN_METHOD
+from swagger.swagger_parser import SwaggerParser
+
+PETSTORE = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+basePath: /v1
+paths:
+  /pets:
+    get:
+      parameters:
+        - {name: limit, in: query, type: integer}
+        - {name: tags, in: query, type: array, items: {type: string}}
+        - {name: status, in: query, type: string, required: true}
+      responses: {"200": {description: ok}}
+    post:
+      consumes: [application/json]
+      parameters:
+        - {name: body, in: body, required: true, schema: {$ref: "#/definitions/Pet"}}
+      responses: {"201": {description: created}}
+    put:
+      parameters:
+        - {name: pets, in: body, schema: {type: array, items: {$ref: "#/definitions/Pet"}}}
+      responses: {"200": {description: ok}}
+  /pets/{petId}:
+    post:
+      consumes: [text/plain]
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+        - {name: note, in: body, schema: {type: string}}
+      responses: {"200": {description: ok}}
+    patch:
+      parameters:
+        - {name: name, in: body, type: string}
+      responses: {"200": {description: ok}}
+    delete:
+      responses: {"204": {description: deleted}}
+definitions:
+  Pet:
+    type: object
+    required: [name]
+    properties:
+      id: {type: integer}
+      name: {type: string}
+      tags: {type: array, items: {$ref: "#/definitions/Tag"}}
+      owner: {$ref: "#/definitions/Owner"}
+  Tag:
+    type: object
+    properties:
+      name: {type: string}
+  Owner:
+    type: object
+    required: [id]
+    properties:
+      id: {type: integer}
+      emails: {type: array, items: {type: string}}
+"""
+
+# Irregular specifications, which the compiled validators leave (in part) to the parser
+IRREGULAR = """
+swagger: "2.0"
+info: {title: Irregular, version: "1.0"}
+paths:
+  /items:
+    get:
+      parameters:
+        - {name: q, in: query}
+        - {name: ids, in: query, type: array}
+        - {name: page, in: query, type: integer, required: true}
+      responses: {"200": {description: ok}}
+    post:
+      parameters:
+        - {name: item, in: body, required: true}
+      responses: {"201": {description: created}}
+    put:
+      consumes: [application/json, text/plain]
+      parameters:
+        - {name: item, in: body, schema: {type: object}}
+      responses: {"200": {description: ok}}
+    patch:
+      parameters:
+        - {name: item, in: body, type: string, schema: {$ref: "#/definitions/Item"}}
+      responses: {"200": {description: ok}}
+  /flags:
+    get:
+      parameters:
+        - {name: flag, type: boolean}
+      responses: {"200": {description: ok}}
+definitions:
+  Item:
+    type: object
+    properties:
+      id: {type: integer}
+"""
+
+PATHS = ["/v1/pets", "/v1/pets/12", "/items", "/flags", "/v1/owners", "/items/12"]
+ACTIONS = ["get", "post", "put", "patch", "delete"]
+BODIES = [None, "", {}, "note", '{"name": "Rex"}', 12, [], {"name": "Rex"}, {"id": 1}, {"id": "1", "name": "Rex"},
+          {"name": "Rex", "color": "red"}, {"name": "Rex", "color": None},
+          {"name": "Rex", "tags": [{"name": "cute"}]}, {"name": "Rex", "tags": [{"name": 1}]},
+          {"name": "Rex", "owner": {"id": 1, "emails": ["a@b.c"]}}, {"name": "Rex", "owner": {"emails": []}},
+          [{"name": "Rex"}], [{"id": 1}], [{"name": "Rex"}, {"id": 1}]]
+QUERIES = [None, {}, {"status": "sold"}, {"status": "sold", "limit": 10}, {"status": "sold", "limit": "10"},
+           {"status": "sold", "tags": ["a", "b"]}, {"status": "sold", "tags": "a"}, {"status": 1, "tags": [1]},
+           {"page": 1}, {"page": 1, "q": "x"}, {"page": 1, "ids": []}, {"page": 1, "ids": [1]}, {"flag": True},
+           {"other": 1}]
+
+
+class InterpretedValidators(RequestValidators):
+    """Request validators which always fall back to the parser's interpretation of the specification."""
+
+    def get(self, path_name, action):
+        validator = super(InterpretedValidators, self).get(path_name, action)
+        if validator is not None:
+            validator.query_checkers = validator.body_checkers = None
+        return validator
+
+
+def interpreted_parser(spec):
+    parser = SwaggerParser(swagger_yaml=spec, compiled_validators=False)
+    parser.request_validators = InterpretedValidators(parser)
+    return parser
+
+
+@pytest.mark.parametrize("spec, kinds", [
+    (PETSTORE, {UNKNOWN_PATH, UNKNOWN_METHOD, INVALID_POST_BODY, INVALID_BODY, INVALID_QUERY, VALIDATION_ERROR}),
+    (IRREGULAR, {UNKNOWN_PATH, UNKNOWN_METHOD, INVALID_BODY, INVALID_QUERY, VALIDATION_ERROR}),
+], ids=["petstore", "irregular"])
+def test_compiled_validators_match_the_interpretation(spec, kinds):
+    requests = list(itertools.product(PATHS, ACTIONS, BODIES, QUERIES))
+    compiled = list(SwaggerParser(swagger_yaml=spec).validate_requests(requests))
+    interpreted = list(interpreted_parser(spec).validate_requests(requests))
+
+    for request, expected, actual in zip(requests, interpreted, compiled):
+        assert actual == expected, request
+    assert set(violation[0] for _, violation in compiled if violation is not None) == kinds
+
+
+def test_irregular_parameters_fall_back_to_the_parser():
+    parser = SwaggerParser(swagger_yaml=IRREGULAR)
+    [(_, violation)] = parser.validate_requests([("/flags", "get", None, {"flag": True})])
+    validator = parser.request_validators.get("/flags", "get")
+    assert validator.query_checkers is None and validator.body_checkers is None
+    assert violation[0] == VALIDATION_ERROR
+
+
+def test_validate_request_matches_the_batch_validation():
+    parser = SwaggerParser(swagger_yaml=PETSTORE)
+    for path, action, body, query in itertools.product(PATHS, ACTIONS, BODIES, QUERIES):
+        try:
+            valid = parser.validate_request(path, action, body, query)
+        except Exception as e:
+            valid = type(e)
+        [(_, violation)] = parser.validate_requests([(path, action, body, query)])
+        if violation is not None and violation[0] == VALIDATION_ERROR:
+            assert isinstance(valid, type) and issubclass(valid, Exception)
+        else:
+            assert valid == (violation is None)
+
+
+def test_violations_of_the_petstore():
+    parser = SwaggerParser(swagger_yaml=PETSTORE)
+
+    def check(path, action, body=None, query=None):
+        [(path_name, violation)] = parser.validate_requests([(path, action, body, query)])
+        return path_name, violation and violation[0]
+
+    assert check("/v1/pets", "get", query={"status": "sold", "limit": 10}) == ("/v1/pets", None)
+    assert check("/v1/pets", "get", query={"limit": 10}) == ("/v1/pets", INVALID_QUERY)
+    assert check("/v1/pets", "get", query={"status": "sold", "tags": "a"}) == ("/v1/pets", INVALID_QUERY)
+    assert check("/v1/pets", "post", {"name": "Rex", "tags": [{"name": "cute"}]}) == ("/v1/pets", None)
+    assert check("/v1/pets", "post", {"id": 1}) == ("/v1/pets", INVALID_BODY)
+    assert check("/v1/pets", "post", None) == ("/v1/pets", INVALID_POST_BODY)
+    assert check("/v1/pets", "post", "not json") == ("/v1/pets", VALIDATION_ERROR)
+    assert check("/v1/pets/12", "post", "") == ("/v1/pets/{petId}", None)
+    assert check("/v1/pets/12", "get") == ("/v1/pets/{petId}", UNKNOWN_METHOD)
+    assert check("/v1/owners", "get") == (None, UNKNOWN_PATH)
@@ -0,0 +1,111 @@
+import os
+
+from swagger import spec_cache
+from swagger.spec_cache import PARSER_MODULES, SpecCache, source_version
+from swagger.swagger_parser import SwaggerParser
+
+SPEC = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+basePath: /v1
+paths:
+  /pets/{petId}:
+    get:
+      operationId: getPet
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses:
+        "200": {description: a pet, schema: {$ref: "#/definitions/Pet"}}
+    put:
+      parameters:
+        - {name: body, in: body, schema: {$ref: "#/definitions/Pet"}}
+      responses: {"200": {description: ok}}
+definitions:
+  Pet:
+    type: object
+    required: [name]
+    properties:
+      id: {type: integer}
+      name: {type: string, example: Rex}
+"""
+
+
+def parsed_state(parser):
+    return dict((name, getattr(parser, name)) for name in SwaggerParser._CACHED_ATTRIBUTES if
+                name != 'definitions_example'), dict(parser.definitions_example)
+
+
+def test_cached_parse_is_the_parse(tmp_path):
+    cache = SpecCache(str(tmp_path))
+    spec_path = tmp_path / "pets.yaml"
+    spec_path.write_text(SPEC)
+
+    for options in ({"swagger_yaml": SPEC}, {"swagger_path": str(spec_path)},
+                    {"swagger_yaml": SPEC, "lazy_definitions": True}, {"swagger_yaml": SPEC, "selective": True}):
+        expected = SwaggerParser(**options)
+        first = SwaggerParser(cache=cache, **options)
+        misses = cache.misses
+        second = SwaggerParser(cache=cache, **options)
+        assert cache.misses == misses
+        assert parsed_state(first) == parsed_state(expected) == parsed_state(second)
+        assert second.get_request_data("/v1/pets/12", "get") == expected.get_request_data("/v1/pets/12", "get")
+        assert second.validate_request("/v1/pets/12", "put", {"name": "Rex"})
+        assert not second.validate_request("/v1/pets/12", "put", {"id": 1})
+    assert cache.hits == 4 and cache.misses == 4
+
+
+def test_key_depends_on_the_content_and_the_options(tmp_path):
+    cache = SpecCache(str(tmp_path))
+    SwaggerParser(swagger_yaml=SPEC, cache=cache)
+    SwaggerParser(swagger_yaml=SPEC, cache=cache, use_example=False)
+    SwaggerParser(swagger_yaml=SPEC.replace("Rex", "Max"), cache=cache)
+    assert cache.hits == 0 and cache.misses == 3
+    assert SwaggerParser(swagger_yaml=SPEC.replace("Rex", "Max"), cache=cache).definitions_example == \
+        {"Pet": {"id": 42, "name": "Max"}}
+    assert SpecCache.key(SPEC) == SpecCache.key(SPEC.encode("utf-8"))
+    assert SpecCache.key(SPEC, [("a", 1)]) != SpecCache.key(SPEC, [("a", 2)])
+
+
+def test_key_depends_on_the_parser_code(monkeypatch):
+    key = SpecCache.key(SPEC)
+    assert source_version(PARSER_MODULES) == source_version(PARSER_MODULES) != source_version()
+    monkeypatch.setitem(spec_cache._source_versions, PARSER_MODULES, "parser-2")
+    assert SpecCache.key(SPEC) != key
+
+
+def test_unreadable_entries_are_dropped(tmp_path):
+    cache = SpecCache(str(tmp_path))
+    SwaggerParser(swagger_yaml=SPEC, cache=cache)
+    [entry] = list(tmp_path.iterdir())
+    entry.write_bytes(b"not a pickle")
+
+    parser = SwaggerParser(swagger_yaml=SPEC, cache=cache)
+    assert cache.hits == 0 and cache.misses == 2
+    assert parser.definitions_example == {"Pet": {"id": 42, "name": "Rex"}}
+    assert entry.read_bytes() != b"not a pickle"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = SpecCache(str(tmp_path), max_size=1000)
+    for index, key in enumerate(["a", "b", "c"]):
+        cache.put(key, "x" * 300)
+        os.utime(cache._path(key), (index, index))
+    assert cache.get("a") == "x" * 300  # now the most recently used
+    cache.put("d", "x" * 300)
+
+    assert cache.get("b") is None
+    assert all(cache.get(key) is not None for key in ["a", "c", "d"])
+    assert cache.size() == sum(entry.stat().st_size for entry in tmp_path.iterdir()) <= 1000
+    assert SpecCache(str(tmp_path)).size() == cache.size()
+
+    cache.clear()
+    assert cache.size() == 0 and not list(tmp_path.iterdir())
+
+
+def test_from_env(tmp_path, monkeypatch):
+    monkeypatch.delenv("API2CAN_SPEC_CACHE", raising=False)
+    assert SpecCache.from_env() is None
+    monkeypatch.setenv("API2CAN_SPEC_CACHE", str(tmp_path))
+    monkeypatch.setenv("API2CAN_SPEC_CACHE_MAX_SIZE", "2048")
+    cache = SpecCache.from_env()
+    assert cache.directory == str(tmp_path) and cache.max_size == 2048
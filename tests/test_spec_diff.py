@@ -0,0 +1,115 @@
+import json
+
+from canonical.spec_diff import diff_operations, operation_fingerprint, record_fingerprint, regenerate
+from swagger.swagger_analysis import SwaggerAnalyser
+
+OLD = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+host: pets.example.com
+basePath: /v1
+schemes: [https]
+paths:
+  /pets:
+    get:
+      summary: list the pets
+      parameters:
+        - {name: limit, in: query, type: integer, example: 10}
+      responses: {"200": {description: ok}}
+    post:
+      summary: create a pet
+      parameters:
+        - {name: body, in: body, required: true, schema: {$ref: "#/definitions/Pet"}}
+      responses: {"201": {description: created}}
+  /pets/{petId}:
+    get:
+      summary: get a pet
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses: {"200": {description: ok}}
+    put:
+      summary: replace a pet
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses: {"200": {description: ok}}
+    delete:
+      summary: delete a pet
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses: {"204": {description: deleted}}
+definitions:
+  Pet:
+    type: object
+    properties:
+      name: {type: string, example: Rex}
+"""
+
+NEW = OLD.replace("create a pet", "add a pet to the store") \
+    .replace("""        - {name: petId, in: path, required: true, type: integer}
+      responses: {"200": {description: ok}}
+    put:""", """        - {name: petId, in: path, required: true, type: integer}
+        - {name: fields, in: query, type: string}
+      responses: {"200": {description: ok}}
+    patch:""") \
+    .replace("""    delete:
+      summary: delete a pet
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses: {"204": {description: deleted}}
+""", """  /owners:
+    get:
+      summary: list the owners
+      responses: {"200": {description: ok}}
+""")
+
+
+def operations(spec):
+    return SwaggerAnalyser(swagger=spec).analyse().operations
+
+
+def generator(canonical, generated):
+    def generate(operation):
+        generated.append("{} {}".format(operation.verb, operation.url))
+        operation.canonical_expr = "{} {}".format(canonical, operation.url)
+        # The records are reused from the datasets, as they are read from their JSON
+        return json.loads(json.dumps(operation.to_json()))
+    return generate
+
+
+def by_key(records):
+    return dict(("{} {}".format(record["verb"], record["url"]), record) for record in records)
+
+
+def test_unchanged_operations_are_reused():
+    old_records, _ = regenerate(operations(OLD), [], generator("old", []))
+    for operation, record in zip(operations(OLD), old_records):
+        assert record_fingerprint(record) == operation_fingerprint(operation)
+
+    generated = []
+    records, diff = regenerate(operations(NEW), old_records, generator("new", generated))
+
+    assert diff.unchanged == ["get /v1/pets"]
+    assert sorted(diff.changed) == ["get /v1/pets/{petId}", "post /v1/pets"]
+    assert sorted(diff.added) == ["get /v1/owners", "patch /v1/pets/{petId}"]
+    assert sorted(diff.removed) == ["delete /v1/pets/{petId}", "put /v1/pets/{petId}"]
+    assert sorted(generated) == sorted(diff.changed + diff.added)
+
+    new = by_key(records)
+    assert len(records) == len(new) == 5 and "delete /v1/pets/{petId}" not in new
+    assert new["get /v1/pets"] == by_key(old_records)["get /v1/pets"]
+    assert new["get /v1/pets"]["canonical_expr"] == "old /v1/pets"
+    for key in generated:
+        assert new[key]["canonical_expr"] == "new " + key.split(" ")[1]
+
+    assert list(diff.to_json()) == ["added", "removed", "changed", "unchanged"]
+    assert diff.to_json()["removed"] == diff.removed
+    assert diff.summary() == "1 unchanged (reused), 2 changed, 2 added, 2 removed"
+    assert diff_operations(operations(OLD), operations(NEW)).to_json() == diff.to_json()
+
+
+def test_same_version_is_all_reused():
+    old_records, _ = regenerate(operations(OLD), [], generator("old", []))
+    generated = []
+    records, diff = regenerate(operations(OLD), old_records, generator("new", generated))
+    assert records == old_records and not generated
+    assert len(diff.unchanged) == len(old_records) and not (diff.added or diff.removed or diff.changed)
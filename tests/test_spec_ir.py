@@ -0,0 +1,92 @@
+import os
+
+import pytest
+
+from swagger import swagger_analysis
+from swagger.spec_ir import IR_SUFFIX, SpecIR, operation_record, write_ir
+from swagger.swagger_analysis import SwaggerAnalyser, load_or_analyse
+
+PETSTORE = """
+swagger: "2.0"
+info: {title: Pets, version: "1.0"}
+host: pets.example.com
+basePath: /v1
+schemes: [https]
+paths:
+  /pets:
+    get:
+      summary: list the pets
+      operationId: listPets
+      parameters:
+        - {name: limit, in: query, type: integer, example: 10}
+        - {name: api_key, in: header, type: string}
+      responses: {"200": {description: ok}}
+    post:
+      summary: create a pet
+      parameters:
+        - {name: body, in: body, required: true, schema: {$ref: "#/definitions/Pet"}}
+      responses: {"201": {description: created}}
+  /pets/{petId}:
+    delete:
+      description: remove a pet from the store
+      parameters:
+        - {name: petId, in: path, required: true, type: integer}
+      responses: {"204": {description: deleted}}
+definitions:
+  Pet:
+    type: object
+    properties:
+      name: {type: string, example: Rex}
+      tag: {type: string}
+"""
+
+
+def records(api):
+    return [operation_record(operation) for operation in api.operations]
+
+
+def test_round_trip(tmp_path):
+    analyser = SwaggerAnalyser(swagger=PETSTORE)
+    api = analyser.analyse()
+    path = str(tmp_path / ("spec" + IR_SUFFIX))
+    write_ir(path, api, analyser.auth_tokens, "hash-1", "code-1")
+
+    with SpecIR(path, "code-1") as ir:
+        assert len(ir) == len(api.operations) == 3
+        assert (ir.source_hash, ir.code_version) == ("hash-1", "code-1")
+        assert ir.auth_keys == list(analyser.auth_tokens)
+        assert ir.record(1) == operation_record(api.operations[1])
+        loaded = ir.api()
+    assert (loaded.title, loaded.url, loaded.protocols) == (api.title, api.url, api.protocols)
+    assert records(loaded) == records(api)
+
+
+def test_the_ir_of_another_version_is_rejected(tmp_path):
+    path = str(tmp_path / ("spec" + IR_SUFFIX))
+    write_ir(path, SwaggerAnalyser(swagger=PETSTORE).analyse(), code_version="code-1")
+    SpecIR(path).close()
+    with pytest.raises(ValueError, match="another version"):
+        SpecIR(path, "code-2")
+
+    with open(path, "r+b") as f:
+        f.seek(8)
+        f.write(b"\xff")
+    with pytest.raises(ValueError, match="format version"):
+        SpecIR(path)
+
+
+def test_load_or_analyse_misses_after_a_code_change(tmp_path, monkeypatch):
+    ir_directory = str(tmp_path / "ir")
+    expected = records(SwaggerAnalyser(swagger=PETSTORE).analyse())
+    analyse, analysed = SwaggerAnalyser.analyse, []
+    monkeypatch.setattr(SwaggerAnalyser, "analyse", lambda self: analysed.append(self) or analyse(self))
+
+    assert records(load_or_analyse(swagger=PETSTORE, ir_directory=ir_directory)) == expected
+    assert records(load_or_analyse(swagger=PETSTORE, ir_directory=ir_directory)) == expected
+    assert len(analysed) == 1 and len(os.listdir(ir_directory)) == 1
+
+    monkeypatch.setattr(swagger_analysis, "source_version", lambda: "code-2")
+    assert records(load_or_analyse(swagger=PETSTORE, ir_directory=ir_directory)) == expected
+    assert len(analysed) == 2 and len(os.listdir(ir_directory)) == 2
+    for name in os.listdir(ir_directory):
+        SpecIR(os.path.join(ir_directory, name)).close()
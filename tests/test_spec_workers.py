@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+
+from canonical import spec_workers
+from canonical.spec_workers import BudgetedPool, TaskFailure, in_worker, report_stage
+
+MEMORY_LIMIT = 64 * 1024 * 1024
+MEMORY_ENFORCED = spec_workers.resource is not None and spec_workers._data_size() is not None
+
+
+def run_task(task):
+    """Task of the workers: a (kind, value) pair, which returns (value, pid of the worker) unless it fails."""
+    kind, value = task
+    report_stage("{} {}".format(kind, value))
+    if kind == "sleep":
+        time.sleep(value)
+    elif kind == "allocate":
+        data = bytearray(value)
+        del data
+    elif kind == "exit":
+        os._exit(value)
+    elif kind == "raise":
+        raise RuntimeError(value)
+    return value, os.getpid()
+
+
+def test_a_pool_needs_a_worker():
+    with pytest.raises(ValueError):
+        BudgetedPool(run_task, 0)
+
+
+def test_report_stage_outside_of_a_worker():
+    report_stage("analysis")
+    assert not in_worker()
+
+
+def test_timeout():
+    with BudgetedPool(run_task, timeout=0.5) as pool:
+        started = time.time()
+        [failure, result] = list(pool.imap([("sleep", 60), ("run", 1)]))
+    assert time.time() - started < 30
+    assert isinstance(failure, TaskFailure) and failure.reason == "timeout" and failure.stage == "sleep 60"
+    assert failure.elapsed >= 0.5
+    assert result[0] == 1 and pool.recycled == 1
+
+
+@pytest.mark.skipif(not MEMORY_ENFORCED, reason="the memory budget is not enforced on this system")
+def test_memory_limit():
+    with BudgetedPool(run_task, memory_limit=MEMORY_LIMIT) as pool:
+        [small, failure, result] = list(pool.imap([("allocate", MEMORY_LIMIT // 4), ("allocate", 4 * MEMORY_LIMIT),
+                                                   ("run", 1)]))
+    assert small[0] == MEMORY_LIMIT // 4
+    assert isinstance(failure, TaskFailure) and failure.reason == "memory"
+    assert failure.stage == "allocate {}".format(4 * MEMORY_LIMIT)
+    assert result[0] == 1 and result[1] != small[1] and pool.recycled == 1
+
+
+def test_crash():
+    with BudgetedPool(run_task) as pool:
+        [failure, result] = list(pool.imap([("exit", 3), ("run", 1)]))
+    assert isinstance(failure, TaskFailure) and failure.reason == "crash" and failure.stage == "exit 3"
+    assert failure.detail == "exit code 3"
+    assert result[0] == 1 and pool.recycled == 1
+
+
+def test_error_keeps_the_worker():
+    with BudgetedPool(run_task) as pool:
+        [failure, result] = list(pool.imap([("raise", "broken spec"), ("run", 1)]))
+    assert isinstance(failure, TaskFailure) and failure.reason == "error" and failure.stage == "raise broken spec"
+    assert "RuntimeError: broken spec" in failure.detail
+    assert result[0] == 1 and pool.recycled == 0
+
+
+def test_results_in_order_across_recycles():
+    # Later tasks are shorter, so that the workers are done out of order
+    tasks = [("sleep", 0.01 * (10 - index % 10)) for index in range(30)]
+    with BudgetedPool(run_task, 3, max_tasks=4) as pool:
+        results = list(pool.imap(tasks))
+    assert [value for value, _ in results] == [value for _, value in tasks]
+    pids = [pid for _, pid in results]
+    assert all(pids.count(pid) <= 4 for pid in pids)
+    assert pool.recycled >= len(tasks) // 4 - 3
+
+
+def test_failures_do_not_stop_the_run():
+    tasks = [("run", 0), ("sleep", 60), ("run", 1), ("exit", 1), ("run", 2), ("raise", "broken spec"), ("run", 3)]
+    reasons = [(1, "timeout"), (3, "crash"), (5, "error")]
+    if MEMORY_ENFORCED:
+        tasks.insert(3, ("allocate", 4 * MEMORY_LIMIT))
+        reasons = [(1, "timeout"), (3, "memory"), (4, "crash"), (6, "error")]
+    with BudgetedPool(run_task, 2, timeout=1, memory_limit=MEMORY_LIMIT, max_tasks=3) as pool:
+        results = list(pool.imap(tasks))
+
+    assert len(results) == len(tasks)
+    assert [(index, result.reason) for index, result in enumerate(results) if isinstance(result, TaskFailure)] == \
+        reasons
+    assert [result[0] for result in results if not isinstance(result, TaskFailure)] == [0, 1, 2, 3]
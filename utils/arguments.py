@@ -0,0 +1,9 @@
+import argparse
+
+
+def positive_int(value):
+    """argparse type of the options which need a number greater than 0 (e.g. a number of processes)."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("{} is not a positive number".format(value))
+    return number